@@ -0,0 +1,295 @@
+"""
+Airport Resolver
+Resolves free-text destination names to IATA airport codes using a local dataset.
+"""
+
+import logging
+import re
+import unicodedata
+from bisect import bisect_left
+from difflib import get_close_matches
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (IATA code, airport name, city, country, metro code)
+# Airports of one metro area are listed in order of preference.
+AIRPORTS: List[Tuple[str, str, str, str, str]] = [
+    # North America
+    ("JFK", "John F. Kennedy International", "New York", "United States", "NYC"),
+    ("EWR", "Newark Liberty International", "New York", "United States", "NYC"),
+    ("LGA", "LaGuardia", "New York", "United States", "NYC"),
+    ("LAX", "Los Angeles International", "Los Angeles", "United States", ""),
+    ("SFO", "San Francisco International", "San Francisco", "United States", ""),
+    ("ORD", "O'Hare International", "Chicago", "United States", "CHI"),
+    ("MDW", "Midway International", "Chicago", "United States", "CHI"),
+    ("IAD", "Washington Dulles International", "Washington", "United States", "WAS"),
+    ("DCA", "Ronald Reagan Washington National", "Washington", "United States", "WAS"),
+    ("BWI", "Baltimore/Washington International", "Baltimore", "United States", "WAS"),
+    ("MIA", "Miami International", "Miami", "United States", ""),
+    ("FLL", "Fort Lauderdale-Hollywood International", "Fort Lauderdale", "United States", ""),
+    ("BOS", "Boston Logan International", "Boston", "United States", ""),
+    ("SEA", "Seattle-Tacoma International", "Seattle", "United States", ""),
+    ("ATL", "Hartsfield-Jackson Atlanta International", "Atlanta", "United States", ""),
+    ("DFW", "Dallas/Fort Worth International", "Dallas", "United States", "DFW"),
+    ("DAL", "Dallas Love Field", "Dallas", "United States", "DFW"),
+    ("IAH", "George Bush Intercontinental", "Houston", "United States", "HOU"),
+    ("HOU", "William P. Hobby", "Houston", "United States", "HOU"),
+    ("DEN", "Denver International", "Denver", "United States", ""),
+    ("LAS", "Harry Reid International", "Las Vegas", "United States", ""),
+    ("PHX", "Phoenix Sky Harbor International", "Phoenix", "United States", ""),
+    ("MCO", "Orlando International", "Orlando", "United States", ""),
+    ("MSP", "Minneapolis-Saint Paul International", "Minneapolis", "United States", ""),
+    ("DTW", "Detroit Metropolitan Wayne County", "Detroit", "United States", ""),
+    ("PHL", "Philadelphia International", "Philadelphia", "United States", ""),
+    ("SAN", "San Diego International", "San Diego", "United States", ""),
+    ("HNL", "Daniel K. Inouye International", "Honolulu", "United States", ""),
+    ("YYZ", "Toronto Pearson International", "Toronto", "Canada", "YTO"),
+    ("YTZ", "Billy Bishop Toronto City", "Toronto", "Canada", "YTO"),
+    ("YVR", "Vancouver International", "Vancouver", "Canada", ""),
+    ("YUL", "Montreal-Trudeau International", "Montreal", "Canada", ""),
+    ("MEX", "Mexico City International", "Mexico City", "Mexico", ""),
+    ("CUN", "Cancun International", "Cancun", "Mexico", ""),
+    # South America
+    ("GRU", "Sao Paulo/Guarulhos International", "Sao Paulo", "Brazil", "SAO"),
+    ("CGH", "Congonhas", "Sao Paulo", "Brazil", "SAO"),
+    ("GIG", "Rio de Janeiro/Galeao International", "Rio de Janeiro", "Brazil", "RIO"),
+    ("EZE", "Ministro Pistarini International", "Buenos Aires", "Argentina", "BUE"),
+    ("LIM", "Jorge Chavez International", "Lima", "Peru", ""),
+    # Europe
+    ("LHR", "Heathrow", "London", "United Kingdom", "LON"),
+    ("LGW", "Gatwick", "London", "United Kingdom", "LON"),
+    ("STN", "Stansted", "London", "United Kingdom", "LON"),
+    ("LTN", "Luton", "London", "United Kingdom", "LON"),
+    ("LCY", "London City", "London", "United Kingdom", "LON"),
+    ("MAN", "Manchester", "Manchester", "United Kingdom", ""),
+    ("EDI", "Edinburgh", "Edinburgh", "United Kingdom", ""),
+    ("DUB", "Dublin", "Dublin", "Ireland", ""),
+    ("CDG", "Charles de Gaulle", "Paris", "France", "PAR"),
+    ("ORY", "Orly", "Paris", "France", "PAR"),
+    ("NCE", "Nice Cote d'Azur", "Nice", "France", ""),
+    ("AMS", "Amsterdam Schiphol", "Amsterdam", "Netherlands", ""),
+    ("FRA", "Frankfurt", "Frankfurt", "Germany", ""),
+    ("MUC", "Munich", "Munich", "Germany", ""),
+    ("BER", "Berlin Brandenburg", "Berlin", "Germany", ""),
+    ("ZRH", "Zurich", "Zurich", "Switzerland", ""),
+    ("GVA", "Geneva", "Geneva", "Switzerland", ""),
+    ("VIE", "Vienna International", "Vienna", "Austria", ""),
+    ("FCO", "Leonardo da Vinci-Fiumicino", "Rome", "Italy", "ROM"),
+    ("CIA", "Ciampino", "Rome", "Italy", "ROM"),
+    ("MXP", "Milan Malpensa", "Milan", "Italy", "MIL"),
+    ("LIN", "Milan Linate", "Milan", "Italy", "MIL"),
+    ("VCE", "Venice Marco Polo", "Venice", "Italy", ""),
+    ("NAP", "Naples International", "Naples", "Italy", ""),
+    ("FLR", "Florence Peretola", "Florence", "Italy", ""),
+    ("PSA", "Pisa International", "Pisa", "Italy", ""),
+    ("MAD", "Adolfo Suarez Madrid-Barajas", "Madrid", "Spain", ""),
+    ("BCN", "Josep Tarradellas Barcelona-El Prat", "Barcelona", "Spain", ""),
+    ("LIS", "Humberto Delgado", "Lisbon", "Portugal", ""),
+    ("ATH", "Athens International", "Athens", "Greece", ""),
+    ("JTR", "Santorini", "Santorini", "Greece", ""),
+    ("IST", "Istanbul", "Istanbul", "Turkey", "IST"),
+    ("SAW", "Sabiha Gokcen International", "Istanbul", "Turkey", "IST"),
+    ("CPH", "Copenhagen", "Copenhagen", "Denmark", ""),
+    ("ARN", "Stockholm Arlanda", "Stockholm", "Sweden", ""),
+    ("OSL", "Oslo Gardermoen", "Oslo", "Norway", ""),
+    ("KEF", "Keflavik International", "Reykjavik", "Iceland", ""),
+    ("PRG", "Vaclav Havel Prague", "Prague", "Czech Republic", ""),
+    # Middle East and Africa
+    ("DXB", "Dubai International", "Dubai", "United Arab Emirates", "DXB"),
+    ("DWC", "Al Maktoum International", "Dubai", "United Arab Emirates", "DXB"),
+    ("DOH", "Hamad International", "Doha", "Qatar", ""),
+    ("CAI", "Cairo International", "Cairo", "Egypt", ""),
+    ("RAK", "Marrakesh Menara", "Marrakesh", "Morocco", ""),
+    ("CPT", "Cape Town International", "Cape Town", "South Africa", ""),
+    ("JNB", "O. R. Tambo International", "Johannesburg", "South Africa", ""),
+    ("NBO", "Jomo Kenyatta International", "Nairobi", "Kenya", ""),
+    # Asia and Oceania
+    ("HND", "Tokyo Haneda", "Tokyo", "Japan", "TYO"),
+    ("NRT", "Narita International", "Tokyo", "Japan", "TYO"),
+    ("KIX", "Kansai International", "Osaka", "Japan", "OSA"),
+    ("ITM", "Osaka Itami", "Osaka", "Japan", "OSA"),
+    ("ICN", "Incheon International", "Seoul", "South Korea", "SEL"),
+    ("GMP", "Gimpo International", "Seoul", "South Korea", "SEL"),
+    ("PEK", "Beijing Capital International", "Beijing", "China", "BJS"),
+    ("PKX", "Beijing Daxing International", "Beijing", "China", "BJS"),
+    ("PVG", "Shanghai Pudong International", "Shanghai", "China", "SHA"),
+    ("SHA", "Shanghai Hongqiao International", "Shanghai", "China", "SHA"),
+    ("HKG", "Hong Kong International", "Hong Kong", "Hong Kong", ""),
+    ("TPE", "Taiwan Taoyuan International", "Taipei", "Taiwan", ""),
+    ("SIN", "Singapore Changi", "Singapore", "Singapore", ""),
+    ("BKK", "Suvarnabhumi", "Bangkok", "Thailand", "BKK"),
+    ("DMK", "Don Mueang International", "Bangkok", "Thailand", "BKK"),
+    ("HKT", "Phuket International", "Phuket", "Thailand", ""),
+    ("KUL", "Kuala Lumpur International", "Kuala Lumpur", "Malaysia", ""),
+    ("CGK", "Soekarno-Hatta International", "Jakarta", "Indonesia", ""),
+    ("DPS", "Ngurah Rai International", "Denpasar", "Indonesia", ""),
+    ("MNL", "Ninoy Aquino International", "Manila", "Philippines", ""),
+    ("SGN", "Tan Son Nhat International", "Ho Chi Minh City", "Vietnam", ""),
+    ("HAN", "Noi Bai International", "Hanoi", "Vietnam", ""),
+    ("DEL", "Indira Gandhi International", "Delhi", "India", ""),
+    ("BOM", "Chhatrapati Shivaji Maharaj International", "Mumbai", "India", ""),
+    ("BLR", "Kempegowda International", "Bangalore", "India", ""),
+    ("CMB", "Bandaranaike International", "Colombo", "Sri Lanka", ""),
+    ("MLE", "Velana International", "Male", "Maldives", ""),
+    ("KTM", "Tribhuvan International", "Kathmandu", "Nepal", ""),
+    ("SYD", "Sydney Kingsford Smith", "Sydney", "Australia", ""),
+    ("MEL", "Melbourne", "Melbourne", "Australia", ""),
+    ("BNE", "Brisbane", "Brisbane", "Australia", ""),
+    ("AKL", "Auckland", "Auckland", "New Zealand", ""),
+    ("ZQN", "Queenstown", "Queenstown", "New Zealand", ""),
+    ("PPT", "Faa'a International", "Papeete", "French Polynesia", ""),
+]
+
+# Regions, islands and common nicknames that are not city names
+ALIASES: Dict[str, List[str]] = {
+    "bali": ["DPS"],
+    "maldives": ["MLE"],
+    "swiss alps": ["ZRH", "GVA"],
+    "alps": ["ZRH", "GVA", "MUC"],
+    "nyc": ["JFK", "EWR", "LGA"],
+    "new york city": ["JFK", "EWR", "LGA"],
+    "la": ["LAX"],
+    "sf": ["SFO"],
+    "bay area": ["SFO"],
+    "washington dc": ["IAD", "DCA", "BWI"],
+    "dc": ["IAD", "DCA", "BWI"],
+    "tahiti": ["PPT"],
+    "bora bora": ["PPT"],
+    "phuket island": ["HKT"],
+    "amalfi coast": ["FCO", "NAP"],
+    "tuscany": ["FLR", "PSA"],
+    "iceland": ["KEF"],
+    "saigon": ["SGN"],
+    "bombay": ["BOM"],
+    "bengaluru": ["BLR"],
+}
+
+# Filler words ignored when matching names
+_STOPWORDS = {"the", "of", "international", "airport", "city"}
+
+_IATA_PATTERN = re.compile(r"^[A-Za-z]{3}$")
+
+# Minimum query length for prefix and fuzzy matching
+MIN_PREFIX_LENGTH = 3
+FUZZY_CUTOFF = 0.82
+
+
+def normalize(text: str) -> str:
+    """Lowercase, strip accents and punctuation, collapse whitespace."""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    text = re.sub(r"[^a-z0-9\s]", " ", text.lower())
+    return " ".join(text.split())
+
+
+class AirportResolver:
+    """Resolves city, region and airport names to IATA codes"""
+
+    def __init__(self, airports: List[Tuple[str, str, str, str, str]] = AIRPORTS,
+                 aliases: Dict[str, List[str]] = ALIASES):
+        self.airports = {row[0]: row for row in airports}
+        self._index: Dict[str, Tuple[str, ...]] = {}
+        self._countries: Dict[str, Tuple[str, ...]] = {}
+        self._metros: Dict[str, Tuple[str, ...]] = {}
+
+        for code, name, city, country, metro in airports:
+            self._add(self._index, normalize(city), code)
+            self._add(self._index, normalize(name), code)
+            self._add(self._countries, normalize(country), code)
+            if metro:
+                self._add(self._metros, metro, code)
+
+        for alias, codes in aliases.items():
+            self._index[normalize(alias)] = tuple(codes)
+
+        # Sorted keys back both the prefix search (bisect) and fuzzy matching
+        self._keys = sorted(self._index)
+        self.resolve_codes = lru_cache(maxsize=2048)(self._resolve)
+
+    @staticmethod
+    def _add(index: Dict[str, Tuple[str, ...]], key: str, code: str):
+        """Append a code to an index entry, keeping insertion order"""
+        if not key:
+            return
+        codes = index.get(key, ())
+        if code not in codes:
+            index[key] = codes + (code,)
+
+    def _prefix_match(self, query: str) -> Tuple[str, ...]:
+        """Return the codes of the first sorted key starting with query"""
+        position = bisect_left(self._keys, query)
+        if position < len(self._keys) and self._keys[position].startswith(query):
+            return self._index[self._keys[position]]
+        return ()
+
+    def _fuzzy_match(self, query: str) -> Tuple[str, ...]:
+        """Return the codes of the closest indexed key, if close enough"""
+        matches = get_close_matches(query, self._keys, n=1, cutoff=FUZZY_CUTOFF)
+        return self._index[matches[0]] if matches else ()
+
+    def _lookup(self, query: str) -> Tuple[str, ...]:
+        """Exact, then prefix, then fuzzy lookup of a normalized query"""
+        if query in self._index:
+            return self._index[query]
+        if len(query) < MIN_PREFIX_LENGTH:
+            return ()
+        return self._prefix_match(query) or self._fuzzy_match(query)
+
+    def _resolve(self, text: str) -> Tuple[str, ...]:
+        """Resolve text to a tuple of IATA codes (cached via resolve_codes)"""
+        raw = text.strip()
+        if _IATA_PATTERN.match(raw):
+            code = raw.upper()
+            if code in self.airports:
+                return (code,)
+            if code in self._metros:
+                return self._metros[code]
+            if raw.isupper():
+                return (code,)
+
+        query = normalize(raw)
+        if not query:
+            return ()
+
+        # "Tokyo, Japan" -> try the whole string, then each leading comma part
+        candidates = []
+        for candidate in [query] + [normalize(part) for part in raw.split(",")[:-1]]:
+            candidate = " ".join(w for w in candidate.split() if w not in _STOPWORDS)
+            if candidate and candidate not in candidates:
+                candidates.append(candidate)
+
+        # Exact matches on any candidate win over prefix/fuzzy matches
+        for candidate in candidates:
+            if candidate in self._index:
+                return self._index[candidate]
+        for candidate in candidates:
+            codes = self._lookup(candidate)
+            if codes:
+                return codes
+
+        # Fall back to the gateways of a bare country name ("Japan")
+        for part in reversed([normalize(p) for p in raw.split(",")]):
+            if part in self._countries:
+                return self._countries[part][:2]
+
+        return ()
+
+    def resolve(self, text: str) -> List[str]:
+        """Resolve free text to IATA codes, metro airports first-preferred"""
+        if not text:
+            return []
+        codes = list(self.resolve_codes(text))
+        if not codes:
+            logger.info(f"No airport match for '{text}'")
+        return codes
+
+    def resolve_primary(self, text: str) -> Optional[str]:
+        """Resolve free text to the single preferred IATA code"""
+        codes = self.resolve(text)
+        return codes[0] if codes else None
+
+
+# Global instance
+airport_resolver = AirportResolver()
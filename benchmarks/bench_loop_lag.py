@@ -0,0 +1,64 @@
+"""
+Event Loop Lag Benchmark
+Measures loop lag while large poll payloads are decoded and parsed inline vs. off-loop.
+
+Usage:
+    python benchmarks/bench_loop_lag.py [--payload recorded_poll.json.gz] [--requests 8]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx  # noqa: E402
+
+import decoding  # noqa: E402
+from flight_apis import FlightSearchAPI  # noqa: E402
+from loop_monitor import LoopLagMonitor  # noqa: E402
+from payloads import skyscanner_poll_payload  # noqa: E402
+
+
+async def run(body: bytes, requests: int, threshold: int) -> dict:
+    """Decode `requests` concurrent responses with the given offload threshold"""
+    decoding.OFFLOAD_THRESHOLD_BYTES = threshold
+    api = FlightSearchAPI()
+    monitor = LoopLagMonitor(interval=0.005, window=10000)
+    monitor.start()
+    await asyncio.sleep(0.05)
+
+    responses = [httpx.Response(200, content=body) for _ in range(requests)]
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    await asyncio.gather(*(
+        decoding.decode_json(response, api._parse_skyscanner_results) for response in responses
+    ))
+    elapsed = loop.time() - started
+
+    await asyncio.sleep(0.05)
+    await monitor.stop()
+    return dict(monitor.snapshot(), elapsed_ms=round(elapsed * 1000, 1))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[1])
+    parser.add_argument("--payload", help="recorded poll payload (.json or .json.gz)")
+    parser.add_argument("--itineraries", type=int, default=5000)
+    parser.add_argument("--requests", type=int, default=8)
+    args = parser.parse_args()
+
+    body = json.dumps(skyscanner_poll_payload(args.payload, args.itineraries)).encode()
+    print(f"Payload: {len(body) / 1024:.0f} KiB x {args.requests} concurrent responses, "
+          f"decoder: {decoding.loads.__module__}, pool: {decoding.OFFLOAD_EXECUTOR}")
+    print(f"{'mode':<10}{'p99 lag ms':>12}{'max lag ms':>12}{'elapsed ms':>12}")
+    for mode, threshold in (("inline", len(body) + 1), ("offload", 0)):
+        stats = asyncio.run(run(body, args.requests, threshold))
+        print(f"{mode:<10}{stats['p99_ms']:>12.1f}{stats['max_ms']:>12.1f}{stats['elapsed_ms']:>12.1f}")
+    decoding.shutdown_executor()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Metrics Overhead Benchmark
+Cost of a histogram observation and requests/second with request metrics on vs. off.
+
+Usage:
+    python benchmarks/bench_metrics.py [--requests 1000] [--rounds 5]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx  # noqa: E402
+
+import main  # noqa: E402
+import metrics  # noqa: E402
+
+logging.disable(logging.INFO)
+
+ENDPOINTS = [("GET", "/"), ("GET", "/destinations"), ("GET", "/weather/Lisbon")]
+
+
+def observe_cost_ns(number: int = 200000) -> float:
+    histogram = metrics.Histogram("bench_seconds", "benchmark", ("route",))
+    seconds = timeit.timeit(lambda: histogram.observe(0.0123, "/bench"), number=number)
+    return seconds / number * 1e9
+
+
+async def requests_per_second(client: httpx.AsyncClient, path: str, count: int) -> float:
+    await client.get(path)
+    start = time.perf_counter()
+    for _ in range(count):
+        await client.get(path)
+    return count / (time.perf_counter() - start)
+
+
+async def run(count: int, rounds: int):
+    print(f"Histogram.observe: {observe_cost_ns():.0f} ns per call")
+    print(f"Scrape render: {timeit.timeit(metrics.registry.render, number=100) * 10:.2f} ms\n")
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        print(f"{'endpoint':<28}{'off req/s':>12}{'on req/s':>12}{'overhead':>10}")
+        for method, path in ENDPOINTS:
+            # Alternate modes and keep the best round of each, so warm-up and noise hit both alike
+            off = on = 0.0
+            for _ in range(rounds):
+                metrics.METRICS_ENABLED = False
+                off = max(off, await requests_per_second(client, path, count))
+                metrics.METRICS_ENABLED = True
+                on = max(on, await requests_per_second(client, path, count))
+            print(f"{method + ' ' + path:<28}{off:>12,.0f}{on:>12,.0f}{(off / on - 1) * 100:>9.1f}%")
+
+
+def main_():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[1])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(run(args.requests, args.rounds))
+
+
+if __name__ == "__main__":
+    main_()
@@ -0,0 +1,109 @@
+"""
+Result Record Benchmark
+Memory per 10k results and serialization throughput: nested dicts vs. __slots__ records.
+
+Usage:
+    python benchmarks/bench_records.py [--count 10000]
+"""
+
+import argparse
+import copy
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from records import FlightResult, serialize  # noqa: E402
+
+AIRLINES = ["Delta Airlines", "American Airlines", "United Airlines", "Lufthansa", "Air France", "ANA"]
+SOURCES = ["Amadeus", "Skyscanner"]
+
+
+def make_fields(i: int) -> dict:
+    # Built with str() so repeated values are distinct objects, as after JSON decoding
+    return dict(
+        id=f"amadeus_{i}",
+        airline=str(AIRLINES[i % len(AIRLINES)]).join(["", ""]),
+        flight_number=f"XX {i % 9000}",
+        departure_time=f"2024-12-{1 + i % 28:02d}T{i % 24:02d}:00:00",
+        arrival_time=f"2024-12-{1 + i % 28:02d}T{(i + 5) % 24:02d}:30:00",
+        duration=f"{i % 14}h 30m",
+        price_usd=float(100 + i % 1500),
+        stops=i % 3,
+        aircraft="Commercial Aircraft".join(["", ""]),
+        booking_link=f"https://www.amadeus.com/flights/{i}",
+        source=SOURCES[i % 2].join(["", ""])
+    )
+
+
+def make_dicts(count: int) -> list:
+    """Legacy shape: nested price map precomputed for three currencies"""
+    flights = []
+    for i in range(count):
+        fields = make_fields(i)
+        usd = fields.pop("price_usd")
+        fields["price"] = {"USD": usd, "EUR": round(usd * 0.85, 2), "GBP": round(usd * 0.73, 2)}
+        flights.append(fields)
+    return flights
+
+
+def make_records(count: int) -> list:
+    return [FlightResult(**make_fields(i)) for i in range(count)]
+
+
+def measure_memory(factory, count: int) -> float:
+    """Bytes allocated per result while building `count` results"""
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    results = factory(count)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    del results
+    return allocated / count
+
+
+def legacy_serialize(flights: list) -> bytes:
+    """Legacy path: copy, convert prices in place, encode"""
+    flights = copy.deepcopy(flights)
+    for flight in flights:
+        usd = flight["price"]["USD"]
+        flight["price"]["EUR"] = round(usd * 0.85, 2)
+        flight["price"]["GBP"] = round(usd * 0.73, 2)
+    return json.dumps(flights).encode()
+
+
+def record_serialize(records: list) -> bytes:
+    return json.dumps(serialize(records)).encode()
+
+
+def throughput(func, data, repeat: int = 5) -> float:
+    """Results serialized per second (best of `repeat`)"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(data)
+        best = min(best, time.perf_counter() - start)
+    return len(data) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[1])
+    parser.add_argument("--count", type=int, default=10000)
+    args = parser.parse_args()
+
+    dict_bytes = measure_memory(make_dicts, args.count)
+    record_bytes = measure_memory(make_records, args.count)
+    dict_rate = throughput(legacy_serialize, make_dicts(args.count))
+    record_rate = throughput(record_serialize, make_records(args.count))
+
+    print(f"{'shape':<10}{'bytes/result':>14}{'MiB per ' + str(args.count):>16}{'serialized/s':>16}")
+    for name, per_result, rate in (("dict", dict_bytes, dict_rate), ("record", record_bytes, record_rate)):
+        print(f"{name:<10}{per_result:>14.0f}{per_result * args.count / 2**20:>16.2f}{rate:>16,.0f}")
+
+
+if __name__ == "__main__":
+    main()
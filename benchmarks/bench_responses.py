@@ -0,0 +1,97 @@
+"""
+Response Rendering Benchmark
+Requests/second for static and list endpoints: plain dict responses vs. fast, pre-serialized ones.
+
+Usage:
+    python benchmarks/bench_responses.py [--requests 2000]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+from fastapi.middleware.cors import CORSMiddleware  # noqa: E402
+
+import main  # noqa: E402
+from records import serialize  # noqa: E402
+
+logging.disable(logging.INFO)
+
+HOTEL_SEARCH = {"destination": "Rome", "check_in": "2024-12-01", "check_out": "2024-12-08", "guests": 2}
+
+
+def build_legacy_app() -> FastAPI:
+    """The same endpoints returning plain dicts (jsonable_encoder + stdlib JSONResponse)"""
+    legacy = FastAPI()
+    # Same middleware stack as the real app so only rendering differs
+    legacy.add_middleware(CORSMiddleware, allow_origins=["*"], allow_credentials=True,
+                          allow_methods=["*"], allow_headers=["*"])
+
+    @legacy.get("/")
+    async def root():
+        return {"message": "Travel AI API", "version": "1.0.0"}
+
+    @legacy.get("/destinations")
+    async def destinations():
+        data = main.TRAVEL_DATA
+        return {
+            "success": True,
+            "destinations": data["domestic"]["beach"] + data["domestic"]["mountain"]
+            + data["domestic"]["city"] + data["international"]["beach"]
+        }
+
+    @legacy.get("/currency/rates")
+    async def rates(base_currency: str = "USD"):
+        rates = await main.currency_api.get_exchange_rates(base_currency)
+        return {"success": True, "rates": rates, "source": rates.get("source", "Mock Data")}
+
+    @legacy.post("/hotels")
+    async def hotels(search: main.HotelSearch):
+        hotels = await main.get_real_hotels(search)
+        return {"success": True, "hotels": serialize(hotels), "search": search.model_dump()}
+
+    return legacy
+
+
+async def requests_per_second(app: FastAPI, method: str, path: str, count: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        kwargs = {"json": HOTEL_SEARCH} if method == "POST" else {}
+        await client.request(method, path, **kwargs)
+        start = time.perf_counter()
+        for _ in range(count):
+            await client.request(method, path, **kwargs)
+        return count / (time.perf_counter() - start)
+
+
+async def run(count: int):
+    legacy = build_legacy_app()
+    endpoints = [
+        ("GET", "/"),
+        ("GET", "/destinations"),
+        ("GET", "/currency/rates?base_currency=EUR"),
+        ("POST", "/hotels")
+    ]
+    print(f"{'endpoint':<36}{'before req/s':>14}{'after req/s':>14}{'speedup':>10}")
+    for method, path in endpoints:
+        before = await requests_per_second(legacy, method, path, count)
+        after = await requests_per_second(main.app, method, path, count)
+        print(f"{method + ' ' + path:<36}{before:>14,.0f}{after:>14,.0f}{after / before:>9.2f}x")
+
+
+def main_():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[1])
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+    asyncio.run(run(args.requests))
+
+
+if __name__ == "__main__":
+    main_()
@@ -0,0 +1,91 @@
+"""
+Skyscanner Parser Benchmark
+Compares the lookup-table parser against the original per-option parser on a large poll payload.
+
+Usage:
+    python benchmarks/bench_skyscanner_parser.py [--payload recorded_poll.json.gz] [--itineraries 5000]
+"""
+
+import argparse
+import os
+import sys
+import time
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flight_apis import FlightSearchAPI  # noqa: E402
+from payloads import skyscanner_poll_payload  # noqa: E402
+
+
+def legacy_parse(api: FlightSearchAPI, results: Dict) -> List[Dict]:
+    """Original parser: re-resolves legs and segments for every pricing option"""
+    flights = []
+    results_data = results.get("content", {}).get("results", {})
+    for itinerary_id, itinerary in results_data.get("itineraries", {}).items():
+        for option in itinerary.get("pricingOptions", []):
+            price = option.get("price", {})
+            agent = option.get("agentIds", [""])[0]
+            leg_id = itinerary.get("legIds", [""])[0]
+            leg = results_data.get("legs", {}).get(leg_id, {})
+            segments = []
+            for segment_id in leg.get("segmentIds", []):
+                segment = results_data.get("segments", {}).get(segment_id, {})
+                segments.append({
+                    "departure": segment.get("departureDateTime"),
+                    "arrival": segment.get("arrivalDateTime"),
+                    "origin": segment.get("originPlaceId"),
+                    "destination": segment.get("destinationPlaceId"),
+                    "carrier": segment.get("marketingCarrierId")
+                })
+            flights.append({
+                "id": f"skyscanner_{itinerary_id}_{agent}",
+                "airline": agent,
+                "flight_number": f"{agent} Flight",
+                "departure_time": segments[0].get("departure") if segments else "",
+                "arrival_time": segments[-1].get("arrival") if segments else "",
+                "duration": api._calculate_duration(segments),
+                "price": {"USD": price.get("amount", 0)},
+                "stops": len(segments) - 1,
+                "aircraft": "Commercial Aircraft",
+                "booking_link": option.get("url", ""),
+                "source": "Skyscanner"
+            })
+    return sorted(flights, key=lambda x: x["price"]["USD"])[:15]
+
+
+def timed(func, repeat: int) -> float:
+    """Best wall time of `repeat` runs, in milliseconds"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[1])
+    parser.add_argument("--payload", help="recorded poll payload (.json or .json.gz)")
+    parser.add_argument("--itineraries", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    payload = skyscanner_poll_payload(args.payload, args.itineraries)
+    results = payload["content"]["results"]
+    options = sum(len(i.get("pricingOptions", [])) for i in results["itineraries"].values())
+    print(f"Payload: {len(results['itineraries'])} itineraries, {options} pricing options, "
+          f"{len(results['legs'])} legs, {len(results['segments'])} segments")
+
+    api = FlightSearchAPI()
+    legacy_ms = timed(lambda: legacy_parse(api, payload), args.repeat)
+    current_ms = timed(lambda: api._parse_skyscanner_results(payload), args.repeat)
+
+    print(f"{'parser':<16}{'best ms':>10}{'options/s':>14}")
+    for name, ms in (("legacy", legacy_ms), ("lookup-table", current_ms)):
+        print(f"{name:<16}{ms:>10.1f}{options / (ms / 1000):>14,.0f}")
+    print(f"speedup: {legacy_ms / current_ms:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
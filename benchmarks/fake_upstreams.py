@@ -0,0 +1,293 @@
+"""
+Fake Upstream Servers
+Stand-ins for Groq, Amadeus, Skyscanner, WeatherAPI and exchangerate.host with tunable latency, errors and payload sizes.
+
+Usage:
+    python benchmarks/fake_upstreams.py [--port 9100] [--config fake_upstreams.json]
+                                        [--latency-ms 50] [--error-rate 0.0] [--seed 7]
+
+Point the app at it with the variables printed by `--print-env` (base URLs plus dummy API keys).
+Per-provider settings in the JSON config override the command-line defaults, e.g.
+    {"skyscanner": {"latency_ms": 400, "sigma": 0.8, "pending_polls": 2, "size": 5000},
+     "groq": {"latency_ms": 900, "error_rate": 0.02}}
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi import FastAPI, Request  # noqa: E402
+from fastapi.responses import JSONResponse, Response  # noqa: E402
+
+from payloads import make_skyscanner_poll  # noqa: E402
+
+PROVIDERS = ("groq", "amadeus", "skyscanner", "weatherapi", "exchangerate")
+
+# Default payload sizes: choices/offers/itineraries/forecast days per response
+DEFAULT_SIZES = {"groq": 3, "amadeus": 50, "skyscanner": 500, "weatherapi": 7, "exchangerate": 30}
+
+CURRENCIES = ["USD", "EUR", "GBP", "CAD", "AUD", "JPY", "CHF", "CNY", "INR", "MXN", "BRL", "ZAR", "SGD",
+              "HKD", "NZD", "SEK", "NOK", "DKK", "PLN", "THB", "IDR", "KRW", "TRY", "AED", "ILS",
+              "CZK", "HUF", "PHP", "MYR", "EGP"]
+CONDITIONS = ["Sunny", "Partly cloudy", "Overcast", "Light rain", "Clear"]
+
+
+class Behaviour:
+    """Latency, failure and payload settings for one fake provider
+
+    Latency is log-normal around latency_ms (sigma 0 makes it fixed), so
+    the tail can be tuned independently of the median.
+    """
+
+    def __init__(self, latency_ms: float = 50.0, sigma: float = 0.5, error_rate: float = 0.0,
+                 error_status: int = 503, size: int = 10, pending_polls: int = 1):
+        self.latency_ms = latency_ms
+        self.sigma = sigma
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.size = size
+        self.pending_polls = pending_polls
+
+    def delay(self, rng: random.Random) -> float:
+        if self.latency_ms <= 0:
+            return 0.0
+        factor = rng.lognormvariate(0.0, self.sigma) if self.sigma > 0 else 1.0
+        return self.latency_ms * factor / 1000
+
+    def fails(self, rng: random.Random) -> bool:
+        return self.error_rate > 0 and rng.random() < self.error_rate
+
+
+def load_behaviours(config: Optional[Dict] = None, latency_ms: float = 50.0, error_rate: float = 0.0,
+                    sigma: float = 0.5) -> Dict[str, Behaviour]:
+    """Behaviour per provider: command-line defaults overridden by the config's entries"""
+    config = config or {}
+    return {
+        provider: Behaviour(**{
+            "latency_ms": latency_ms, "sigma": sigma, "error_rate": error_rate,
+            "size": DEFAULT_SIZES[provider], **config.get(provider, {})
+        })
+        for provider in PROVIDERS
+    }
+
+
+def fake_env(base_url: str) -> Dict[str, str]:
+    """Environment that points the app's provider clients at a fake server"""
+    return {
+        "GROQ_API_KEY": "fake-groq-key",
+        "GROQ_BASE_URL": f"{base_url}/groq/openai/v1/chat/completions",
+        "AMADEUS_CLIENT_ID": "fake-client",
+        "AMADEUS_CLIENT_SECRET": "fake-secret",
+        "AMADEUS_BASE_URL": f"{base_url}/amadeus",
+        "SKYSCANNER_API_KEY": "fake-skyscanner-key",
+        "SKYSCANNER_BASE_URL": f"{base_url}/skyscanner/apiservices/v3",
+        "SKYSCANNER_POLL_INTERVAL_SECONDS": "0.05",
+        "WEATHER_API_KEY": "fake-weather-key",
+        "WEATHER_BASE_URL": f"{base_url}/weatherapi/v1",
+        "CURRENCY_API_KEY": "fake-currency-key",
+        "CURRENCY_BASE_URL": f"{base_url}/exchangerate"
+    }
+
+
+def groq_completion(body: Dict, size: int, rng: random.Random) -> Dict:
+    """Chat completion; JSON recommendations when the system prompt asks for JSON"""
+    messages = body.get("messages", [])
+    wants_json = any("valid JSON" in message.get("content", "") for message in messages
+                     if message.get("role") == "system")
+    if wants_json:
+        content = json.dumps({"destinations": [
+            {
+                "name": f"Destination {index}",
+                "country": "Testland",
+                "type": "beach",
+                "description": "A stand-in destination " * 4,
+                "total_cost_per_person": f"{rng.randrange(800, 3000)} USD",
+                "cost_breakdown": {"flight": "500 USD", "hotel": "700 USD", "daily_living": "300 USD"},
+                "best_time_to_visit": "April-October",
+                "highlights": ["Beaches", "Food", "Culture"],
+                "why_perfect": "Fits the budget and the travel dates",
+                "travel_tips": "Book early"
+            }
+            for index in range(size)
+        ]})
+    else:
+        content = "Great! Where would you like to travel from? " + "Tell me more about your plans. " * size
+    return {
+        "id": f"chatcmpl-{rng.getrandbits(32):08x}",
+        "object": "chat.completion",
+        "model": body.get("model", "fake"),
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 100, "completion_tokens": 100, "total_tokens": 200}
+    }
+
+
+def amadeus_offers(origin: str, destination: str, date: str, size: int, rng: random.Random) -> Dict:
+    start = datetime.fromisoformat(date) if date else datetime(2024, 12, 15)
+    offers = []
+    for index in range(size):
+        departure = start + timedelta(minutes=rng.randrange(6 * 60, 22 * 60, 5))
+        hours = rng.randrange(2, 16)
+        carrier = rng.choice(["DL", "AA", "UA", "LH", "AF", "NH", "BA"])
+        offers.append({
+            "id": str(index + 1),
+            "itineraries": [{
+                "duration": f"PT{hours}H{rng.randrange(0, 60, 5)}M",
+                "segments": [{
+                    "carrierCode": carrier,
+                    "number": str(rng.randrange(10, 9999)),
+                    "departure": {"iataCode": origin, "at": departure.isoformat()},
+                    "arrival": {"iataCode": destination, "at": (departure + timedelta(hours=hours)).isoformat()}
+                }]
+            }],
+            "price": {"currency": "USD", "total": f"{rng.uniform(120, 1800):.2f}"}
+        })
+    return {"meta": {"count": size}, "data": offers}
+
+
+def weather_payload(location: str, days: int, rng: random.Random) -> Dict:
+    temp_c = round(rng.uniform(-5, 35), 1)
+    payload = {
+        "location": {"name": location.title(), "country": "Testland", "localtime": "2024-12-15 12:00"},
+        "current": {
+            "temp_c": temp_c, "temp_f": round(temp_c * 9 / 5 + 32, 1),
+            "condition": {"text": rng.choice(CONDITIONS), "icon": "//cdn.weatherapi.com/116.png"},
+            "humidity": rng.randrange(20, 95), "wind_kph": round(rng.uniform(0, 40), 1),
+            "wind_mph": round(rng.uniform(0, 25), 1), "feelslike_c": temp_c, "feelslike_f": round(temp_c * 9 / 5 + 32, 1),
+            "uv": rng.randrange(0, 11), "last_updated": "2024-12-15 12:00"
+        }
+    }
+    if days:
+        start = datetime(2024, 12, 15)
+        payload["forecast"] = {"forecastday": [
+            {
+                "date": (start + timedelta(days=day)).date().isoformat(),
+                "day": {
+                    "maxtemp_c": temp_c + 3, "mintemp_c": temp_c - 4, "maxtemp_f": temp_c * 9 / 5 + 37,
+                    "mintemp_f": temp_c * 9 / 5 + 25, "condition": {"text": rng.choice(CONDITIONS), "icon": ""},
+                    "totalprecip_mm": round(rng.uniform(0, 12), 1), "totalprecip_in": 0.1,
+                    "avghumidity": rng.randrange(30, 90), "uv": rng.randrange(0, 11)
+                }
+            }
+            for day in range(days)
+        ]}
+    return payload
+
+
+def exchange_rates(base: str, size: int, rng: random.Random) -> Dict:
+    rates = {currency: round(rng.uniform(0.5, 2.0), 4) for currency in CURRENCIES[:max(1, size)]}
+    rates[base] = 1.0
+    return {"success": True, "base": base, "date": "2024-12-15", "rates": rates}
+
+
+def create_app(behaviours: Dict[str, Behaviour], seed: int = 7) -> FastAPI:
+    """Fake provider API; each provider is served under its own path prefix"""
+    app = FastAPI(title="Fake upstreams")
+    rng = random.Random(seed)
+    polls: Dict[str, int] = {}
+    skyscanner_payloads: Dict[int, bytes] = {}
+
+    async def simulate(provider: str) -> Optional[Response]:
+        """Sleep for the provider's latency; return an error response if this call should fail"""
+        behaviour = behaviours[provider]
+        await asyncio.sleep(behaviour.delay(rng))
+        if behaviour.fails(rng):
+            return JSONResponse({"error": f"simulated {provider} failure"}, status_code=behaviour.error_status)
+        return None
+
+    @app.post("/groq/openai/v1/chat/completions")
+    async def groq(request: Request):
+        return await simulate("groq") or groq_completion(await request.json(), behaviours["groq"].size, rng)
+
+    @app.post("/amadeus/v1/security/oauth2/token")
+    async def amadeus_token():
+        return await simulate("amadeus") or {"access_token": "fake-amadeus-token", "expires_in": 1799}
+
+    @app.get("/amadeus/v2/shopping/flight-offers")
+    async def amadeus_search(originLocationCode: str = "", destinationLocationCode: str = "", departureDate: str = ""):
+        return await simulate("amadeus") or amadeus_offers(
+            originLocationCode, destinationLocationCode, departureDate, behaviours["amadeus"].size, rng)
+
+    @app.post("/skyscanner/apiservices/v3/flights/live/search/create")
+    async def skyscanner_create():
+        error = await simulate("skyscanner")
+        if error:
+            return error
+        token = f"session-{rng.getrandbits(48):012x}"
+        polls[token] = behaviours["skyscanner"].pending_polls
+        return {"sessionToken": token, "status": "RESULT_STATUS_INCOMPLETE"}
+
+    @app.get("/skyscanner/apiservices/v3/flights/live/search/poll/{token}")
+    async def skyscanner_poll(token: str):
+        error = await simulate("skyscanner")
+        if error:
+            return error
+        remaining = polls.get(token, 0)
+        if remaining > 0:
+            polls[token] = remaining - 1
+            return JSONResponse({"sessionToken": token, "status": "RESULT_STATUS_INCOMPLETE"}, status_code=202)
+        polls.pop(token, None)
+        size = behaviours["skyscanner"].size
+        # Generating large polls is slow, so each size is built once and replayed
+        if size not in skyscanner_payloads:
+            skyscanner_payloads[size] = json.dumps(make_skyscanner_poll(size), separators=(",", ":")).encode()
+        return Response(skyscanner_payloads[size], media_type="application/json")
+
+    @app.get("/weatherapi/v1/current.json")
+    async def weather_current(q: str = ""):
+        return await simulate("weatherapi") or weather_payload(q, 0, rng)
+
+    @app.get("/weatherapi/v1/forecast.json")
+    async def weather_forecast(q: str = "", days: int = 7):
+        return await simulate("weatherapi") or weather_payload(q, min(days, behaviours["weatherapi"].size), rng)
+
+    @app.get("/exchangerate/convert")
+    async def convert(amount: float = 1.0, to: str = "EUR"):
+        return await simulate("exchangerate") or {
+            "success": True, "query": {"to": to, "amount": amount},
+            "info": {"rate": 0.85}, "result": round(amount * 0.85, 2), "date": "2024-12-15"
+        }
+
+    @app.get("/exchangerate/{path}")
+    async def rates(path: str, base: str = "USD"):
+        # /latest and /{date} share one shape
+        return await simulate("exchangerate") or exchange_rates(base, behaviours["exchangerate"].size, rng)
+
+    return app
+
+
+def main_():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--config", help="JSON file with per-provider settings")
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--sigma", type=float, default=0.5, help="log-normal latency spread (0 = fixed)")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--print-env", action="store_true", help="print the app environment and exit")
+    args = parser.parse_args()
+
+    if args.print_env:
+        for key, value in fake_env(f"http://{args.host}:{args.port}").items():
+            print(f"{key}={value}")
+        return
+
+    config = None
+    if args.config:
+        with open(args.config, encoding="utf-8") as f:
+            config = json.load(f)
+    behaviours = load_behaviours(config, args.latency_ms, args.error_rate, args.sigma)
+
+    import uvicorn
+    uvicorn.run(create_app(behaviours, args.seed), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main_()
@@ -0,0 +1,323 @@
+"""
+End-to-End Load Test
+Mixed traffic against the app on fake upstreams, reporting throughput and p50/p95/p99 per endpoint against a stored baseline.
+
+Usage:
+    python benchmarks/load_test.py [--duration 120] [--users 8] [--threshold 0.2] [--confidence-z 2.33]
+                                   [--save-baseline] [--baseline benchmarks/baselines/load_test.json]
+
+Starts benchmarks/fake_upstreams.py and the app (uvicorn) as subprocesses,
+runs the workload, prints a report and exits non-zero if any endpoint's
+p95 latency or throughput regressed by more than --threshold against the
+baseline beyond what its sample size can explain (see compare), or if
+there is no baseline. --save-baseline records the run, latencies
+included, as the new baseline instead.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+import httpx  # noqa: E402
+
+from fake_upstreams import fake_env  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baselines", "load_test.json")
+
+ORIGINS = ["New York", "Boston", "Chicago", "London", "San Francisco", "Toronto"]
+DESTINATIONS = ["Tokyo, Japan", "Paris, France", "Bali, Indonesia", "Rome, Italy", "Cancun, Mexico",
+                "Barcelona, Spain", "Sydney, Australia", "Reykjavik, Iceland"]
+CITIES = ["Lisbon", "Oslo", "Kyoto", "Denver", "Nairobi", "Lima", "Hanoi", "Prague", "Austin", "Cairo",
+          "Seoul", "Dublin", "Quito", "Perth", "Zurich", "Havana", "Manila", "Krakow", "Boise", "Tunis"]
+CURRENCIES = ["USD", "EUR", "GBP", "CAD", "AUD"]
+CHAT_TURNS = [
+    "Hi! I'm traveling from Boston",
+    "International please",
+    "Somewhere with a beach and islands",
+    "4 people",
+    "$3000 per person",
+    "December 2024 for 7 days",
+    "No other preferences"
+]
+
+
+class Recorder:
+    """Latencies and failures per endpoint label"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    async def call(self, client: httpx.AsyncClient, label: str, method: str, path: str, **kwargs) -> Optional[Dict]:
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, path, **kwargs)
+            ok = response.status_code < 400
+        except httpx.HTTPError:
+            response, ok = None, False
+        self.latencies[label].append(time.perf_counter() - start)
+        if not ok:
+            self.errors[label] += 1
+            return None
+        return response.json()
+
+
+def random_date(rng: random.Random) -> str:
+    return f"2024-12-{rng.randrange(1, 29):02d}"
+
+
+async def chat_session(client: httpx.AsyncClient, recorder: Recorder, rng: random.Random):
+    session_id = None
+    for message in CHAT_TURNS:
+        payload = {"message": message, "session_id": session_id}
+        data = await recorder.call(client, "POST /chat", "POST", "/chat", json=payload)
+        if data is None:
+            return
+        session_id = data.get("session_id")
+
+
+async def recommendations(client: httpx.AsyncClient, recorder: Recorder, rng: random.Random):
+    await recorder.call(client, "POST /recommendations", "POST", "/recommendations", json={
+        "budget_per_person": str(rng.choice([1500, 3000, 5000])),
+        "people_count": str(rng.randrange(1, 5)),
+        "travel_from": rng.choice(ORIGINS),
+        "travel_type": rng.choice(["domestic", "international"]),
+        "destination_type": rng.choice(["beach", "mountain", "city"]),
+        "travel_dates": random_date(rng)
+    })
+
+
+async def flights(client: httpx.AsyncClient, recorder: Recorder, rng: random.Random):
+    await recorder.call(client, "POST /flights", "POST", "/flights", json={
+        "origin": rng.choice(ORIGINS),
+        "destination": rng.choice(DESTINATIONS),
+        "departure_date": random_date(rng),
+        "passengers": rng.randrange(1, 4)
+    })
+
+
+async def cost_analysis(client: httpx.AsyncClient, recorder: Recorder, rng: random.Random):
+    departure = rng.randrange(1, 20)
+    await recorder.call(client, "POST /cost-analysis", "POST", "/cost-analysis", json={
+        "origin": rng.choice(ORIGINS),
+        "destination": rng.choice(DESTINATIONS),
+        "departure_date": f"2024-12-{departure:02d}",
+        "return_date": f"2024-12-{departure + rng.randrange(3, 9):02d}",
+        "guests": rng.randrange(1, 4)
+    })
+
+
+async def weather(client: httpx.AsyncClient, recorder: Recorder, rng: random.Random):
+    await recorder.call(client, "GET /weather/{location}", "GET", f"/weather/{rng.choice(CITIES)}")
+
+
+async def currency(client: httpx.AsyncClient, recorder: Recorder, rng: random.Random):
+    await recorder.call(client, "GET /currency/rates", "GET", "/currency/rates",
+                        params={"base_currency": rng.choice(CURRENCIES)})
+
+
+# Scenario -> relative weight in the traffic mix
+MIX = [(chat_session, 2), (recommendations, 1), (flights, 3), (cost_analysis, 2), (weather, 3), (currency, 3)]
+
+
+async def virtual_user(base_url: str, recorder: Recorder, deadline: float, seed: int):
+    rng = random.Random(seed)
+    scenarios, weights = zip(*MIX)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60.0) as client:
+        while time.perf_counter() < deadline:
+            await rng.choices(scenarios, weights)[0](client, recorder, rng)
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(recorder: Recorder, elapsed: float) -> Dict[str, Dict]:
+    report = {}
+    for label, latencies in sorted(recorder.latencies.items()):
+        ordered = sorted(latencies)
+        report[label] = {
+            "requests": len(ordered),
+            "errors": recorder.errors.get(label, 0),
+            "throughput_rps": round(len(ordered) / elapsed, 2),
+            "p50_ms": round(percentile(ordered, 0.50) * 1000, 2),
+            "p95_ms": round(percentile(ordered, 0.95) * 1000, 2),
+            "p99_ms": round(percentile(ordered, 0.99) * 1000, 2),
+            "latencies_ms": [round(latency * 1000, 1) for latency in ordered]
+        }
+    return report
+
+
+def print_report(report: Dict[str, Dict]):
+    print(f"{'endpoint':<26}{'requests':>9}{'errors':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for label, row in report.items():
+        print(f"{label:<26}{row['requests']:>9}{row['errors']:>8}{row['throughput_rps']:>9.1f}"
+              f"{row['p50_ms']:>9.1f}{row['p95_ms']:>9.1f}{row['p99_ms']:>9.1f}")
+
+
+def p95_bounds(latencies_ms: List[float], z: float) -> Tuple[float, float]:
+    """Distribution-free confidence bounds on p95 from its sample: the order statistics
+    z standard errors (sqrt(p(1-p)/n)) either side of rank 0.95n"""
+    spread = z * math.sqrt(0.95 * 0.05 / max(len(latencies_ms), 1))
+    return (percentile(latencies_ms, max(0.0, 0.95 - spread)), percentile(latencies_ms, min(1.0, 0.95 + spread)))
+
+
+def compare(report: Dict[str, Dict], baseline: Dict[str, Dict], threshold: float, z: float = 2.33) -> List[str]:
+    """Regressions beyond threshold that sampling noise cannot explain
+
+    p95 regresses when even the run's lower confidence bound is more than
+    threshold above the baseline's upper bound; throughput when it drops by
+    more than threshold plus z/sqrt(requests). Few samples widen the bounds
+    rather than excluding the endpoint.
+    """
+    regressions = []
+    for label, base in baseline.items():
+        row = report.get(label)
+        if row is None or not row["requests"]:
+            regressions.append(f"{label}: no requests completed (baseline {base['requests']})")
+            continue
+        run_low, _ = p95_bounds(row["latencies_ms"], z)
+        _, base_high = p95_bounds(base["latencies_ms"], z)
+        if base_high > 0 and run_low > base_high * (1 + threshold):
+            regressions.append(f"{label}: p95 {row['p95_ms']:.1f} ms vs baseline {base['p95_ms']:.1f} ms "
+                               f"(at least {run_low:.1f} ms vs at most {base_high:.1f} ms)")
+        allowed = min(0.9, threshold + z / math.sqrt(min(row["requests"], base["requests"])))
+        if row["throughput_rps"] < base["throughput_rps"] * (1 - allowed):
+            regressions.append(f"{label}: {row['throughput_rps']:.1f} req/s vs baseline "
+                               f"{base['throughput_rps']:.1f} req/s (allowed -{allowed:.0%})")
+    return regressions
+
+
+def wait_ready(url: str, process: subprocess.Popen, timeout: float = 30.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{url} exited with code {process.returncode}")
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} did not start within {timeout:.0f}s")
+
+
+def start_servers(app_port: int, upstream_port: int, upstream_args: List[str]) -> List[subprocess.Popen]:
+    upstream = subprocess.Popen(
+        [sys.executable, os.path.join(BENCH_DIR, "fake_upstreams.py"), "--port", str(upstream_port), *upstream_args])
+    processes = [upstream]
+    try:
+        wait_ready(f"http://127.0.0.1:{upstream_port}/docs", upstream)
+        env = {**os.environ, **fake_env(f"http://127.0.0.1:{upstream_port}"), "LOG_LEVEL": "WARNING"}
+        app = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(app_port),
+             "--log-level", "warning", "--no-access-log"],
+            cwd=ROOT_DIR, env=env)
+        processes.append(app)
+        wait_ready(f"http://127.0.0.1:{app_port}/health", app)
+    except Exception:
+        stop_servers(processes)
+        raise
+    return processes
+
+
+def stop_servers(processes: List[subprocess.Popen]):
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+async def run_load(base_url: str, users: int, duration: float, warmup: float, seed: int) -> Dict[str, Dict]:
+    if warmup > 0:
+        await asyncio.gather(*(virtual_user(base_url, Recorder(), time.perf_counter() + warmup, seed + 1000 + user)
+                               for user in range(users)))
+    recorder = Recorder()
+    start = time.perf_counter()
+    await asyncio.gather(*(virtual_user(base_url, recorder, start + duration, seed + user) for user in range(users)))
+    return summarize(recorder, time.perf_counter() - start)
+
+
+def main_():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[1])
+    parser.add_argument("--duration", type=float, default=120.0, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=5.0, help="unmeasured seconds before the run")
+    parser.add_argument("--users", type=int, default=8, help="concurrent virtual users")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--app-port", type=int, default=8765)
+    parser.add_argument("--upstream-port", type=int, default=9100)
+    parser.add_argument("--upstream-latency-ms", type=float, default=50.0)
+    parser.add_argument("--upstream-config", help="per-provider JSON config for fake_upstreams.py")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed relative regression")
+    parser.add_argument("--confidence-z", type=float, default=2.33,
+                        help="standard errors of sampling noise allowed on top of --threshold")
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args()
+
+    upstream_args = ["--latency-ms", str(args.upstream_latency_ms)]
+    if args.upstream_config:
+        upstream_args += ["--config", args.upstream_config]
+
+    processes = start_servers(args.app_port, args.upstream_port, upstream_args)
+    try:
+        report = asyncio.run(run_load(f"http://127.0.0.1:{args.app_port}", args.users,
+                                      args.duration, args.warmup, args.seed))
+    finally:
+        stop_servers(processes)
+
+    print_report(report)
+    sparse = [label for label, row in report.items() if row["requests"] < 200]
+    if sparse:
+        print(f"\nFewer than 200 requests, so only large regressions can be told from noise: "
+              f"{', '.join(sparse)} (raise --duration to tighten the gate)")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({
+                "settings": {key: getattr(args, key) for key in ("duration", "users", "seed", "upstream_latency_ms")},
+                "machine": {"python": platform.python_version(), "cpus": os.cpu_count(), "platform": platform.platform()},
+                "endpoints": report
+            }, f, indent=2)
+        print(f"\nBaseline saved to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline to create one")
+        sys.exit(1)
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    settings = {key: getattr(args, key) for key in ("duration", "users", "seed", "upstream_latency_ms")}
+    if baseline.get("settings") != settings:
+        print(f"\nWarning: baseline was recorded with {baseline.get('settings')}, this run used {settings}")
+    regressions = compare(report, baseline["endpoints"], args.threshold, args.confidence_z)
+    if regressions:
+        print(f"\nRegressions beyond {args.threshold:.0%}:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print(f"\nNo regressions beyond {args.threshold:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main_()
@@ -0,0 +1,306 @@
+"""
+Hot-Path Microbenchmarks
+Times the pure-Python request-path functions on synthetic inputs at several scales and compares with stored results.
+
+Usage:
+    python benchmarks/microbench.py [--scales 10,1000,100000] [--only skyscanner,amadeus]
+                                    [--threshold 0.25] [--save-baseline]
+
+Each benchmark is run at every scale (number of messages, catalog entries,
+flights, offers or itineraries). The best of several repeats is reported
+as total time per call and time per item, so super-linear growth between
+scales stands out. Results are compared with benchmarks/baselines/microbench.json,
+rescaled by a fixed reference workload timed in both runs, and the run exits 1
+if any benchmark got slower by more than --threshold.
+"""
+
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Tuple
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+import main  # noqa: E402
+from flight_apis import flight_api  # noqa: E402
+from payloads import skyscanner_poll_payload  # noqa: E402
+from records import FlightResult  # noqa: E402
+
+logging.disable(logging.CRITICAL)
+
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baselines", "microbench.json")
+
+STEP_MESSAGES = [
+    ("welcome", "Hi, I'm flying from San Francisco, California"),
+    ("travel_type", "I'd like to go somewhere international and abroad"),
+    ("destination_type", "A tropical island paradise with beaches would be perfect"),
+    ("people_count", "There will be 4 people traveling"),
+    ("budget", "Our budget is $2,500-3,500 per person in eur"),
+    ("dates", "We are thinking December 2024 for about 10 days"),
+    ("additional_preferences", "We love food tours and quiet places")
+]
+BUDGETS = ["$1,500", "2000-3000", "5000+", "$12,000", "750", "bad budget"]
+DATES = ["December 2024", "january 2025", "next summer", "15 March", "December, 7 days"]
+TYPES = ["beach", "mountain", "city", "historic"]
+
+
+def run_sync(coroutine):
+    """Drive a coroutine that never suspends (no real I/O) to completion"""
+    try:
+        coroutine.send(None)
+    except StopIteration as done:
+        return done.value
+    raise RuntimeError("coroutine suspended; it is not a pure function")
+
+
+def synthetic_catalog(size: int) -> Dict:
+    rng = random.Random(size)
+    catalog: Dict[str, Dict[str, List]] = {"domestic": {}, "international": {}}
+    for index in range(size):
+        scope = "domestic" if index % 2 else "international"
+        dest_type = TYPES[index % len(TYPES)]
+        catalog[scope].setdefault(dest_type, []).append({
+            "id": index, "name": f"Place {index}", "type": dest_type, "country": "Testland",
+            "rating": round(rng.uniform(3.5, 5.0), 1), "cost_per_person": {"USD": rng.randrange(500, 4000)},
+            "highlights": ["A", "B"], "best_time": "April-October", "daily_cost_usd": 100, "flight_cost_usd": 500
+        })
+    return catalog
+
+
+def synthetic_amadeus(size: int) -> Dict:
+    rng = random.Random(size)
+    start = datetime(2024, 12, 15, 6)
+    data = []
+    for index in range(size):
+        departure = start + timedelta(minutes=rng.randrange(0, 16 * 60, 5))
+        hops = rng.choice([1, 1, 2])
+        segments = []
+        for hop in range(hops):
+            arrival = departure + timedelta(hours=rng.randrange(1, 9))
+            segments.append({"carrierCode": rng.choice(["DL", "AA", "UA", "LH"]), "number": str(rng.randrange(10, 9999)),
+                             "departure": {"at": departure.isoformat()}, "arrival": {"at": arrival.isoformat()}})
+            departure = arrival + timedelta(hours=1)
+        data.append({"id": str(index), "itineraries": [{"duration": "PT9H30M", "segments": segments}],
+                     "price": {"total": f"{rng.uniform(100, 1800):.2f}"}})
+    return {"data": data}
+
+
+def synthetic_flights(size: int) -> List[FlightResult]:
+    # About a third are duplicates of an earlier flight, as when providers overlap
+    rng = random.Random(size)
+    unique = max(1, size * 2 // 3)
+    return [
+        FlightResult(id=f"f{index}", airline=f"Airline {key % 7}", flight_number=f"XX {key}",
+                     departure_time=f"2024-12-15T{key % 24:02d}:00:00", arrival_time="2024-12-15T23:00:00",
+                     duration="5h 0m", price_usd=float(100 + key % 900), stops=key % 2)
+        for index, key in ((index, rng.randrange(unique)) for index in range(size))
+    ]
+
+
+def synthetic_segments(size: int) -> List[List[Dict]]:
+    start = datetime(2024, 12, 15, 6)
+    return [
+        [{"departure": (start + timedelta(minutes=index)).isoformat() + "Z",
+          "arrival": (start + timedelta(minutes=index + 325)).isoformat() + "Z"}]
+        for index in range(size)
+    ]
+
+
+def bench_extract_travel_info(size: int) -> Callable:
+    messages = [STEP_MESSAGES[index % len(STEP_MESSAGES)] for index in range(size)]
+    return lambda: [run_sync(main.extract_travel_info(text, step)) for step, text in messages]
+
+
+def bench_parse_budget_range(size: int) -> Callable:
+    budgets = [BUDGETS[index % len(BUDGETS)] for index in range(size)]
+    return lambda: [main.parse_budget_range(budget) for budget in budgets]
+
+
+def bench_parse_travel_dates(size: int) -> Callable:
+    dates = [DATES[index % len(DATES)] for index in range(size)]
+    return lambda: [main.parse_travel_dates(value) for value in dates]
+
+
+def bench_get_potential_destinations(size: int) -> Callable:
+    catalog = synthetic_catalog(size)
+    preferences = main.TravelPreferences(budget_per_person="3000", people_count="2", travel_from="Boston",
+                                         travel_type="international", destination_type="beach",
+                                         travel_dates="December 2024")
+
+    def run():
+        original, main.TRAVEL_DATA = main.TRAVEL_DATA, catalog
+        try:
+            return main.get_potential_destinations(preferences)
+        finally:
+            main.TRAVEL_DATA = original
+    return run
+
+
+def bench_parse_amadeus_results(size: int) -> Callable:
+    payload = synthetic_amadeus(size)
+    return lambda: flight_api._parse_amadeus_results(payload)
+
+
+def bench_parse_skyscanner_results(size: int) -> Callable:
+    payload = skyscanner_poll_payload(itineraries=size)
+    return lambda: flight_api._parse_skyscanner_results(payload)
+
+
+def bench_remove_duplicates(size: int) -> Callable:
+    flights = synthetic_flights(size)
+    return lambda: flight_api._remove_duplicates(flights)
+
+
+def bench_calculate_duration(size: int) -> Callable:
+    segment_lists = synthetic_segments(size)
+    return lambda: [flight_api._calculate_duration(segments) for segments in segment_lists]
+
+
+BENCHMARKS: Dict[str, Callable[[int], Callable]] = {
+    "extract_travel_info": bench_extract_travel_info,
+    "parse_budget_range": bench_parse_budget_range,
+    "parse_travel_dates": bench_parse_travel_dates,
+    "get_potential_destinations": bench_get_potential_destinations,
+    "parse_amadeus_results": bench_parse_amadeus_results,
+    "parse_skyscanner_results": bench_parse_skyscanner_results,
+    "remove_duplicates": bench_remove_duplicates,
+    "calculate_duration": bench_calculate_duration
+}
+
+
+def measure(func: Callable, repeat: int = 5, min_time: float = 0.2) -> float:
+    """Best seconds per call over `repeat` rounds of enough calls to last min_time (GC paused, as in timeit)"""
+    start = time.perf_counter()
+    func()
+    first = time.perf_counter() - start
+    loops = max(1, int(min_time / first)) if first > 0 else 1000
+    best = first
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(loops):
+                func()
+            best = min(best, (time.perf_counter() - start) / loops)
+    finally:
+        gc.enable()
+    return best
+
+
+def reference_workload():
+    # Fixed mix of dict, string and float work, used to rescale baselines to this machine's current speed
+    table = {}
+    for index in range(2000):
+        key = f"k{index % 97}"
+        table[key] = table.get(key, 0.0) + float(str(index)) * 1.5
+    return sorted(table.items())
+
+
+def calibrate(repeat: int) -> float:
+    return measure(reference_workload, repeat)
+
+
+def run(names: List[str], scales: List[int], repeat: int) -> Dict[str, Dict[str, float]]:
+    results: Dict[str, Dict[str, float]] = {}
+    print(f"{'benchmark':<30}{'scale':>9}{'per call':>14}{'per item':>12}")
+    for name in names:
+        results[name] = {}
+        for scale in scales:
+            seconds = measure(BENCHMARKS[name](scale), repeat)
+            results[name][str(scale)] = seconds
+            print(f"{name:<30}{scale:>9,}{format_seconds(seconds):>14}{format_seconds(seconds / scale):>12}")
+    return results
+
+
+def format_seconds(seconds: float) -> str:
+    for unit, factor in (("s", 1.0), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= factor:
+            return f"{seconds / factor:.2f} {unit}"
+    return f"{seconds / 1e-9:.0f} ns"
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+            threshold: float, speed: float = 1.0) -> List[Tuple[str, str, float, float]]:
+    """(benchmark, scale, now, before) for every timing slower than baseline by more than threshold
+
+    `speed` is this run's reference-workload time over the baseline's, so a
+    machine that is uniformly slower today is not reported as a regression.
+    """
+    return [
+        (name, scale, seconds, baseline[name][scale] * speed)
+        for name, timings in results.items()
+        for scale, seconds in timings.items()
+        if scale in baseline.get(name, {}) and seconds > baseline[name][scale] * speed * (1 + threshold)
+    ]
+
+
+def main_():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[1])
+    parser.add_argument("--scales", default="10,1000,100000")
+    parser.add_argument("--only", help="comma-separated benchmark names")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed relative slowdown")
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args()
+
+    names = args.only.split(",") if args.only else list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(unknown)} (choose from {', '.join(BENCHMARKS)})")
+    scales = [int(scale) for scale in args.scales.split(",")]
+    reference = calibrate(args.repeat)
+    results = run(names, scales, args.repeat)
+    # Re-measure so drift during the run is averaged out
+    reference = (reference + calibrate(args.repeat)) / 2
+
+    stored = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            stored = json.load(f)
+
+    if args.save_baseline:
+        # Merge, so a partial run (--only/--scales) only replaces what it measured
+        timings = stored.get("results", {})
+        if timings and stored.get("reference"):
+            # Keep merged timings comparable with the ones already stored
+            timings = {name: {scale: seconds * reference / stored["reference"] for scale, seconds in by_scale.items()}
+                       for name, by_scale in timings.items()}
+        for name, by_scale in results.items():
+            timings.setdefault(name, {}).update(by_scale)
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({
+                "machine": {"python": platform.python_version(), "cpus": os.cpu_count(), "platform": platform.platform()},
+                "reference": reference,
+                "results": timings
+            }, f, indent=2)
+        print(f"\nBaseline saved to {args.baseline}")
+        return
+
+    if not stored:
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline to create one")
+        return
+    speed = reference / stored["reference"] if stored.get("reference") else 1.0
+    print(f"\nReference workload: {format_seconds(reference)} ({speed:.2f}x the baseline machine's time)")
+    regressions = compare(results, stored["results"], args.threshold, speed)
+    if regressions:
+        print(f"\nSlower than baseline by more than {args.threshold:.0%}:")
+        for name, scale, seconds, before in regressions:
+            print(f"  {name} @ {scale}: {format_seconds(seconds)} vs {format_seconds(before)} expected ({seconds / before:.2f}x)")
+        sys.exit(1)
+    print(f"\nNo regressions beyond {args.threshold:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main_()
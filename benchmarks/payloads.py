@@ -0,0 +1,132 @@
+"""
+Benchmark Payloads
+Synthetic provider payloads shaped like real API responses, plus loading of recorded ones.
+"""
+
+import gzip
+import json
+import os
+import random
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+# Skyscanner carrier IDs and the airlines they stand for
+CARRIERS = {"-32385": ("AA", "American Airlines"), "-32456": ("BA", "British Airways"),
+            "-31722": ("DL", "Delta"), "-32677": ("LH", "Lufthansa"), "-32573": ("UA", "United"),
+            "-30596": ("AF", "Air France"), "-31435": ("NH", "ANA"), "-32132": ("KL", "KLM")}
+AGENTS = ["expd", "bkng", "kiwi", "trip", "mytr", "gtcp", "aa__", "dl__", "ua__"]
+PLACES = ["95565058", "95673827", "95673529", "95565041", "95565077", "95673444"]
+
+
+def load_payload(path: str) -> Dict:
+    """Load a recorded payload (.json or .json.gz)"""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_payload(payload: Dict, path: str):
+    """Record a payload to disk (.json or .json.gz)"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "wt", encoding="utf-8") as f:
+        json.dump(payload, f, separators=(",", ":"))
+
+
+def _component_datetime(value: datetime) -> Dict:
+    return {
+        "year": value.year, "month": value.month, "day": value.day,
+        "hour": value.hour, "minute": value.minute, "second": 0
+    }
+
+
+def make_skyscanner_poll(itineraries: int = 5000, options_per_itinerary: int = 4,
+                         legs_per_itinerary: float = 0.4, seed: int = 42) -> Dict:
+    """Build a Skyscanner v3 poll payload
+
+    Real poll responses share a leg between many itineraries (different
+    agents and fare bundles on the same flights), so only a fraction of
+    legs_per_itinerary distinct legs is generated.
+    """
+    rng = random.Random(seed)
+    start = datetime(2024, 12, 15, 6, 0)
+    legs: Dict[str, Dict] = {}
+    segments: Dict[str, Dict] = {}
+
+    leg_count = max(1, int(itineraries * legs_per_itinerary))
+    for leg_index in range(leg_count):
+        departure = start + timedelta(minutes=rng.randrange(0, 18 * 60, 5))
+        segment_ids = []
+        current = departure
+        for hop in range(rng.choice([1, 1, 1, 2, 2, 3])):
+            flight_minutes = rng.randrange(60, 9 * 60, 5)
+            segment_id = f"seg-{leg_index}-{hop}"
+            carrier = rng.choice(list(CARRIERS))
+            segments[segment_id] = {
+                "originPlaceId": rng.choice(PLACES),
+                "destinationPlaceId": rng.choice(PLACES),
+                "departureDateTime": _component_datetime(current),
+                "arrivalDateTime": _component_datetime(current + timedelta(minutes=flight_minutes)),
+                "durationInMinutes": flight_minutes,
+                "marketingFlightNumber": str(rng.randrange(10, 9999)),
+                "marketingCarrierId": carrier,
+                "operatingCarrierId": carrier
+            }
+            segment_ids.append(segment_id)
+            current += timedelta(minutes=flight_minutes + rng.randrange(45, 240, 5))
+        first, last = segments[segment_ids[0]], segments[segment_ids[-1]]
+        legs[f"leg-{leg_index}"] = {
+            "originPlaceId": first["originPlaceId"],
+            "destinationPlaceId": last["destinationPlaceId"],
+            "departureDateTime": first["departureDateTime"],
+            "arrivalDateTime": last["arrivalDateTime"],
+            "stopCount": len(segment_ids) - 1,
+            "marketingCarrierIds": sorted({segments[s]["marketingCarrierId"] for s in segment_ids}),
+            "segmentIds": segment_ids
+        }
+
+    leg_ids = list(legs)
+    results_itineraries: Dict[str, Dict] = {}
+    for index in range(itineraries):
+        leg_id = leg_ids[index % leg_count]
+        base_price = rng.uniform(90, 1800)
+        results_itineraries[f"{leg_id}|{index}"] = {
+            "legIds": [leg_id],
+            "pricingOptions": [
+                {
+                    "price": {"amount": round(base_price * rng.uniform(0.95, 1.2), 2), "unit": "PRICE_UNIT_WHOLE"},
+                    "agentIds": [rng.choice(AGENTS)],
+                    "url": f"https://www.skyscanner.net/transport_deeplink/4.0/{index}/{option}"
+                }
+                for option in range(options_per_itinerary)
+            ]
+        }
+
+    return {
+        "sessionToken": "benchmark-session",
+        "status": "RESULT_STATUS_COMPLETE",
+        "action": "RESULT_ACTION_REPLACED",
+        "content": {
+            "results": {
+                "itineraries": results_itineraries,
+                "legs": legs,
+                "segments": segments,
+                "places": {place: {"entityId": place} for place in PLACES},
+                "carriers": {carrier: {"name": name, "iata": code, "displayCode": code}
+                             for carrier, (code, name) in CARRIERS.items()},
+                "agents": {agent: {"name": agent} for agent in AGENTS}
+            }
+        }
+    }
+
+
+def skyscanner_poll_payload(path: Optional[str] = None, itineraries: int = 5000) -> Dict:
+    """Return a recorded poll payload if one exists, otherwise record a synthetic one"""
+    path = path or os.path.join(DATA_DIR, f"skyscanner_poll_{itineraries}.json.gz")
+    if os.path.exists(path):
+        return load_payload(path)
+    payload = make_skyscanner_poll(itineraries)
+    save_payload(payload, path)
+    return payload
@@ -0,0 +1,113 @@
+"""
+In-Memory TTL Caches
+Small async-aware TTL caches with hit/miss statistics, shared by the provider modules.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple, Union
+
+from deadlines import shared_work
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+def _retrieve(task: asyncio.Future):
+    """Mark a fill's failure retrieved, so one nobody waited for is not reported as a leak"""
+    if not task.cancelled():
+        task.exception()
+
+# All caches by name, for statistics and warm-up
+CACHES: Dict[str, "TTLCache"] = {}
+
+
+class TTLCache:
+    """LRU-bounded cache whose entries expire after a fixed time-to-live"""
+
+    def __init__(self, name: str, ttl: float, maxsize: int = 1024):
+        self.name = name
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        CACHES[name] = self
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return a fresh cached value, or default"""
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+        if entry is not None:
+            del self._entries[key]
+        self.misses += 1
+        return default
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """Store a value for ttl seconds (the cache default if not given)"""
+        self._entries[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def expires_in(self, key: Hashable) -> float:
+        """Seconds until the entry for key expires (0 if absent or stale)"""
+        entry = self._entries.get(key)
+        return max(0.0, entry[0] - time.monotonic()) if entry is not None else 0.0
+
+    def invalidate(self, key: Hashable):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    async def get_or_set(self, key: Hashable, factory: Callable[[], Awaitable[Any]],
+                         ttl: Union[float, Callable[[Any], Optional[float]], None] = None,
+                         refresh: bool = False) -> Any:
+        """Return the cached value or compute it once, even under concurrent callers
+
+        ttl may be a function of the computed value (returning None for the
+        cache default), so fallback data can be kept for less time than the
+        real thing; it applies only when a value is computed. With refresh the value is recomputed even if fresh; readers keep the
+        old entry until the new one is stored.
+        """
+        if not refresh:
+            value = self.get(key, _MISSING)
+            if value is not _MISSING:
+                return value
+
+        # The fill is a task the cache owns, free of the first caller's deadline: a caller
+        # that times out or is cancelled stops waiting, but neither cancels nor fails it for the others
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fill(key, factory, ttl))
+            task.add_done_callback(_retrieve)
+            self._inflight[key] = task
+        return await asyncio.shield(task)
+
+    async def _fill(self, key: Hashable, factory: Callable[[], Awaitable[Any]],
+                    ttl: Union[float, Callable[[Any], Optional[float]], None]) -> Any:
+        try:
+            with shared_work():
+                value = await factory()
+            self.set(key, value, ttl(value) if callable(ttl) else ttl)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    def stats(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0
+        }
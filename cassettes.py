@@ -0,0 +1,218 @@
+"""
+Provider Cassettes
+Records real provider responses to compact gzip JSON-lines cassettes and replays them, with or without their original latency.
+"""
+
+import asyncio
+import atexit
+import base64
+import gzip
+import hashlib
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# "" (off), "record" (call providers and save their responses) or "replay" (serve saved responses only)
+CASSETTE_MODE = os.getenv("CASSETTE_MODE", "").lower()
+CASSETTE_DIR = os.getenv("CASSETTE_DIR", "cassettes")
+# Multiplier on recorded latencies when replaying: 1.0 reproduces them, 0 replays instantly
+CASSETTE_LATENCY_SCALE = float(os.getenv("CASSETTE_LATENCY_SCALE", "1.0"))
+
+# Credentials never reach a cassette; they are also left out of request keys so replay works without them
+SECRET_FIELDS = {"key", "apikey", "api_key", "access_key", "client_id", "client_secret", "access_token"}
+REDACTED = "REDACTED"
+
+
+class CassetteMiss(httpx.TransportError):
+    """No recorded response for a request while replaying"""
+
+
+def replaying() -> bool:
+    return CASSETTE_MODE == "replay"
+
+
+def _redact_pairs(encoded: str) -> str:
+    pairs = parse_qsl(encoded, keep_blank_values=True)
+    return urlencode(sorted((name, REDACTED if name in SECRET_FIELDS else value) for name, value in pairs))
+
+
+def request_key(request: httpx.Request) -> str:
+    """Method, path, sorted query and a body digest, with credentials blanked out"""
+    body = request.content
+    if request.headers.get("content-type", "").startswith("application/x-www-form-urlencoded"):
+        body = _redact_pairs(body.decode("latin-1")).encode()
+    key = f"{request.method} {request.url.path}"
+    query = _redact_pairs(request.url.query.decode("latin-1"))
+    if query:
+        key += f"?{query}"
+    if body:
+        key += f" {hashlib.blake2b(body, digest_size=8).hexdigest()}"
+    return key
+
+
+def _redact_body(body: bytes, content_type: str) -> bytes:
+    if "json" not in content_type or b"access_token" not in body:
+        return body
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return body
+    if isinstance(payload, dict) and "access_token" in payload:
+        payload["access_token"] = REDACTED
+    return json.dumps(payload).encode()
+
+
+def encode_entry(key: str, response: httpx.Response, body: bytes, seconds: float) -> Dict:
+    content_type = response.headers.get("content-type", "")
+    body = _redact_body(body, content_type)
+    entry = {"k": key, "s": response.status_code, "t": content_type, "ms": round(seconds * 1000, 1)}
+    try:
+        entry["b"] = body.decode("utf-8")
+    except UnicodeDecodeError:
+        entry["b64"] = base64.b64encode(body).decode("ascii")
+    return entry
+
+
+def decode_entry(entry: Dict, request: httpx.Request) -> httpx.Response:
+    body = base64.b64decode(entry["b64"]) if "b64" in entry else entry.get("b", "").encode("utf-8")
+    headers = {"content-type": entry["t"]} if entry.get("t") else {}
+    return httpx.Response(entry["s"], headers=headers, content=body, request=request)
+
+
+class CassetteLibrary:
+    """Cassette files in one directory, one per provider
+
+    Recording appends entries from a background thread. Replay loads a
+    provider's cassette on first use; a request recorded several times
+    (such as a Skyscanner poll) replays its responses in recorded order and
+    then keeps returning the last one.
+    """
+
+    def __init__(self, directory: str = CASSETTE_DIR, latency_scale: float = CASSETTE_LATENCY_SCALE):
+        self.directory = directory
+        self.latency_scale = latency_scale
+        self._tapes: Dict[str, Dict[str, List[Dict]]] = {}
+        self._positions: Dict[Tuple[str, str], int] = {}
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+
+    def path(self, provider: str) -> str:
+        return os.path.join(self.directory, f"{provider}.jsonl.gz")
+
+    def record(self, provider: str, entry: Dict):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="cassette-writer", daemon=True)
+            self._thread.start()
+            atexit.register(self.flush)
+        self._queue.put((provider, entry))
+
+    def flush(self):
+        """Wait until every recorded entry is on disk"""
+        if self._thread is not None:
+            self._queue.join()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                self._write(batch)
+            except OSError as e:
+                logger.error(f"Could not write cassette entries: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write(self, batch: List[Tuple[str, Dict]]):
+        os.makedirs(self.directory, exist_ok=True)
+        by_provider: Dict[str, List[Dict]] = {}
+        for provider, entry in batch:
+            by_provider.setdefault(provider, []).append(entry)
+        for provider, entries in by_provider.items():
+            # Each append is a new gzip member; readers see one continuous stream
+            with gzip.open(self.path(provider), "at", encoding="utf-8") as output:
+                output.writelines(json.dumps(entry, separators=(",", ":")) + "\n" for entry in entries)
+
+    def _tape(self, provider: str) -> Dict[str, List[Dict]]:
+        if provider not in self._tapes:
+            tape: Dict[str, List[Dict]] = {}
+            try:
+                with gzip.open(self.path(provider), "rt", encoding="utf-8") as cassette:
+                    for line in cassette:
+                        entry = json.loads(line)
+                        tape.setdefault(entry["k"], []).append(entry)
+                logger.info(f"Loaded {sum(map(len, tape.values()))} recorded {provider} responses")
+            except FileNotFoundError:
+                logger.warning(f"No cassette for {provider} at {self.path(provider)}")
+            self._tapes[provider] = tape
+        return self._tapes[provider]
+
+    def next_entry(self, provider: str, key: str) -> Optional[Dict]:
+        entries = self._tape(provider).get(key)
+        if not entries:
+            return None
+        position = self._positions.get((provider, key), 0)
+        self._positions[(provider, key)] = position + 1
+        return entries[min(position, len(entries) - 1)]
+
+    def rewind(self):
+        self._positions.clear()
+
+
+class CassetteTransport(httpx.AsyncBaseTransport):
+    """Records responses from the real transport, or replays them without touching the network"""
+
+    def __init__(self, provider: str, mode: str, library: Optional[CassetteLibrary] = None,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.provider = provider
+        self.mode = mode
+        self.library = library or cassette_library
+        self.transport = transport or (httpx.AsyncHTTPTransport() if mode == "record" else None)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        key = request_key(request)
+        if self.mode == "replay":
+            entry = self.library.next_entry(self.provider, key)
+            if entry is None:
+                logger.warning(f"No recorded {self.provider} response for {key}")
+                raise CassetteMiss(f"no recorded {self.provider} response for {key}", request=request)
+            if self.library.latency_scale > 0:
+                await asyncio.sleep(entry["ms"] / 1000 * self.library.latency_scale)
+            return decode_entry(entry, request)
+
+        start = time.perf_counter()
+        response = await self.transport.handle_async_request(request)
+        try:
+            # Latency is measured to the last body byte, which is what replay reproduces
+            body = await response.aread()
+        finally:
+            await response.aclose()
+        self.library.record(self.provider, encode_entry(key, response, body, time.perf_counter() - start))
+        headers = [(name, value) for name, value in response.headers.multi_items()
+                   if name.lower() not in ("content-encoding", "content-length", "transfer-encoding")]
+        return httpx.Response(response.status_code, headers=headers, content=body, request=request)
+
+    async def aclose(self):
+        if self.transport is not None:
+            await self.transport.aclose()
+
+
+def cassette_transport(provider: str) -> Optional[CassetteTransport]:
+    """Transport for CASSETTE_MODE, or None when cassettes are off"""
+    if CASSETTE_MODE not in ("record", "replay"):
+        return None
+    return CassetteTransport(provider, CASSETTE_MODE)
+
+
+# Global instance
+cassette_library = CassetteLibrary()
@@ -0,0 +1,183 @@
+"""
+Provider Circuit Breakers
+Per-provider breakers that trip on error rate or slow calls, so requests fall back immediately while an upstream is down.
+"""
+
+import logging
+import os
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+
+import httpx
+
+from metrics import registry
+
+logger = logging.getLogger(__name__)
+
+BREAKER_ENABLED = os.getenv("BREAKER_ENABLED", "true").lower() == "true"
+BREAKER_WINDOW_SECONDS = float(os.getenv("BREAKER_WINDOW_SECONDS", "30"))
+BREAKER_MIN_CALLS = int(os.getenv("BREAKER_MIN_CALLS", "10"))
+BREAKER_ERROR_RATE = float(os.getenv("BREAKER_ERROR_RATE", "0.5"))
+BREAKER_SLOW_RATE = float(os.getenv("BREAKER_SLOW_RATE", "0.8"))
+# Default slow-call threshold, with per-provider overrides ("groq=20,skyscanner=8")
+BREAKER_SLOW_SECONDS = float(os.getenv("BREAKER_SLOW_SECONDS", "4"))
+BREAKER_SLOW_OVERRIDES = os.getenv("BREAKER_SLOW_OVERRIDES", "groq=20")
+BREAKER_OPEN_SECONDS = float(os.getenv("BREAKER_OPEN_SECONDS", "30"))
+BREAKER_HALF_OPEN_PROBES = int(os.getenv("BREAKER_HALF_OPEN_PROBES", "2"))
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+# Numeric encoding of states for the metrics gauge
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpen(httpx.TransportError):
+    """Call rejected without reaching the provider because its circuit is open"""
+
+
+def parse_overrides(spec: str) -> Dict[str, float]:
+    """Parse "provider=seconds,..." into a dict, skipping malformed entries"""
+    overrides = {}
+    for item in spec.split(","):
+        name, _, value = item.partition("=")
+        try:
+            overrides[name.strip()] = float(value)
+        except ValueError:
+            if item.strip():
+                logger.error(f"Ignoring malformed breaker override: {item!r}")
+    return overrides
+
+
+def is_failure(status_code: int) -> bool:
+    """Server errors and throttling count against a provider; other 4xx are the caller's fault"""
+    return status_code >= 500 or status_code == 429
+
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker over a sliding time window of call outcomes
+
+    The circuit opens when, over at least min_calls recent calls, the share
+    of failures reaches error_rate or the share of calls slower than
+    slow_seconds reaches slow_rate. After open_seconds it lets `probes`
+    calls through; if they all succeed the circuit closes, any failure
+    reopens it.
+    """
+
+    def __init__(self, provider: str, slow_seconds: float = BREAKER_SLOW_SECONDS,
+                 window: float = BREAKER_WINDOW_SECONDS, min_calls: int = BREAKER_MIN_CALLS,
+                 error_rate: float = BREAKER_ERROR_RATE, slow_rate: float = BREAKER_SLOW_RATE,
+                 open_seconds: float = BREAKER_OPEN_SECONDS, probes: int = BREAKER_HALF_OPEN_PROBES):
+        self.provider = provider
+        self.slow_seconds = slow_seconds
+        self.window = window
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_rate = slow_rate
+        self.open_seconds = open_seconds
+        self.probes = probes
+        self.state = CLOSED
+        self.rejected = 0
+        # (finished at, failed, slow)
+        self._outcomes: Deque[Tuple[float, bool, bool]] = deque()
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+
+    def acquire(self):
+        """Admit a call or raise CircuitOpen"""
+        if self.state == OPEN:
+            if time.monotonic() - self._opened_at < self.open_seconds:
+                self._reject()
+            self._transition(HALF_OPEN)
+            self._probes_in_flight = 0
+            self._probe_successes = 0
+        if self.state == HALF_OPEN:
+            if self._probes_in_flight >= self.probes:
+                self._reject()
+            self._probes_in_flight += 1
+
+    def release(self, failed: Optional[bool], seconds: float):
+        """Record the outcome of an admitted call; None means it was cancelled without a verdict"""
+        if self.state == HALF_OPEN:
+            self._probes_in_flight = max(0, self._probes_in_flight - 1)
+            if failed is None:
+                return
+            if failed or seconds >= self.slow_seconds:
+                self._open(f"probe {'failed' if failed else f'took {seconds:.1f}s'}")
+                return
+            self._probe_successes += 1
+            if self._probe_successes >= self.probes:
+                self._outcomes.clear()
+                self._transition(CLOSED)
+            return
+        if failed is None or self.state != CLOSED:
+            return
+
+        now = time.monotonic()
+        self._outcomes.append((now, failed, seconds >= self.slow_seconds))
+        while self._outcomes and self._outcomes[0][0] < now - self.window:
+            self._outcomes.popleft()
+        calls = len(self._outcomes)
+        if calls < self.min_calls:
+            return
+        failures = sum(1 for _, failed_call, _ in self._outcomes if failed_call)
+        slow = sum(1 for _, _, slow_call in self._outcomes if slow_call)
+        if failures / calls >= self.error_rate:
+            self._open(f"{failures}/{calls} calls failed")
+        elif slow / calls >= self.slow_rate:
+            self._open(f"{slow}/{calls} calls slower than {self.slow_seconds:g}s")
+
+    def _reject(self):
+        self.rejected += 1
+        CIRCUIT_REJECTIONS.inc(self.provider)
+        raise CircuitOpen(f"circuit for {self.provider} is {self.state}")
+
+    def _open(self, reason: str):
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+        self._transition(OPEN)
+        logger.warning(f"Circuit for {self.provider} opened ({reason}); "
+                       f"falling back for {self.open_seconds:g}s")
+
+    def _transition(self, state: str):
+        if state != self.state:
+            if state != OPEN:
+                logger.info(f"Circuit for {self.provider} {self.state} -> {state}")
+            self.state = state
+
+    def stats(self) -> Dict:
+        return {"state": self.state, "recent_calls": len(self._outcomes), "rejected": self.rejected}
+
+
+class CircuitBreakers:
+    """One breaker per provider, created on first use"""
+
+    def __init__(self, enabled: bool = BREAKER_ENABLED):
+        self.enabled = enabled
+        self.slow_overrides = parse_overrides(BREAKER_SLOW_OVERRIDES)
+        self.breakers: Dict[str, CircuitBreaker] = {}
+
+    def get(self, provider: str) -> Optional[CircuitBreaker]:
+        if not self.enabled:
+            return None
+        breaker = self.breakers.get(provider)
+        if breaker is None:
+            breaker = self.breakers[provider] = CircuitBreaker(
+                provider, self.slow_overrides.get(provider, BREAKER_SLOW_SECONDS))
+        return breaker
+
+    def stats(self) -> Dict[str, Dict]:
+        return {provider: breaker.stats() for provider, breaker in self.breakers.items()}
+
+
+# Global instance
+circuit_breakers = CircuitBreakers()
+
+CIRCUIT_REJECTIONS = registry.counter(
+    "upstream_circuit_rejections_total", "Provider calls short-circuited to fallbacks by an open circuit",
+    ("provider",))
+registry.gauge("upstream_circuit_state", "Provider circuit state (0 closed, 1 half-open, 2 open)", ("provider",),
+               callback=lambda: {(provider,): STATE_VALUES[breaker.state]
+                                 for provider, breaker in circuit_breakers.breakers.items()})
@@ -0,0 +1,210 @@
+"""
+Response Compression
+ASGI middleware negotiating brotli/gzip via Accept-Encoding, with a cache for repeated bodies.
+"""
+
+import gzip
+import logging
+import os
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+try:
+    import brotli
+except ImportError:  # optional, gzip only without it
+    brotli = None
+
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "5"))
+COMPRESSION_CACHE_SIZE = int(os.getenv("COMPRESSION_CACHE_SIZE", "256"))
+
+COMPRESSIBLE_TYPES = ("application/json", "text/")
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick "br" or "gzip" from an Accept-Encoding header, honouring q-values"""
+    offered: Dict[str, float] = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            offered[name] = quality
+
+    wildcard = offered.get("*", 0.0)
+    candidates = (["br"] if brotli is not None else []) + ["gzip"]
+    best, best_quality = None, 0.0
+    for encoding in candidates:
+        quality = offered.get(encoding, wildcard)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+class CompressionCache:
+    """Compressed bodies keyed by (ETag, encoding)
+
+    Bodies that carry an ETag are the pre-serialized, cached payloads, so the
+    same bytes come back on every request until their source refreshes.
+    """
+
+    def __init__(self, maxsize: int = COMPRESSION_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple[str, str], bytes]" = OrderedDict()
+
+    def get(self, key: Tuple[str, str]) -> Optional[bytes]:
+        body = self._entries.get(key)
+        if body is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+        else:
+            self.misses += 1
+        return body
+
+    def __contains__(self, key: Tuple[str, str]) -> bool:
+        return key in self._entries
+
+    def set(self, key: Tuple[str, str], body: bytes):
+        self._entries[key] = body
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0
+        }
+
+
+# Global instance
+compression_cache = CompressionCache()
+
+
+class CompressionMiddleware:
+    """Compress buffered JSON/text responses above a minimum size
+
+    Responses with an ETag are compressed once per encoding and then served
+    from compression_cache. Compressed variants get a weak ETag, which
+    If-None-Match still matches.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = COMPRESSION_MIN_SIZE,
+                 gzip_level: int = GZIP_LEVEL, brotli_quality: int = BROTLI_QUALITY,
+                 cache: Optional[CompressionCache] = None):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.cache = cache if cache is not None else compression_cache
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressingResponder(self, encoding, send)
+        await self.app(scope, receive, responder.send)
+
+    def compress(self, body: bytes, encoding: str, etag: Optional[str]) -> bytes:
+        """Compress body, reusing the cached result for an already-seen ETag"""
+        key = (etag, encoding) if etag else None
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        if encoding == "br":
+            compressed = brotli.compress(body, quality=self.brotli_quality)
+        else:
+            compressed = gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+
+        if key is not None:
+            self.cache.set(key, compressed)
+        return compressed
+
+
+class _CompressingResponder:
+    """Per-request send wrapper that buffers the body and compresses it"""
+
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send: Send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.send_downstream = send
+        self.start: Optional[Message] = None
+        self.chunks = []
+        self.passthrough = False
+
+    async def send(self, message: Message):
+        if message["type"] == "http.response.start":
+            self.start = message
+            return
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send_downstream(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if more_body and not self.chunks:
+            # Streaming responses are passed through untouched
+            self.passthrough = True
+            await self.send_downstream(self.start)
+            await self.send_downstream(message)
+            return
+
+        self.chunks.append(body)
+        if more_body:
+            return
+        await self._finish(b"".join(self.chunks))
+
+    async def _finish(self, body: bytes):
+        headers = MutableHeaders(raw=self.start["headers"])
+        status = self.start["status"]
+        content_type = headers.get("content-type", "")
+        compressible = content_type.startswith(COMPRESSIBLE_TYPES)
+
+        if status == 304 and (headers.get("etag"), self.encoding) in self.middleware.cache:
+            # The client revalidates the compressed variant it was sent
+            headers["etag"] = _weaken(headers["etag"])
+        elif (compressible and "content-encoding" not in headers and status >= 200
+              and status not in (204, 206) and len(body) >= self.middleware.minimum_size):
+            etag = headers.get("etag")
+            body = self.middleware.compress(body, self.encoding, etag)
+            headers["content-encoding"] = self.encoding
+            headers["content-length"] = str(len(body))
+            if etag:
+                headers["etag"] = _weaken(etag)
+
+        if compressible:
+            headers.add_vary_header("Accept-Encoding")
+
+        await self.send_downstream(self.start)
+        await self.send_downstream({"type": "http.response.body", "body": body})
+
+
+def _weaken(etag: str) -> str:
+    """Mark an ETag weak: the compressed bytes differ from the identity body"""
+    return etag if etag.startswith("W/") else f"W/{etag}"
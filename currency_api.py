@@ -3,32 +3,55 @@ Currency API Integration
 Supports real-time currency conversion and exchange rates.
 """
 
-import httpx
 import os
 import logging
 from typing import Dict, Optional
 from datetime import datetime
+from cache import TTLCache
+from cassettes import replaying
+from tracing import traced
+from upstream import EXCHANGERATE, upstream_client
 
 logger = logging.getLogger(__name__)
 
 # API Keys
 CURRENCY_API_KEY = os.getenv("CURRENCY_API_KEY", "")
+CURRENCY_BASE_URL = os.getenv("CURRENCY_BASE_URL", "https://api.exchangerate.host")
+
+# Exchange rates are cached per base currency; fallback data is retried sooner
+RATES_TTL_SECONDS = float(os.getenv("CURRENCY_RATES_TTL_SECONDS", "3600"))
+FALLBACK_TTL_SECONDS = float(os.getenv("CURRENCY_FALLBACK_TTL_SECONDS", "60"))
 
 class CurrencyAPI:
     """Currency conversion using ExchangeRate-API"""
     
     def __init__(self):
         self.api_key = CURRENCY_API_KEY
-        self.base_url = "https://api.exchangerate.host"
-        self.available = bool(self.api_key)
+        self.base_url = CURRENCY_BASE_URL
+        self.available = bool(self.api_key) or replaying()
+        self.rates_cache = TTLCache("exchange_rates", RATES_TTL_SECONDS, maxsize=64)
         
-    async def get_exchange_rates(self, base_currency: str = "USD") -> Optional[Dict]:
-        """Get current exchange rates for a base currency"""
+    def rates_max_age(self, base_currency: str = "USD") -> float:
+        """Seconds the cached rates for base_currency stay fresh"""
+        return self.rates_cache.expires_in(base_currency)
+    
+    @traced("currency.rates")
+    async def get_exchange_rates(self, base_currency: str = "USD", refresh: bool = False) -> Optional[Dict]:
+        """Get current exchange rates for a base currency (cached; refresh refetches them)"""
+        return await self.rates_cache.get_or_set(base_currency, lambda: self._fetch_exchange_rates(base_currency),
+                                                 ttl=self._rates_ttl, refresh=refresh)
+    
+    def _rates_ttl(self, rates: Dict) -> Optional[float]:
+        """Freshly fetched mock rates standing in for a failed call are retried sooner"""
+        return FALLBACK_TTL_SECONDS if self.available and rates.get("source") == "Mock Data" else None
+    
+    async def _fetch_exchange_rates(self, base_currency: str) -> Dict:
+        """Fetch current exchange rates for a base currency"""
         if not self.available:
             return self._get_mock_rates(base_currency)
             
         try:
-            async with httpx.AsyncClient() as client:
+            async with upstream_client(EXCHANGERATE) as client:
                 response = await client.get(
                     f"{self.base_url}/latest",
                     params={
@@ -48,13 +71,14 @@ class CurrencyAPI:
             logger.error(f"Error fetching exchange rates: {e}")
             return self._get_mock_rates(base_currency)
     
+    @traced("currency.convert")
     async def convert_currency(self, amount: float, from_currency: str, to_currency: str) -> Optional[Dict]:
         """Convert amount from one currency to another"""
         if not self.available:
             return self._get_mock_conversion(amount, from_currency, to_currency)
             
         try:
-            async with httpx.AsyncClient() as client:
+            async with upstream_client(EXCHANGERATE) as client:
                 response = await client.get(
                     f"{self.base_url}/convert",
                     params={
@@ -82,7 +106,7 @@ class CurrencyAPI:
             return self._get_mock_historical_rates(date, base_currency)
             
         try:
-            async with httpx.AsyncClient() as client:
+            async with upstream_client(EXCHANGERATE) as client:
                 response = await client.get(
                     f"{self.base_url}/{date}",
                     params={
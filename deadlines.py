@@ -0,0 +1,101 @@
+"""
+Request Deadlines
+A request-scoped time budget carried in a context variable and honoured by pipeline stages and provider calls.
+"""
+
+import asyncio
+import contextvars
+import functools
+import logging
+import time
+from contextlib import contextmanager
+from typing import Any, Awaitable, Iterator, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("deadline", default=None)
+
+
+class DeadlineExceeded(httpx.TimeoutException):
+    """The request's time budget ran out before a provider call could start"""
+
+
+@contextmanager
+def request_deadline(seconds: Optional[float]) -> Iterator[None]:
+    """Give the enclosed block (and tasks it starts) at most `seconds`; an outer, earlier deadline wins"""
+    if not seconds or seconds <= 0:
+        yield
+        return
+    expires = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(expires if current is None else min(current, expires))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+@contextmanager
+def shared_work() -> Iterator[None]:
+    """Run the enclosed block without the current deadline, for work other requests also wait on"""
+    token = _deadline.set(None)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left in the current deadline, or None when there is none"""
+    expires = _deadline.get()
+    return None if expires is None else max(0.0, expires - time.monotonic())
+
+
+def deadline_reached(slack: float = 0.05) -> bool:
+    """Whether the current deadline has (all but) run out, e.g. to tell a capped timeout from a slow provider"""
+    left = remaining()
+    return left is not None and left <= slack
+
+
+def stage_budget(share: float) -> Optional[float]:
+    """A share of the remaining budget for one pipeline stage"""
+    left = remaining()
+    return None if left is None else left * share
+
+
+async def within(awaitable: Awaitable, share: float = 1.0, fallback: Any = None, stage: str = "") -> Any:
+    """Await with a share of the remaining budget, returning fallback if it runs out"""
+    budget = stage_budget(share)
+    if budget is None:
+        return await awaitable
+    try:
+        return await asyncio.wait_for(awaitable, timeout=budget)
+    except asyncio.TimeoutError:
+        logger.warning(f"Deadline: {stage or 'stage'} did not finish within {budget:.2f}s, using fallback")
+        return fallback
+
+
+def cap_request_timeout(request: httpx.Request):
+    """Shorten an outgoing request's httpx timeouts to the time left, or fail it if none is"""
+    left = remaining()
+    if left is None:
+        return
+    if left <= 0:
+        raise DeadlineExceeded("request deadline exceeded", request=request)
+    timeouts = request.extensions.get("timeout", {})
+    request.extensions["timeout"] = {name: left if value is None else min(value, left)
+                                     for name, value in timeouts.items()} or {
+        "connect": left, "read": left, "write": left, "pool": left}
+
+
+def with_deadline(seconds: Optional[float]):
+    """Decorator running an async endpoint under request_deadline(seconds)"""
+    def decorate(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with request_deadline(seconds):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorate
@@ -0,0 +1,83 @@
+"""
+Off-Loop JSON Decoding
+Decodes and parses large provider payloads in a worker pool so the event loop stays responsive.
+"""
+
+import asyncio
+import json
+import logging
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Optional, Union
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:  # optional faster decoder
+    orjson = None
+
+# Bodies at or above this size are decoded (and parsed) off the event loop
+OFFLOAD_THRESHOLD_BYTES = int(os.getenv("JSON_OFFLOAD_THRESHOLD_BYTES", str(256 * 1024)))
+# "thread" keeps results in-process; "process" sidesteps the GIL for very large payloads
+OFFLOAD_EXECUTOR = os.getenv("JSON_OFFLOAD_EXECUTOR", "thread").lower()
+OFFLOAD_WORKERS = int(os.getenv("JSON_OFFLOAD_WORKERS", "2"))
+# "auto" uses orjson when installed, "orjson" requires it, "stdlib" forces json
+JSON_DECODER = os.getenv("JSON_DECODER", "auto").lower()
+
+_executor: Optional[Executor] = None
+
+
+def _select_loads() -> Callable[[Union[bytes, str]], Any]:
+    """Pick the JSON decoder according to JSON_DECODER"""
+    if JSON_DECODER in ("auto", "orjson") and orjson is not None:
+        return orjson.loads
+    if JSON_DECODER == "orjson":
+        logger.warning("JSON_DECODER=orjson but orjson is not installed, using stdlib json")
+    return json.loads
+
+
+loads = _select_loads()
+
+
+def get_executor() -> Executor:
+    """Return the shared offload pool, creating it on first use"""
+    global _executor
+    if _executor is None:
+        if OFFLOAD_EXECUTOR == "process":
+            _executor = ProcessPoolExecutor(max_workers=OFFLOAD_WORKERS)
+        else:
+            _executor = ThreadPoolExecutor(max_workers=OFFLOAD_WORKERS, thread_name_prefix="json-offload")
+    return _executor
+
+
+def shutdown_executor():
+    """Shut down the offload pool (called on application shutdown)"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def _decode_and_parse(content: bytes, parser: Optional[Callable], *args) -> Any:
+    """Decode a JSON body and optionally run a parser over it"""
+    data = loads(content)
+    return parser(data, *args) if parser is not None else data
+
+
+async def decode_json(response: httpx.Response, parser: Optional[Callable] = None, *args) -> Any:
+    """Decode a response body as JSON, then apply parser(data, *args) if given
+
+    Small bodies are handled inline; large ones are decoded and parsed in the
+    offload pool so that a multi-megabyte payload does not block the loop.
+    The parser must be picklable when JSON_OFFLOAD_EXECUTOR=process.
+    """
+    content = response.content
+    if len(content) < OFFLOAD_THRESHOLD_BYTES:
+        return _decode_and_parse(content, parser, *args)
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), partial(_decode_and_parse, content, parser, *args))
@@ -3,14 +3,22 @@ Flight Search APIs Integration
 Supports multiple flight search providers for comprehensive results.
 """
 
-import httpx
 import os
 import logging
-from typing import List, Dict, Optional
+import heapq
+from functools import lru_cache
+from itertools import count
+from typing import Callable, Iterable, Iterator, List, Dict, NamedTuple, Optional, Tuple
 from datetime import datetime, timedelta
 import json
 import asyncio
 from dotenv import load_dotenv
+from airports import airport_resolver
+from cassettes import replaying
+from decoding import decode_json
+from records import FlightResult, RoundTripResult
+from tracing import traced
+from upstream import AMADEUS, SKYSCANNER, upstream_client
 
 logger = logging.getLogger(__name__)
 
@@ -19,15 +27,162 @@ SKYSCANNER_API_KEY = os.getenv("SKYSCANNER_API_KEY", "")
 AMADEUS_CLIENT_ID = os.getenv("AMADEUS_CLIENT_ID", "")
 AMADEUS_CLIENT_SECRET = os.getenv("AMADEUS_CLIENT_SECRET", "")
 
+# Provider endpoints (overridable to point at stand-in servers)
+SKYSCANNER_BASE_URL = os.getenv("SKYSCANNER_BASE_URL", "https://partners.api.skyscanner.net/apiservices/v3")
+AMADEUS_BASE_URL = os.getenv("AMADEUS_BASE_URL", "https://test.api.amadeus.com")
+SKYSCANNER_POLL_INTERVAL_SECONDS = float(os.getenv("SKYSCANNER_POLL_INTERVAL_SECONDS", "2"))
+
+# Multi-airport fan-out (e.g. Tokyo -> HND + NRT)
+AIRPORT_FANOUT_ENABLED = os.getenv("AIRPORT_FANOUT_ENABLED", "true").lower() == "true"
+MAX_AIRPORT_PAIRS = int(os.getenv("MAX_AIRPORT_PAIRS", "4"))
+
+# Result sizes: flights kept per provider parser and returned per search
+PARSER_TOP_K = int(os.getenv("FLIGHT_PARSER_TOP_K", "15"))
+SEARCH_TOP_K = int(os.getenv("FLIGHT_SEARCH_TOP_K", "15"))
+
+
+class SkyscannerLeg(NamedTuple):
+    """Parsed Skyscanner leg, shared by every pricing option that flies it"""
+    departure_time: str
+    arrival_time: str
+    duration: str
+    stops: int
+    carrier: str
+    flight_number: str
+
+
+def price_score(flight: FlightResult) -> float:
+    """Default ranking score: USD price, lower is better"""
+    return flight.price_usd
+
+
+def flight_key(flight: FlightResult) -> Tuple:
+    """Identity of a flight across providers: (flight number with carrier code, departure)
+
+    The airline is left out: Amadeus reports its code, Skyscanner its name.
+    """
+    return (flight.flight_number, flight.departure_time)
+
+
+def trip_key(trip: RoundTripResult) -> Tuple:
+    """Identity of a round trip: the identities of both legs"""
+    return flight_key(trip.outbound) + flight_key(trip.inbound)
+
+
+def cheapest_pairs(outbound: List[FlightResult], inbound: List[FlightResult],
+                   k: int) -> List[Tuple[FlightResult, FlightResult]]:
+    """The k cheapest (outbound, return) combinations, cheapest first
+    
+    With both lists sorted by price, the cheapest unvisited pair is always
+    next to one already taken, so a heap over that frontier finds the top k
+    in O(k log k) without building the cross product. Pairs whose return
+    leaves before the outbound lands (both local times at the destination)
+    are skipped.
+    """
+    outbound = sorted(outbound, key=price_score)
+    inbound = sorted(inbound, key=price_score)
+    if not outbound or not inbound or k <= 0:
+        return []
+    
+    frontier = [(outbound[0].price_usd + inbound[0].price_usd, 0, 0)]
+    seen = {(0, 0)}
+    pairs = []
+    while frontier and len(pairs) < k:
+        _, i, j = heapq.heappop(frontier)
+        out, back = outbound[i], inbound[j]
+        if not (out.arrival_time and back.departure_time and back.departure_time <= out.arrival_time):
+            pairs.append((out, back))
+        for next_i, next_j in ((i + 1, j), (i, j + 1)):
+            if next_i < len(outbound) and next_j < len(inbound) and (next_i, next_j) not in seen:
+                seen.add((next_i, next_j))
+                heapq.heappush(frontier, (outbound[next_i].price_usd + inbound[next_j].price_usd, next_i, next_j))
+    return pairs
+
+
+class TopKFlights:
+    """Bounded collector keeping the k best-scoring unique flights
+    
+    Flights are pushed one at a time (straight from the parsers), so at most
+    k flights are ever held. Duplicates across providers are detected by
+    tuple-hashing flight_key and the better-scoring copy is kept. Round trips
+    are collected the same way with key=trip_key.
+    """
+    
+    def __init__(self, k: int = SEARCH_TOP_K, score: Callable[[FlightResult], float] = price_score,
+                 key: Callable[[FlightResult], Tuple] = flight_key):
+        self.k = k
+        self.score = score
+        self.key = key
+        # Max-heap on score via negation; ties evict the most recent flight
+        self._heap: List[Tuple[float, int, Tuple, FlightResult]] = []
+        self._best: Dict[Tuple, float] = {}
+        self._order = count()
+    
+    def push(self, flight: FlightResult) -> bool:
+        """Offer a flight; returns True if it is currently among the top k"""
+        if self.k <= 0:
+            return False
+        
+        score = self.score(flight)
+        key = self.key(flight)
+        best = self._best.get(key)
+        if best is not None and score >= best:
+            return False
+        self._best[key] = score
+        
+        entry = (-score, -next(self._order), key, flight)
+        if best is not None:
+            # A cheaper copy of a flight we already hold replaces it in place
+            for i, held in enumerate(self._heap):
+                if held[2] == key:
+                    self._heap[i] = entry
+                    heapq.heapify(self._heap)
+                    return True
+        
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+            return True
+        if entry > self._heap[0]:
+            heapq.heapreplace(self._heap, entry)
+            return True
+        return False
+    
+    def accepts(self, score: float) -> bool:
+        """Whether a flight with this score could currently enter the top k"""
+        return len(self._heap) < self.k or score < -self._heap[0][0]
+    
+    def extend(self, flights: Iterable[FlightResult]) -> "TopKFlights":
+        """Offer every flight from an iterable"""
+        for flight in flights:
+            self.push(flight)
+        return self
+    
+    def results(self) -> List[FlightResult]:
+        """Return the kept flights, best first"""
+        return [entry[3] for entry in sorted(self._heap, reverse=True)]
+    
+    def __len__(self) -> int:
+        return len(self._heap)
+
 # Load environment variables
 load_dotenv()
 
+def _skyscanner_datetime(value) -> str:
+    """Normalize a Skyscanner date-time (ISO string or component dict) to ISO"""
+    if not value:
+        return ""
+    if isinstance(value, str):
+        return value
+    return (f"{value.get('year', 0):04d}-{value.get('month', 0):02d}-{value.get('day', 0):02d}"
+            f"T{value.get('hour', 0):02d}:{value.get('minute', 0):02d}:{value.get('second', 0):02d}")
+
+
 class FlightSearchAPI:
     """Comprehensive flight search using multiple APIs"""
     
     def __init__(self):
-        self.skyscanner_available = bool(SKYSCANNER_API_KEY)
-        self.amadeus_available = bool(AMADEUS_CLIENT_ID and AMADEUS_CLIENT_SECRET)
+        self.skyscanner_available = bool(SKYSCANNER_API_KEY) or replaying()
+        self.amadeus_available = bool(AMADEUS_CLIENT_ID and AMADEUS_CLIENT_SECRET) or replaying()
         self.amadeus_token = None
         
     async def get_amadeus_token(self) -> Optional[str]:
@@ -36,9 +191,9 @@ class FlightSearchAPI:
             return None
             
         try:
-            async with httpx.AsyncClient() as client:
+            async with upstream_client(AMADEUS) as client:
                 response = await client.post(
-                    "https://test.api.amadeus.com/v1/security/oauth2/token",
+                    f"{AMADEUS_BASE_URL}/v1/security/oauth2/token",
                     data={
                         "grant_type": "client_credentials",
                         "client_id": AMADEUS_CLIENT_ID,
@@ -58,27 +213,42 @@ class FlightSearchAPI:
             logger.error(f"Error getting Amadeus token: {e}")
             return None
     
+    @traced("flights.skyscanner")
     async def search_flights_skyscanner(self, origin: str, destination: str, 
-                                      departure_date: str, passengers: int = 1) -> List[Dict]:
+                                      departure_date: str, passengers: int = 1) -> List[FlightResult]:
         """Search flights using Skyscanner API"""
+        return await self._skyscanner_search(
+            [{"originPlaceId": origin, "destinationPlaceId": destination, "date": departure_date}],
+            passengers, self._parse_skyscanner_results
+        )
+    
+    @traced("flights.skyscanner_round_trip")
+    async def search_round_trips_skyscanner(self, origin: str, destination: str, departure_date: str,
+                                            return_date: str, passengers: int = 1) -> List[RoundTripResult]:
+        """Search round trips with one two-leg Skyscanner query"""
+        return await self._skyscanner_search(
+            [{"originPlaceId": origin, "destinationPlaceId": destination, "date": departure_date},
+             {"originPlaceId": destination, "destinationPlaceId": origin, "date": return_date}],
+            passengers, self._parse_skyscanner_round_trips
+        )
+    
+    async def _skyscanner_search(self, query_legs: List[Dict], passengers: int,
+                                 parse: Callable[[Dict], List]) -> List:
+        """Create a Skyscanner live search and poll it until results are ready"""
         if not self.skyscanner_available:
             return []
             
         try:
             # Step 1: Create search session
-            async with httpx.AsyncClient() as client:
+            async with upstream_client(SKYSCANNER) as client:
                 create_response = await client.post(
-                    "https://partners.api.skyscanner.net/apiservices/v3/flights/live/search/create",
+                    f"{SKYSCANNER_BASE_URL}/flights/live/search/create",
                     headers={
                         "x-api-key": SKYSCANNER_API_KEY,
                         "Content-Type": "application/x-www-form-urlencoded"
                     },
                     data={
-                        "queryLegs": json.dumps([{
-                            "originPlaceId": origin,
-                            "destinationPlaceId": destination,
-                            "date": departure_date
-                        }]),
+                        "queryLegs": json.dumps(query_legs),
                         "adults": passengers,
                         "children": 0,
                         "infants": 0,
@@ -100,16 +270,16 @@ class FlightSearchAPI:
                 # Step 2: Poll for results
                 max_attempts = 10
                 for attempt in range(max_attempts):
-                    await asyncio.sleep(2)  # Wait between polls
+                    await asyncio.sleep(SKYSCANNER_POLL_INTERVAL_SECONDS)  # Wait between polls
                     
                     poll_response = await client.get(
-                        f"https://partners.api.skyscanner.net/apiservices/v3/flights/live/search/poll/{session_token}",
+                        f"{SKYSCANNER_BASE_URL}/flights/live/search/poll/{session_token}",
                         headers={"x-api-key": SKYSCANNER_API_KEY}
                     )
                     
                     if poll_response.status_code == 200:
-                        results = poll_response.json()
-                        return self._parse_skyscanner_results(results)
+                        # Large poll payloads are decoded and parsed off the event loop
+                        return await decode_json(poll_response, parse)
                     elif poll_response.status_code == 202:
                         # Still processing, continue polling
                         continue
@@ -123,9 +293,31 @@ class FlightSearchAPI:
             logger.error(f"Error in Skyscanner search: {e}")
             return []
     
+    @traced("flights.amadeus")
     async def search_flights_amadeus(self, origin: str, destination: str, 
-                                   departure_date: str, passengers: int = 1) -> List[Dict]:
+                                   departure_date: str, passengers: int = 1) -> List[FlightResult]:
         """Search flights using Amadeus API"""
+        return await self._amadeus_search({
+            "originLocationCode": origin,
+            "destinationLocationCode": destination,
+            "departureDate": departure_date,
+            "adults": passengers
+        }, self._parse_amadeus_results)
+    
+    @traced("flights.amadeus_round_trip")
+    async def search_round_trips_amadeus(self, origin: str, destination: str, departure_date: str,
+                                         return_date: str, passengers: int = 1) -> List[RoundTripResult]:
+        """Search round-trip offers (one fare for both legs) using Amadeus API"""
+        return await self._amadeus_search({
+            "originLocationCode": origin,
+            "destinationLocationCode": destination,
+            "departureDate": departure_date,
+            "returnDate": return_date,
+            "adults": passengers
+        }, self._parse_amadeus_round_trips)
+    
+    async def _amadeus_search(self, params: Dict, parse: Callable[[Dict], List]) -> List:
+        """Query Amadeus flight offers"""
         if not self.amadeus_available:
             return []
             
@@ -137,26 +329,18 @@ class FlightSearchAPI:
             if not self.amadeus_token:
                 return []
             
-            async with httpx.AsyncClient() as client:
+            async with upstream_client(AMADEUS) as client:
                 response = await client.get(
-                    "https://test.api.amadeus.com/v2/shopping/flight-offers",
+                    f"{AMADEUS_BASE_URL}/v2/shopping/flight-offers",
                     headers={
                         "Authorization": f"Bearer {self.amadeus_token}",
                         "Content-Type": "application/json"
                     },
-                    params={
-                        "originLocationCode": origin,
-                        "destinationLocationCode": destination,
-                        "departureDate": departure_date,
-                        "adults": passengers,
-                        "max": 20,
-                        "currencyCode": "USD"
-                    }
+                    params={**params, "max": 20, "currencyCode": "USD"}
                 )
                 
                 if response.status_code == 200:
-                    data = response.json()
-                    return self._parse_amadeus_results(data)
+                    return await decode_json(response, parse)
                 else:
                     logger.error(f"Amadeus search error: {response.status_code}")
                     return []
@@ -165,63 +349,145 @@ class FlightSearchAPI:
             logger.error(f"Error in Amadeus search: {e}")
             return []
     
-    def _parse_skyscanner_results(self, results: Dict) -> List[Dict]:
-        """Parse Skyscanner API results"""
-        flights = []
+    def _parse_skyscanner_results(self, results: Dict, limit: int = PARSER_TOP_K,
+                                  collector: Optional[TopKFlights] = None) -> List[FlightResult]:
+        """Parse Skyscanner API results, keeping the best `limit` flights
+        
+        The leg and segment tables are looked up once per payload and each leg
+        is parsed once, however many itineraries and pricing options share it.
+        Options that cannot make the top-k on price are skipped before any
+        record is built.
+        """
+        collector = collector if collector is not None else TopKFlights(limit)
         
         try:
-            content = results.get("content", {})
-            results_data = content.get("results", {})
-            
-            # Extract itineraries
+            results_data = results.get("content", {}).get("results", {})
             itineraries = results_data.get("itineraries", {})
+            legs = results_data.get("legs", {})
+            segments = results_data.get("segments", {})
+            carriers = results_data.get("carriers", {})
+            parsed_legs: Dict[str, SkyscannerLeg] = {}
+            prefilter = collector.score is price_score
             
             for itinerary_id, itinerary in itineraries.items():
-                pricing_options = itinerary.get("pricingOptions", [])
+                leg_ids = itinerary.get("legIds")
+                leg_id = leg_ids[0] if leg_ids else ""
+                leg = parsed_legs.get(leg_id)
+                if leg is None:
+                    leg = parsed_legs[leg_id] = self._parse_skyscanner_leg(legs.get(leg_id, {}), segments, carriers)
                 
-                for option in pricing_options:
-                    price = option.get("price", {})
-                    agent = option.get("agentIds", [""])[0]
-                    
-                    # Get leg details
-                    leg_id = itinerary.get("legIds", [""])[0]
-                    leg = results_data.get("legs", {}).get(leg_id, {})
-                    
-                    # Get segment details
-                    segments = []
-                    for segment_id in leg.get("segmentIds", []):
-                        segment = results_data.get("segments", {}).get(segment_id, {})
-                        segments.append({
-                            "departure": segment.get("departureDateTime"),
-                            "arrival": segment.get("arrivalDateTime"),
-                            "origin": segment.get("originPlaceId"),
-                            "destination": segment.get("destinationPlaceId"),
-                            "carrier": segment.get("marketingCarrierId")
-                        })
+                for option in itinerary.get("pricingOptions", ()):
+                    amount = option.get("price", {}).get("amount", 0)
+                    if prefilter and not collector.accepts(amount):
+                        continue
                     
-                    flights.append({
-                        "id": f"skyscanner_{itinerary_id}_{agent}",
-                        "airline": agent,
-                        "flight_number": f"{agent} Flight",
-                        "departure_time": segments[0].get("departure") if segments else "",
-                        "arrival_time": segments[-1].get("arrival") if segments else "",
-                        "duration": self._calculate_duration(segments),
-                        "price": {"USD": price.get("amount", 0)},
-                        "stops": len(segments) - 1,
-                        "aircraft": "Commercial Aircraft",
-                        "booking_link": option.get("url", ""),
-                        "source": "Skyscanner"
-                    })
+                    agent_ids = option.get("agentIds")
+                    agent = agent_ids[0] if agent_ids else ""
+                    collector.push(self._skyscanner_flight(f"skyscanner_{itinerary_id}_{agent}", leg, agent,
+                                                           amount, option.get("url", "")))
                     
         except Exception as e:
             logger.error(f"Error parsing Skyscanner results: {e}")
+        
+        return collector.results()
+    
+    def _parse_skyscanner_round_trips(self, results: Dict, limit: int = PARSER_TOP_K) -> List[RoundTripResult]:
+        """Parse two-leg Skyscanner itineraries, keeping the best `limit` round trips"""
+        collector = TopKFlights(limit, key=trip_key)
+        
+        try:
+            results_data = results.get("content", {}).get("results", {})
+            legs = results_data.get("legs", {})
+            segments = results_data.get("segments", {})
+            carriers = results_data.get("carriers", {})
+            parsed_legs: Dict[str, SkyscannerLeg] = {}
             
-        return flights[:10]  # Return top 10 results
+            for itinerary_id, itinerary in results_data.get("itineraries", {}).items():
+                leg_ids = itinerary.get("legIds") or ()
+                if len(leg_ids) < 2:
+                    continue
+                for leg_id in leg_ids[:2]:
+                    if leg_id not in parsed_legs:
+                        parsed_legs[leg_id] = self._parse_skyscanner_leg(legs.get(leg_id, {}), segments, carriers)
+                outbound, inbound = parsed_legs[leg_ids[0]], parsed_legs[leg_ids[1]]
+                
+                for option in itinerary.get("pricingOptions", ()):
+                    amount = option.get("price", {}).get("amount", 0)
+                    if not collector.accepts(amount):
+                        continue
+                    
+                    agent_ids = option.get("agentIds")
+                    agent = agent_ids[0] if agent_ids else ""
+                    trip_id = f"skyscanner_{itinerary_id}_{agent}"
+                    link = option.get("url", "")
+                    collector.push(RoundTripResult(
+                        id=trip_id,
+                        outbound=self._skyscanner_flight(f"{trip_id}_out", outbound, agent, None, link),
+                        inbound=self._skyscanner_flight(f"{trip_id}_back", inbound, agent, None, link),
+                        price_usd=amount,
+                        fare="combined",
+                        source="Skyscanner"
+                    ))
+                    
+        except Exception as e:
+            logger.error(f"Error parsing Skyscanner round trips: {e}")
+        
+        return collector.results()
     
-    def _parse_amadeus_results(self, results: Dict) -> List[Dict]:
-        """Parse Amadeus API results"""
-        flights = []
+    def _skyscanner_flight(self, flight_id: str, leg: SkyscannerLeg, agent: str, price: Optional[float],
+                           link: str) -> FlightResult:
+        """Flight record for a parsed Skyscanner leg sold by one agent (price None for a leg of a combined fare)"""
+        return FlightResult(
+            id=flight_id,
+            airline=leg.carrier or agent,
+            flight_number=leg.flight_number or f"{agent} Flight",
+            departure_time=leg.departure_time,
+            arrival_time=leg.arrival_time,
+            duration=leg.duration,
+            price_usd=price,
+            stops=leg.stops,
+            booking_link=link,
+            source="Skyscanner"
+        )
+    
+    def _parse_skyscanner_leg(self, leg: Dict, segments: Dict, carriers: Dict) -> SkyscannerLeg:
+        """Parse one Skyscanner leg using the payload's segment and carrier tables"""
+        leg_segments = [segments.get(segment_id, {}) for segment_id in leg.get("segmentIds", ())]
+        first = leg_segments[0] if leg_segments else {}
+        last = leg_segments[-1] if leg_segments else {}
+        
+        departure = _skyscanner_datetime(first.get("departureDateTime") or leg.get("departureDateTime"))
+        arrival = _skyscanner_datetime(last.get("arrivalDateTime") or leg.get("arrivalDateTime"))
+        
+        minutes = leg.get("durationInMinutes")
+        if minutes is not None:
+            duration = f"{int(minutes) // 60}h {int(minutes) % 60}m"
+        elif leg_segments:
+            duration = self._calculate_duration([{"departure": departure, "arrival": arrival}])
+        else:
+            duration = "Unknown"
         
+        # marketingCarrierId is an opaque Skyscanner ID; the carrier table gives the airline and its
+        # IATA code, so flight numbers read like Amadeus's ("LH 123") and the two providers dedupe
+        entry = carriers.get(first.get("marketingCarrierId", ""), {})
+        code = entry.get("iata") or entry.get("displayCode") or ""
+        number = first.get("marketingFlightNumber", "")
+        
+        return SkyscannerLeg(
+            departure_time=departure,
+            arrival_time=arrival,
+            duration=duration,
+            stops=len(leg_segments) - 1,
+            carrier=entry.get("name") or code,
+            flight_number=f"{code} {number}" if code and number else ""
+        )
+    
+    def _parse_amadeus_results(self, results: Dict, limit: int = PARSER_TOP_K) -> List[FlightResult]:
+        """Parse Amadeus API results, keeping the best `limit` flights"""
+        return TopKFlights(limit).extend(self._iter_amadeus_flights(results)).results()
+    
+    def _iter_amadeus_flights(self, results: Dict) -> Iterator[FlightResult]:
+        """Yield flights from Amadeus API results"""
         try:
             data = results.get("data", [])
             
@@ -230,37 +496,64 @@ class FlightSearchAPI:
                 if not itineraries:
                     continue
                     
-                itinerary = itineraries[0]
-                segments = itinerary.get("segments", [])
-                
-                if not segments:
-                    continue
-                
-                # Calculate duration
-                duration = flight.get("itineraries", [{}])[0].get("duration", "")
-                
                 # Get price
                 price = flight.get("price", {})
                 total_price = price.get("total", "0")
                 
-                flights.append({
-                    "id": f"amadeus_{flight.get('id', 'unknown')}",
-                    "airline": segments[0].get("carrierCode", "Unknown"),
-                    "flight_number": f"{segments[0].get('carrierCode', '')} {segments[0].get('number', '')}",
-                    "departure_time": segments[0].get("departure", {}).get("at", ""),
-                    "arrival_time": segments[-1].get("arrival", {}).get("at", ""),
-                    "duration": duration,
-                    "price": {"USD": float(total_price) if total_price else 0},
-                    "stops": len(segments) - 1,
-                    "aircraft": "Commercial Aircraft",
-                    "booking_link": f"https://www.amadeus.com/flights/{flight.get('id', '')}",
-                    "source": "Amadeus"
-                })
+                parsed = self._amadeus_flight(flight, itineraries[0], float(total_price) if total_price else 0)
+                if parsed is not None:
+                    yield parsed
                 
         except Exception as e:
             logger.error(f"Error parsing Amadeus results: {e}")
-            
-        return flights[:10]  # Return top 10 results
+    
+    def _parse_amadeus_round_trips(self, results: Dict, limit: int = PARSER_TOP_K) -> List[RoundTripResult]:
+        """Parse Amadeus round-trip offers (outbound and return itineraries under one price)"""
+        collector = TopKFlights(limit, key=trip_key)
+        try:
+            for offer in results.get("data", []):
+                itineraries = offer.get("itineraries", [])
+                if len(itineraries) < 2:
+                    continue
+                total_price = offer.get("price", {}).get("total", "0")
+                amount = float(total_price) if total_price else 0
+                if not collector.accepts(amount):
+                    continue
+                outbound = self._amadeus_flight(offer, itineraries[0], None, "_out")
+                inbound = self._amadeus_flight(offer, itineraries[1], None, "_back")
+                if outbound is None or inbound is None:
+                    continue
+                collector.push(RoundTripResult(
+                    id=f"amadeus_{offer.get('id', 'unknown')}",
+                    outbound=outbound,
+                    inbound=inbound,
+                    price_usd=amount,
+                    fare="combined",
+                    source="Amadeus"
+                ))
+        except Exception as e:
+            logger.error(f"Error parsing Amadeus round trips: {e}")
+        return collector.results()
+    
+    def _amadeus_flight(self, offer: Dict, itinerary: Dict, price: Optional[float],
+                        suffix: str = "") -> Optional[FlightResult]:
+        """Flight record for one Amadeus itinerary (price None for a leg of a combined fare); None without segments"""
+        segments = itinerary.get("segments", [])
+        if not segments:
+            return None
+        
+        return FlightResult(
+            id=f"amadeus_{offer.get('id', 'unknown')}{suffix}",
+            airline=segments[0].get("carrierCode", "Unknown"),
+            flight_number=f"{segments[0].get('carrierCode', '')} {segments[0].get('number', '')}",
+            departure_time=segments[0].get("departure", {}).get("at", ""),
+            arrival_time=segments[-1].get("arrival", {}).get("at", ""),
+            duration=itinerary.get("duration", ""),
+            price_usd=price,
+            stops=len(segments) - 1,
+            booking_link=f"https://www.amadeus.com/flights/{offer.get('id', '')}",
+            source="Amadeus"
+        )
     
     def _calculate_duration(self, segments: List[Dict]) -> str:
         """Calculate total flight duration from segments"""
@@ -281,91 +574,169 @@ class FlightSearchAPI:
             return "Unknown"
     
     async def search_flights(self, origin: str, destination: str, 
-                           departure_date: str, passengers: int = 1) -> List[Dict]:
+                           departure_date: str, passengers: int = 1,
+                           score: Callable[[FlightResult], float] = price_score) -> List[FlightResult]:
         """Search flights using all available APIs"""
-        all_flights = []
-        
-        # Search with Skyscanner
+        searches = []
         if self.skyscanner_available:
-            skyscanner_flights = await self.search_flights_skyscanner(
-                origin, destination, departure_date, passengers
-            )
-            all_flights.extend(skyscanner_flights)
-        
-        # Search with Amadeus
+            searches.append(self.search_flights_skyscanner(origin, destination, departure_date, passengers))
         if self.amadeus_available:
-            amadeus_flights = await self.search_flights_amadeus(
-                origin, destination, departure_date, passengers
-            )
-            all_flights.extend(amadeus_flights)
+            searches.append(self.search_flights_amadeus(origin, destination, departure_date, passengers))
+        
+        # Merge provider results into one bounded, deduplicated top-k
+        top_flights = TopKFlights(SEARCH_TOP_K, score)
+        for provider_flights in await asyncio.gather(*searches):
+            top_flights.extend(provider_flights)
         
         # If no real APIs available, return mock data
-        if not all_flights:
-            all_flights = self._get_mock_flights(origin, destination, departure_date, passengers)
+        if not len(top_flights):
+            top_flights.extend(self._get_mock_flights(origin, destination, departure_date, passengers))
         
-        # Sort by price and remove duplicates
-        unique_flights = self._remove_duplicates(all_flights)
-        sorted_flights = sorted(unique_flights, key=lambda x: x["price"]["USD"])
+        return top_flights.results()
+    
+    def _airport_pairs(self, origin: str, destination: str,
+                       fan_out: Optional[bool] = None) -> Optional[List[Tuple[str, str]]]:
+        """Airport pairs to search for a free-text route, primary airports first; None if unresolved"""
+        origins = airport_resolver.resolve(origin)
+        destinations = airport_resolver.resolve(destination)
+        if not origins or not destinations:
+            return None
         
-        return sorted_flights[:15]  # Return top 15 results
+        if not (AIRPORT_FANOUT_ENABLED if fan_out is None else fan_out):
+            origins, destinations = origins[:1], destinations[:1]
+        
+        # Prefer pairs of primary airports when the pair count is capped
+        pairs = sorted(
+            ((i + j, o, d) for i, o in enumerate(origins) for j, d in enumerate(destinations) if o != d),
+            key=lambda pair: pair[0]
+        )[:MAX_AIRPORT_PAIRS]
+        return [(o, d) for _, o, d in pairs]
     
-    def _get_mock_flights(self, origin: str, destination: str, 
-                         departure_date: str, passengers: int) -> List[Dict]:
-        """Return mock flight data when no APIs are available"""
+    @traced("flights.search_resolved")
+    async def search_flights_resolved(self, origin: str, destination: str,
+                                    departure_date: str, passengers: int = 1,
+                                    fan_out: Optional[bool] = None) -> List[FlightResult]:
+        """Resolve free-text places to IATA codes and search every airport pair"""
+        pairs = self._airport_pairs(origin, destination, fan_out)
+        
+        # Providers cannot answer for unresolved names (or a route within one airport), so skip the call
+        if not pairs:
+            logger.info(f"Could not resolve route {origin} -> {destination}, using mock data")
+            return self._get_mock_flights(origin, destination, departure_date, passengers)
+        if len(pairs) == 1:
+            return await self.search_flights(pairs[0][0], pairs[0][1], departure_date, passengers)
+        
+        results = await asyncio.gather(*[
+            self.search_flights(o, d, departure_date, passengers) for o, d in pairs
+        ])
+        
+        top_flights = TopKFlights(SEARCH_TOP_K)
+        for flights in results:
+            top_flights.extend(flights)
+        
+        return top_flights.results()
+    
+    @traced("flights.search_round_trip")
+    async def search_round_trip(self, origin: str, destination: str, departure_date: str,
+                                return_date: str, passengers: int = 1,
+                                fan_out: Optional[bool] = None) -> List[RoundTripResult]:
+        """Search round trips: one two-leg query per provider, else both legs concurrently, paired by price"""
+        pairs = self._airport_pairs(origin, destination, fan_out)
+        
+        searches = []
+        for o, d in pairs or ():
+            if self.skyscanner_available:
+                searches.append(self.search_round_trips_skyscanner(o, d, departure_date, return_date, passengers))
+            if self.amadeus_available:
+                searches.append(self.search_round_trips_amadeus(o, d, departure_date, return_date, passengers))
+        
+        top_trips = TopKFlights(SEARCH_TOP_K, key=trip_key)
+        for trips in await asyncio.gather(*searches):
+            top_trips.extend(trips)
+        if len(top_trips):
+            return top_trips.results()
+        
+        # No provider priced the trip as a whole: price each leg and combine the cheapest pairs
+        outbound, inbound = await asyncio.gather(
+            self.search_flights_resolved(origin, destination, departure_date, passengers, fan_out),
+            self.search_flights_resolved(destination, origin, return_date, passengers, fan_out)
+        )
         return [
-            {
-                "id": "mock_1",
-                "airline": "Delta Airlines",
-                "flight_number": "DL123",
-                "departure_time": f"{departure_date}T09:00:00",
-                "arrival_time": f"{departure_date}T11:30:00",
-                "duration": "2h 30m",
-                "price": {"USD": 450, "EUR": 380, "GBP": 330},
-                "stops": 0,
-                "aircraft": "Boeing 737",
-                "booking_link": "https://www.delta.com",
-                "source": "Mock Data"
-            },
-            {
-                "id": "mock_2",
-                "airline": "American Airlines",
-                "flight_number": "AA456",
-                "departure_time": f"{departure_date}T14:15:00",
-                "arrival_time": f"{departure_date}T16:45:00",
-                "duration": "2h 30m",
-                "price": {"USD": 380, "EUR": 320, "GBP": 280},
-                "stops": 1,
-                "aircraft": "Airbus A320",
-                "booking_link": "https://www.aa.com",
-                "source": "Mock Data"
-            },
-            {
-                "id": "mock_3",
-                "airline": "United Airlines",
-                "flight_number": "UA789",
-                "departure_time": f"{departure_date}T07:30:00",
-                "arrival_time": f"{departure_date}T10:15:00",
-                "duration": "2h 45m",
-                "price": {"USD": 520, "EUR": 440, "GBP": 380},
-                "stops": 0,
-                "aircraft": "Boeing 787",
-                "booking_link": "https://www.united.com",
-                "source": "Mock Data"
-            }
+            RoundTripResult(
+                id=f"{out.id}+{back.id}",
+                outbound=out,
+                inbound=back,
+                price_usd=round(out.price_usd + back.price_usd, 2),
+                fare="separate",
+                source=out.source if out.source == back.source else f"{out.source}+{back.source}"
+            )
+            for out, back in cheapest_pairs(outbound, inbound, SEARCH_TOP_K)
         ]
     
-    def _remove_duplicates(self, flights: List[Dict]) -> List[Dict]:
-        """Remove duplicate flights based on airline and flight number"""
+    def _get_mock_flights(self, origin: str, destination: str, 
+                         departure_date: str, passengers: int) -> List[FlightResult]:
+        """Return mock flight data when no APIs are available"""
+        return list(_mock_flights(departure_date))
+    
+    def _remove_duplicates(self, flights: List[FlightResult]) -> List[FlightResult]:
+        """Remove duplicate flights based on flight number (with carrier code) and departure time"""
         seen = set()
         unique_flights = []
         
         for flight in flights:
-            key = f"{flight['airline']}_{flight['flight_number']}"
+            key = flight_key(flight)
             if key not in seen:
                 seen.add(key)
                 unique_flights.append(flight)
         
         return unique_flights
 
+
+@lru_cache(maxsize=128)
+def _mock_flights(departure_date: str) -> Tuple[FlightResult, ...]:
+    """Mock flights for a date, built once so their serialized form is reused"""
+    return (
+        FlightResult(
+            id="mock_1",
+            airline="Delta Airlines",
+            flight_number="DL123",
+            departure_time=f"{departure_date}T09:00:00",
+            arrival_time=f"{departure_date}T11:30:00",
+            duration="2h 30m",
+            price_usd=450,
+            stops=0,
+            aircraft="Boeing 737",
+            booking_link="https://www.delta.com",
+            source="Mock Data"
+        ),
+        FlightResult(
+            id="mock_2",
+            airline="American Airlines",
+            flight_number="AA456",
+            departure_time=f"{departure_date}T14:15:00",
+            arrival_time=f"{departure_date}T16:45:00",
+            duration="2h 30m",
+            price_usd=380,
+            stops=1,
+            aircraft="Airbus A320",
+            booking_link="https://www.aa.com",
+            source="Mock Data"
+        ),
+        FlightResult(
+            id="mock_3",
+            airline="United Airlines",
+            flight_number="UA789",
+            departure_time=f"{departure_date}T07:30:00",
+            arrival_time=f"{departure_date}T10:15:00",
+            duration="2h 45m",
+            price_usd=520,
+            stops=0,
+            aircraft="Boeing 787",
+            booking_link="https://www.united.com",
+            source="Mock Data"
+        )
+    )
+
+
 # Global instance
 flight_api = FlightSearchAPI()
@@ -0,0 +1,157 @@
+"""
+Hedged Provider Requests
+Sends a second copy of a slow idempotent GET once it outlives the provider's tracked latency percentile, keeping whichever answers first.
+"""
+
+import asyncio
+import logging
+import os
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+import httpx
+
+from metrics import registry
+
+logger = logging.getLogger(__name__)
+
+HEDGE_ENABLED = os.getenv("HEDGE_ENABLED", "false").lower() == "true"
+# provider:path-suffix pairs eligible for hedging (GETs only)
+HEDGE_TARGETS = os.getenv(
+    "HEDGE_TARGETS",
+    "weatherapi:/current.json,weatherapi:/forecast.json,exchangerate:/latest,amadeus:/shopping/flight-offers")
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "0.9"))
+# Hedges allowed per eligible call, on average (token bucket)
+HEDGE_MAX_RATIO = float(os.getenv("HEDGE_MAX_RATIO", "0.1"))
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+HEDGE_MIN_DELAY_MS = float(os.getenv("HEDGE_MIN_DELAY_MS", "5"))
+HEDGE_SAMPLES = 256
+HEDGE_BURST = 10.0
+
+Send = Callable[[httpx.Request], Awaitable[httpx.Response]]
+
+
+def parse_targets(spec: str) -> Dict[str, Tuple[str, ...]]:
+    """Parse "provider:/path,..." into path suffixes per provider"""
+    targets: Dict[str, List[str]] = {}
+    for item in spec.split(","):
+        provider, _, path = item.strip().partition(":")
+        if provider and path:
+            targets.setdefault(provider, []).append(path)
+        elif item.strip():
+            logger.error(f"Ignoring malformed hedge target: {item!r}")
+    return {provider: tuple(paths) for provider, paths in targets.items()}
+
+
+class LatencyTracker:
+    """Recent latencies of one hedge target, with a percentile refreshed every few observations"""
+
+    def __init__(self, percentile: float = HEDGE_PERCENTILE, size: int = HEDGE_SAMPLES):
+        self.percentile = percentile
+        self.samples: Deque[float] = deque(maxlen=size)
+        self._value: Optional[float] = None
+        self._stale = 0
+
+    def observe(self, seconds: float):
+        self.samples.append(seconds)
+        self._stale += 1
+
+    def value(self) -> Optional[float]:
+        if len(self.samples) < HEDGE_MIN_SAMPLES:
+            return None
+        if self._value is None or self._stale >= 16:
+            ordered = sorted(self.samples)
+            self._value = ordered[min(len(ordered) - 1, int(len(ordered) * self.percentile))]
+            self._stale = 0
+        return self._value
+
+
+class HedgePolicy:
+    """Which calls may be hedged, after how long, and how often"""
+
+    def __init__(self, enabled: bool = HEDGE_ENABLED, targets: str = HEDGE_TARGETS,
+                 max_ratio: float = HEDGE_MAX_RATIO):
+        self.enabled = enabled
+        self.targets = parse_targets(targets)
+        self.max_ratio = max_ratio
+        self.trackers: Dict[Tuple[str, str], LatencyTracker] = {}
+        self._tokens = HEDGE_BURST
+
+    def target(self, provider: str, request: httpx.Request) -> Optional[str]:
+        """The configured path suffix this request matches, if it is an eligible GET"""
+        if not self.enabled or request.method != "GET":
+            return None
+        path = request.url.path
+        return next((suffix for suffix in self.targets.get(provider, ()) if path.endswith(suffix)), None)
+
+    def tracker(self, provider: str, target: str) -> LatencyTracker:
+        key = (provider, target)
+        if key not in self.trackers:
+            self.trackers[key] = LatencyTracker()
+        return self.trackers[key]
+
+    def delay(self, provider: str, target: str) -> Optional[float]:
+        """Seconds to wait before hedging; None until enough latencies are known"""
+        self._tokens = min(HEDGE_BURST, self._tokens + self.max_ratio)
+        value = self.tracker(provider, target).value()
+        return None if value is None else max(value, HEDGE_MIN_DELAY_MS / 1000)
+
+    def take_token(self) -> bool:
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+
+async def _discard(task: asyncio.Task):
+    """Cancel a losing attempt, closing its response if it already arrived"""
+    if not task.done():
+        task.cancel()
+    try:
+        response = await task
+    except BaseException:
+        return
+    await response.aclose()
+
+
+async def hedged_send(send: Send, request: httpx.Request, delay: float, policy: HedgePolicy,
+                      provider: str) -> httpx.Response:
+    """Send the request; if no answer within delay (and the budget allows), race a second copy"""
+    first = asyncio.ensure_future(send(request))
+    try:
+        done, _ = await asyncio.wait({first}, timeout=delay)
+    except BaseException:
+        await _discard(first)
+        raise
+    if done or not policy.take_token():
+        return await first
+
+    second = asyncio.ensure_future(send(request))
+    pending = {first, second}
+    winner: Optional[asyncio.Task] = None
+    error: Optional[BaseException] = None
+    try:
+        while pending and winner is None:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    winner = task
+                    break
+                error = error or task.exception()
+        if winner is None:
+            raise error
+        HEDGES.inc(provider, "won" if winner is second else "lost")
+        return winner.result()
+    finally:
+        for task in (first, second):
+            if task is not winner:
+                await _discard(task)
+
+
+# Global instance
+hedge_policy = HedgePolicy()
+
+HEDGES = registry.counter(
+    "upstream_hedged_requests_total",
+    "Hedged provider calls by whether the second copy answered first (won) or the original did (lost)",
+    ("provider", "outcome"))
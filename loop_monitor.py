@@ -0,0 +1,73 @@
+"""
+Event Loop Lag Monitor
+Measures how late the asyncio event loop wakes up, as a signal of blocking work on the loop.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+LOOP_LAG_INTERVAL_SECONDS = float(os.getenv("LOOP_LAG_INTERVAL_SECONDS", "0.25"))
+LOOP_LAG_WARN_MS = float(os.getenv("LOOP_LAG_WARN_MS", "200"))
+
+
+class LoopLagMonitor:
+    """Background task that sleeps a fixed interval and records the overshoot"""
+
+    def __init__(self, interval: float = LOOP_LAG_INTERVAL_SECONDS, window: int = 240):
+        self.interval = interval
+        self.samples: Deque[float] = deque(maxlen=window)
+        self.max_lag_ms = 0.0
+        self.total_samples = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Start sampling on the running loop"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop sampling"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.record((time.perf_counter() - started - self.interval) * 1000)
+
+    def record(self, lag_ms: float):
+        """Record one lag sample in milliseconds"""
+        lag_ms = max(lag_ms, 0.0)
+        self.samples.append(lag_ms)
+        self.total_samples += 1
+        self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+        if lag_ms >= LOOP_LAG_WARN_MS:
+            logger.warning(f"Event loop lag {lag_ms:.0f}ms")
+
+    def snapshot(self) -> Dict:
+        """Current lag statistics over the recent window"""
+        if not self.samples:
+            return {"current_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0, "samples": 0}
+        ordered = sorted(self.samples)
+        return {
+            "current_ms": round(self.samples[-1], 2),
+            "p99_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))], 2),
+            "max_ms": round(self.max_lag_ms, 2),
+            "samples": self.total_samples
+        }
+
+
+# Global instance
+loop_monitor = LoopLagMonitor()
@@ -3,15 +3,17 @@ Comprehensive Travel AI Backend - AI-powered travel planning with booking integr
 Features: AI chat, destination recommendations, flight booking, hotel booking, activity planning.
 """
 
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import List, Dict, Optional, Tuple
-import httpx
+from typing import Awaitable, Callable, Iterator, List, Dict, Optional, Tuple, Union
 import os
 from dotenv import load_dotenv
 import logging
 from datetime import datetime, timedelta
+from functools import partial
 import json
 import re
 import uuid
@@ -25,11 +27,46 @@ from typing import List, Dict, Optional, Tuple
 # Load environment variables
 load_dotenv()
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+from structured_logging import log_event, structured_logging
+
+# Configure logging (JSON lines written by a background thread)
+structured_logging.configure()
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Travel AI API", version="1.0.0")
+from cache import CACHES, TTLCache
+from cassettes import cassette_library, replaying
+from circuit_breaker import circuit_breakers
+from compression import CompressionMiddleware, compression_cache
+from deadlines import remaining, request_deadline, stage_budget, with_deadline, within
+from decoding import decode_json, shutdown_executor
+from loop_monitor import loop_monitor
+from metrics import MetricsMiddleware, registry
+from prefetch import PopularKeys, PrefetchJob, prefetcher
+from pagination import ListingError, PageRequest, project, query_fingerprint
+from profiling import ProfilingMiddleware, authorized, profile_path
+from responses import FastJSONResponse, bytes_response, conditional_response, json_response, payload_cache
+from tracing import TracingMiddleware, traced
+from upstream import AMADEUS, EXCHANGERATE, GROQ, SKYSCANNER, WEATHERAPI, upstream_client
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start background monitors and cache prefetching on startup and release workers on shutdown."""
+    structured_logging.configure()
+    loop_monitor.start()
+    prefetcher.start()
+    yield
+    await prefetcher.stop()
+    await loop_monitor.stop()
+    shutdown_executor()
+    cassette_library.flush()
+    structured_logging.stop()
+
+app = FastAPI(
+    title="Travel AI API",
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
+)
 
 # CORS middleware
 app.add_middleware(
@@ -40,9 +77,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# gzip/brotli for large JSON bodies (flights, recommendations, destinations)
+app.add_middleware(CompressionMiddleware)
+
+# Samples requests sent with a valid X-Profile-Token header (requires PROFILE_TOKEN)
+app.add_middleware(ProfilingMiddleware)
+
+# Spans per request (exported when TRACE_EXPORT is set) and optional Server-Timing
+app.add_middleware(TracingMiddleware)
+
+# Outermost, so request latency includes compression and CORS
+app.add_middleware(MetricsMiddleware)
+
 # API Keys and Configuration
 GROQ_API_KEY = os.getenv("GROQ_API_KEY", "")
-GROQ_BASE_URL = "https://api.groq.com/openai/v1/chat/completions"
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL", "https://api.groq.com/openai/v1/chat/completions")
 
 # Real API Keys from environment variables
 SKYSCANNER_API_KEY = os.getenv("SKYSCANNER_API_KEY", "")
@@ -53,8 +102,57 @@ WEATHER_API_KEY = os.getenv("WEATHER_API_KEY", "")
 GOOGLE_PLACES_API_KEY = os.getenv("GOOGLE_PLACES_API_KEY", "")
 CURRENCY_API_KEY = os.getenv("CURRENCY_API_KEY", "")
 
+# Browser/CDN cache lifetime for the static destinations catalog
+DESTINATIONS_MAX_AGE_SECONDS = int(os.getenv("DESTINATIONS_MAX_AGE_SECONDS", "3600"))
+
+# Search results are kept briefly so later pages of a cursor walk see the same list
+SEARCH_RESULTS_TTL_SECONDS = int(os.getenv("SEARCH_RESULTS_TTL_SECONDS", "300"))
+search_results = TTLCache("search_results", SEARCH_RESULTS_TTL_SECONDS, maxsize=256)
+
+# Trip cost components are memoized independently, so changing guests or currency only redoes arithmetic
+FLIGHT_COMPONENT_TTL_SECONDS = float(os.getenv("FLIGHT_COMPONENT_TTL_SECONDS", "900"))
+HOTEL_COMPONENT_TTL_SECONDS = float(os.getenv("HOTEL_COMPONENT_TTL_SECONDS", "1800"))
+LIVING_COMPONENT_TTL_SECONDS = float(os.getenv("LIVING_COMPONENT_TTL_SECONDS", "86400"))
+# Estimates standing in for failed lookups are retried sooner
+COMPONENT_FALLBACK_TTL_SECONDS = float(os.getenv("COMPONENT_FALLBACK_TTL_SECONDS", "60"))
+# /cost-analysis/batch: trips per request and concurrent unique lookups
+BATCH_MAX_TRIPS = int(os.getenv("BATCH_MAX_TRIPS", "50"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+# Flexible-date price calendar: +/- days searched, trip lengths per request (and the longest allowed)
+# and concurrent leg searches
+CALENDAR_MAX_WINDOW_DAYS = int(os.getenv("CALENDAR_MAX_WINDOW_DAYS", "7"))
+CALENDAR_MAX_TRIP_LENGTHS = int(os.getenv("CALENDAR_MAX_TRIP_LENGTHS", "4"))
+CALENDAR_MAX_TRIP_DAYS = int(os.getenv("CALENDAR_MAX_TRIP_DAYS", "30"))
+CALENDAR_CONCURRENCY = int(os.getenv("CALENDAR_CONCURRENCY", "6"))
+# Days either side of the parsed dates searched for the cheapest window in recommendations (0 = fixed dates)
+RECOMMENDATIONS_FLEXIBLE_DAYS = int(os.getenv("RECOMMENDATIONS_FLEXIBLE_DAYS", "0"))
+ESTIMATED_SOURCES = {"Estimated", "Fallback data", "No data available", "No price data"}
+flight_components = TTLCache("cost_flights", FLIGHT_COMPONENT_TTL_SECONDS)
+hotel_components = TTLCache("cost_hotels", HOTEL_COMPONENT_TTL_SECONDS)
+living_components = TTLCache("cost_of_living", LIVING_COMPONENT_TTL_SECONDS)
+
+# Background prefetch: base currencies kept warm, forecast length, and how many of the most requested
+# route/date lookups are refreshed (destination weather is kept warm for the whole catalog)
+PREFETCH_CURRENCIES = [code.strip().upper() for code in os.getenv("PREFETCH_CURRENCIES", "USD,EUR,GBP").split(",") if code.strip()]
+PREFETCH_FORECAST_DAYS = int(os.getenv("PREFETCH_FORECAST_DAYS", "7"))
+PREFETCH_TOP_ROUTES = int(os.getenv("PREFETCH_TOP_ROUTES", "20"))
+popular_routes = PopularKeys()
+
+# Overall time budgets; components that miss them are replaced by estimates
+RECOMMENDATIONS_DEADLINE_SECONDS = float(os.getenv("RECOMMENDATIONS_DEADLINE_SECONDS", "20"))
+COST_ANALYSIS_DEADLINE_SECONDS = float(os.getenv("COST_ANALYSIS_DEADLINE_SECONDS", "8"))
+# Share of the recommendations budget spent pricing candidates, the rest goes to the LLM
+COSTING_BUDGET_SHARE = float(os.getenv("COSTING_BUDGET_SHARE", "0.4"))
+# Below this much time left the LLM is skipped in favour of the filtered fallback
+GROQ_MIN_SECONDS = float(os.getenv("GROQ_MIN_SECONDS", "3"))
+
+@app.exception_handler(ListingError)
+async def listing_error_handler(request: Request, exc: ListingError):
+    return json_response({"detail": str(exc)}, status_code=400)
+
 # Import flight search API
 from flight_apis import flight_api
+from records import DISPLAY_RATES, FlightResult, HotelResult, ActivityResult, RoundTripResult, serialize_json
 from weather_api import weather_api
 from currency_api import currency_api
 
@@ -101,6 +199,24 @@ class ActivitySearch(BaseModel):
     date: str
     participants: int = 1
 
+class FlightCalendarSearch(BaseModel):
+    origin: str
+    destination: str
+    departure_date: str
+    window_days: int = 3
+    trip_lengths: List[int] = [7]
+
+class TripCostRequest(BaseModel):
+    origin: str
+    destination: str
+    departure_date: str
+    return_date: str
+    guests: int = 1
+    currency: str = "USD"
+
+class BatchCostRequest(BaseModel):
+    trips: List[TripCostRequest]
+
 # Conversation state storage (in production, use Redis or database)
 conversation_states = {}
 
@@ -230,6 +346,56 @@ TRAVEL_DATA = {
     }
 }
 
+# Mock results used when no hotel/activity API key is configured.
+# Built once so their serialized form is reused across requests.
+MOCK_HOTELS = [
+    HotelResult(
+        id="hotel_1",
+        name="Grand Hotel & Spa",
+        rating=4.8,
+        price_per_night_usd=250,
+        amenities=["WiFi", "Pool", "Spa", "Restaurant"],
+        location="City Center",
+        image="https://images.unsplash.com/photo-1566073771259-6a8506099945?w=800",
+        booking_link="https://www.hotels.com"
+    ),
+    HotelResult(
+        id="hotel_2",
+        name="Boutique Hotel",
+        rating=4.5,
+        price_per_night_usd=180,
+        amenities=["WiFi", "Breakfast", "Bar"],
+        location="Downtown",
+        image="https://images.unsplash.com/photo-1551882547-ff40c63fe5fa?w=800",
+        booking_link="https://www.booking.com"
+    )
+]
+
+MOCK_ACTIVITIES = [
+    ActivityResult(
+        id="activity_1",
+        name="City Walking Tour",
+        description="Explore the city with a knowledgeable guide",
+        duration="3 hours",
+        price_usd=45,
+        rating=4.7,
+        category="Cultural",
+        image="https://images.unsplash.com/photo-1449824913935-59a10b8d2000?w=800",
+        booking_link="https://www.viator.com"
+    ),
+    ActivityResult(
+        id="activity_2",
+        name="Adventure Sports",
+        description="Thrilling outdoor activities and sports",
+        duration="4 hours",
+        price_usd=80,
+        rating=4.9,
+        category="Adventure",
+        image="https://images.unsplash.com/photo-1551698618-1dfe5d97d256?w=800",
+        booking_link="https://www.getyourguide.com"
+    )
+]
+
 # Currency conversion rates (you can use a real API for this)
 CURRENCY_RATES = {
     "USD": 1.0,
@@ -239,10 +405,11 @@ CURRENCY_RATES = {
     "AUD": 1.35
 }
 
+@traced()
 async def call_groq_ai(message: str, conversation_history: List[Dict[str, str]] = None) -> str:
     """Call Groq AI API for travel planning conversation."""
     try:
-        if not GROQ_API_KEY or GROQ_API_KEY == "your-groq-api-key-here":
+        if (not GROQ_API_KEY or GROQ_API_KEY == "your-groq-api-key-here") and not replaying():
             return "I'm here to help you plan your trip! Please provide your Groq API key to enable AI features."
 
         # Prepare conversation history
@@ -253,7 +420,7 @@ async def call_groq_ai(message: str, conversation_history: List[Dict[str, str]]
 
         messages.append({"role": "user", "content": message})
 
-        async with httpx.AsyncClient(timeout=30.0) as client:
+        async with upstream_client(GROQ, timeout=30.0) as client:
             response = await client.post(
                 GROQ_BASE_URL,
                 headers={
@@ -272,7 +439,7 @@ async def call_groq_ai(message: str, conversation_history: List[Dict[str, str]]
             )
 
             if response.status_code == 200:
-                data = response.json()
+                data = await decode_json(response)
                 return data["choices"][0]["message"]["content"]
             else:
                 logger.error(f"Groq API error: {response.status_code} - {response.text}")
@@ -288,10 +455,11 @@ async def handle_conversational_flow(message: str, session_id: str) -> Dict:
         # Get or create conversation state
         if session_id not in conversation_states:
             conversation_states[session_id] = ConversationState(session_id=session_id)
-            logger.info(f"Created new conversation state for session: {session_id}")
+            log_event(logger, logging.INFO, "conversation.created", route="chat", session_id=session_id)
         
         state = conversation_states[session_id]
-        logger.info(f"Current step: {state.current_step}, Collected data: {state.collected_data}")
+        log_event(logger, logging.DEBUG, "conversation.turn", route="chat", session_id=session_id,
+                  step=state.current_step, collected_data=state.collected_data)
         
         # Extract information from user message based on current step
         extracted_info = await extract_travel_info(message, state.current_step)
@@ -317,6 +485,7 @@ async def handle_conversational_flow(message: str, session_id: str) -> Dict:
             "recommendations": None
         }
 
+@traced()
 async def extract_travel_info(message: str, current_step: str) -> Dict[str, str]:
     """Extract travel information from user message based on current step."""
     extracted = {}
@@ -565,72 +734,53 @@ async def generate_recommendations_response(state: ConversationState) -> Dict:
             "recommendations": []
         }
 
-async def get_real_flights(search: FlightSearch) -> List[Dict]:
+@traced()
+async def get_real_flights(search: FlightSearch) -> List[Union[FlightResult, RoundTripResult]]:
     """Get real flight data using integrated flight search APIs."""
     try:
-        # Use the comprehensive flight search API
-        flights = await flight_api.search_flights(
+        # Resolve place names to airports, then search all providers.
+        # Prices stay in USD on the records and are converted when serialized.
+        if search.return_date:
+            return await flight_api.search_round_trip(
+                origin=search.origin,
+                destination=search.destination,
+                departure_date=search.departure_date,
+                return_date=search.return_date,
+                passengers=search.passengers
+            )
+        return await flight_api.search_flights_resolved(
             origin=search.origin,
             destination=search.destination,
             departure_date=search.departure_date,
             passengers=search.passengers
         )
-        
-        # Convert currency if needed
-        for flight in flights:
-            if "USD" in flight["price"]:
-                usd_price = flight["price"]["USD"]
-                flight["price"]["EUR"] = round(usd_price * 0.85, 2)
-                flight["price"]["GBP"] = round(usd_price * 0.73, 2)
-        
-        return flights
 
     except Exception as e:
         logger.error(f"Error fetching flights: {e}")
         # Return mock data as fallback
         return [
-            {
-                "id": "fallback_1",
-                "airline": "Delta Airlines",
-                "flight_number": "DL123",
-                "departure_time": f"{search.departure_date}T09:00:00",
-                "arrival_time": f"{search.departure_date}T11:30:00",
-                "duration": "2h 30m",
-                "price": {"USD": 450, "EUR": 380, "GBP": 330},
-                "stops": 0,
-                "aircraft": "Boeing 737",
-                "booking_link": "https://www.delta.com",
-                "source": "Fallback Data"
-            }
+            FlightResult(
+                id="fallback_1",
+                airline="Delta Airlines",
+                flight_number="DL123",
+                departure_time=f"{search.departure_date}T09:00:00",
+                arrival_time=f"{search.departure_date}T11:30:00",
+                duration="2h 30m",
+                price_usd=450,
+                stops=0,
+                aircraft="Boeing 737",
+                booking_link="https://www.delta.com",
+                source="Fallback Data"
+            )
         ]
 
-async def get_real_hotels(search: HotelSearch) -> List[Dict]:
+@traced()
+async def get_real_hotels(search: HotelSearch) -> List[HotelResult]:
     """Get real hotel data from Hotels.com API or similar."""
     try:
         if not HOTELS_API_KEY:
             # Return mock data if no API key
-            return [
-                {
-                    "id": "hotel_1",
-                    "name": "Grand Hotel & Spa",
-                    "rating": 4.8,
-                    "price_per_night": {"USD": 250, "EUR": 210, "GBP": 180},
-                    "amenities": ["WiFi", "Pool", "Spa", "Restaurant"],
-                    "location": "City Center",
-                    "image": "https://images.unsplash.com/photo-1566073771259-6a8506099945?w=800",
-                    "booking_link": "https://www.hotels.com"
-                },
-                {
-                    "id": "hotel_2",
-                    "name": "Boutique Hotel",
-                    "rating": 4.5,
-                    "price_per_night": {"USD": 180, "EUR": 150, "GBP": 130},
-                    "amenities": ["WiFi", "Breakfast", "Bar"],
-                    "location": "Downtown",
-                    "image": "https://images.unsplash.com/photo-1551882547-ff40c63fe5fa?w=800",
-                    "booking_link": "https://www.booking.com"
-                }
-            ]
+            return MOCK_HOTELS
 
         # Real API call would go here
         # async with httpx.AsyncClient() as client:
@@ -650,35 +800,13 @@ async def get_real_hotels(search: HotelSearch) -> List[Dict]:
         logger.error(f"Error fetching hotels: {e}")
         return []
 
-async def get_real_activities(search: ActivitySearch) -> List[Dict]:
+@traced()
+async def get_real_activities(search: ActivitySearch) -> List[ActivityResult]:
     """Get real activity data from Google Places API or similar."""
     try:
         if not GOOGLE_PLACES_API_KEY:
             # Return mock data if no API key
-            return [
-                {
-                    "id": "activity_1",
-                    "name": "City Walking Tour",
-                    "description": "Explore the city with a knowledgeable guide",
-                    "duration": "3 hours",
-                    "price": {"USD": 45, "EUR": 38, "GBP": 33},
-                    "rating": 4.7,
-                    "category": "Cultural",
-                    "image": "https://images.unsplash.com/photo-1449824913935-59a10b8d2000?w=800",
-                    "booking_link": "https://www.viator.com"
-                },
-                {
-                    "id": "activity_2",
-                    "name": "Adventure Sports",
-                    "description": "Thrilling outdoor activities and sports",
-                    "duration": "4 hours",
-                    "price": {"USD": 80, "EUR": 68, "GBP": 59},
-                    "rating": 4.9,
-                    "category": "Adventure",
-                    "image": "https://images.unsplash.com/photo-1551698618-1dfe5d97d256?w=800",
-                    "booking_link": "https://www.getyourguide.com"
-                }
-            ]
+            return MOCK_ACTIVITIES
 
         # Real API call would go here
         # async with httpx.AsyncClient() as client:
@@ -695,6 +823,7 @@ async def get_real_activities(search: ActivitySearch) -> List[Dict]:
         logger.error(f"Error fetching activities: {e}")
         return []
 
+@traced()
 async def get_weather_data(destination: str) -> Dict:
     """Get weather data for a destination."""
     try:
@@ -721,22 +850,40 @@ async def get_weather_data(destination: str) -> Dict:
         logger.error(f"Error fetching weather: {e}")
         return {}
 
+def estimated_flight_prices() -> Dict:
+    """Flight price estimate used when real prices are unavailable."""
+    return {"average_price": 500, "price_range": "400-800", "currency": "USD", "source": "Estimated"}
+
+def estimated_hotel_prices(nights: int = 7) -> Dict:
+    """Hotel price estimate used when real prices are unavailable."""
+    return {"average_price_per_night": 150, "total_cost": 150 * nights, "nights": nights, "currency": "USD", "source": "Estimated"}
+
+@traced()
 async def get_average_flight_prices(origin: str, destination: str, departure_date: str, return_date: Optional[str] = None) -> Dict:
-    """Get average flight prices for a route during specific dates."""
+    """Get average flight prices for a route during specific dates (round trip when return_date is given)."""
     try:
-        # Use the flight API to get real prices
-        flights = await flight_api.search_flights(
-            origin=origin,
-            destination=destination,
-            departure_date=departure_date,
-            passengers=1
-        )
+        # Use the flight API to get real prices (free-text names resolved to IATA codes)
+        if return_date:
+            flights = await flight_api.search_round_trip(
+                origin=origin,
+                destination=destination,
+                departure_date=departure_date,
+                return_date=return_date,
+                passengers=1
+            )
+        else:
+            flights = await flight_api.search_flights_resolved(
+                origin=origin,
+                destination=destination,
+                departure_date=departure_date,
+                passengers=1
+            )
         
         if not flights:
             return {"average_price": 0, "price_range": "0-0", "currency": "USD", "source": "No data available"}
         
         # Calculate average price
-        prices = [flight["price"]["USD"] for flight in flights if "USD" in flight["price"]]
+        prices = [flight.price_usd for flight in flights]
         if not prices:
             return {"average_price": 0, "price_range": "0-0", "currency": "USD", "source": "No price data"}
         
@@ -749,14 +896,16 @@ async def get_average_flight_prices(origin: str, destination: str, departure_dat
             "price_range": f"{min_price}-{max_price}",
             "currency": "USD",
             "source": "Real-time flight data",
+            "trip_type": "round_trip" if return_date else "one_way",
             "total_flights": len(flights)
         }
         
     except Exception as e:
         logger.error(f"Error fetching flight prices: {e}")
         # Return estimated prices based on distance
-        return {"average_price": 500, "price_range": "400-800", "currency": "USD", "source": "Estimated"}
+        return estimated_flight_prices()
 
+@traced()
 async def get_average_hotel_prices(destination: str, check_in: str, check_out: str, guests: int = 1) -> Dict:
     """Get average hotel prices for a destination during specific dates."""
     try:
@@ -777,7 +926,7 @@ async def get_average_hotel_prices(destination: str, check_in: str, check_out: s
             return {"average_price_per_night": 0, "total_cost": 0, "currency": "USD", "source": "No data available"}
         
         # Calculate average price per night
-        prices = [hotel["price_per_night"]["USD"] for hotel in hotels if "USD" in hotel["price_per_night"]]
+        prices = [hotel.price_per_night_usd for hotel in hotels]
         if not prices:
             return {"average_price_per_night": 0, "total_cost": 0, "currency": "USD", "source": "No price data"}
         
@@ -796,8 +945,9 @@ async def get_average_hotel_prices(destination: str, check_in: str, check_out: s
     except Exception as e:
         logger.error(f"Error fetching hotel prices: {e}")
         # Return estimated prices based on destination type
-        return {"average_price_per_night": 150, "total_cost": 150 * 7, "currency": "USD", "source": "Estimated"}
+        return estimated_hotel_prices()
 
+@traced()
 async def get_cost_of_living(destination: str) -> Dict:
     """Get cost of living data for a destination."""
     try:
@@ -876,23 +1026,150 @@ async def get_cost_of_living(destination: str) -> Dict:
             "source": "Fallback data"
         }
 
+async def cost_component(cache: TTLCache, key: Tuple, factory: Callable[[], Awaitable[Dict]],
+                         refresh: bool = False) -> Tuple[Dict, bool]:
+    """Memoized cost component and whether it was already cached (refresh recomputes it)."""
+    hit = cache.expires_in(key) > 0
+    value = await cache.get_or_set(key, factory, ttl=component_ttl, refresh=refresh)
+    return value, hit
+
+def component_ttl(value: Dict) -> Optional[float]:
+    """Estimates standing in for a failed lookup are retried sooner, even when every caller gave up waiting."""
+    return COMPONENT_FALLBACK_TTL_SECONDS if value.get("source") in ESTIMATED_SOURCES else None
+
+def flight_component(origin: str, destination: str, departure_date: str, return_date: str,
+                     refresh: bool = False) -> Awaitable[Tuple[Dict, bool]]:
+    """Memoized average flight price for a route and dates."""
+    key = (origin, destination, departure_date, return_date)
+    if not refresh:
+        popular_routes.observe(key)
+    return cost_component(flight_components, key,
+                          lambda: get_average_flight_prices(origin, destination, departure_date, return_date),
+                          refresh)
+
+def hotel_component(destination: str, check_in: str, check_out: str) -> Awaitable[Tuple[Dict, bool]]:
+    """Memoized average hotel price per room for a destination and dates."""
+    return cost_component(hotel_components, (destination, check_in, check_out),
+                          lambda: get_average_hotel_prices(destination, check_in, check_out))
+
+def living_component(destination: str) -> Awaitable[Tuple[Dict, bool]]:
+    """Memoized cost of living for a destination."""
+    return cost_component(living_components, (destination,), lambda: get_cost_of_living(destination))
+
+def catalog_destination_names() -> List[str]:
+    """Every destination name in TRAVEL_DATA, once."""
+    names = {}
+    for region in TRAVEL_DATA.values():
+        for destinations in region.values():
+            names.update((destination["name"], None) for destination in destinations)
+    return list(names)
+
+def prefetch_jobs() -> Iterator[PrefetchJob]:
+    """Cache entries to keep warm, for providers that are configured (fallback data needs no warming)."""
+    if currency_api.available:
+        for base in PREFETCH_CURRENCIES:
+            yield PrefetchJob("rates", base, (EXCHANGERATE,), partial(currency_api.rates_max_age, base),
+                              partial(currency_api.get_exchange_rates, base, refresh=True))
+    if weather_api.available:
+        for name in catalog_destination_names():
+            yield PrefetchJob("weather", name, (WEATHERAPI,), partial(weather_api.max_age, name),
+                              partial(weather_api.get_current_weather, name, refresh=True))
+            yield PrefetchJob("forecast", name, (WEATHERAPI,), partial(weather_api.max_age, name, PREFETCH_FORECAST_DAYS),
+                              partial(weather_api.get_forecast, name, PREFETCH_FORECAST_DAYS, refresh=True))
+    providers = tuple(provider for provider, available in ((SKYSCANNER, flight_api.skyscanner_available),
+                                                           (AMADEUS, flight_api.amadeus_available)) if available)
+    if providers:
+        today = datetime.now().date().isoformat()
+        for key in popular_routes.top(PREFETCH_TOP_ROUTES):
+            if key[2] >= today:
+                yield PrefetchJob("flights", key, providers, partial(flight_components.expires_in, key),
+                                  partial(flight_component, *key, refresh=True))
+
+prefetcher.add_source(prefetch_jobs)
+
+@traced()
+async def flight_price_calendar(origin: str, destination: str, departure_date: str,
+                                window_days: int = 3, trip_lengths: Tuple[int, ...] = (7,)) -> Dict:
+    """Round-trip price per person for departures within +/- window_days and each trip length."""
+    center = datetime.strptime(departure_date, "%Y-%m-%d")
+    departures = [center + timedelta(days=offset) for offset in range(-window_days, window_days + 1)]
+    lengths = sorted(set(trip_lengths))
+
+    # A round trip is priced from its two one-way legs, so overlapping cells share searches:
+    # 2N+1 outbound dates plus the distinct return dates, instead of one search per cell
+    outbound_dates = {day.strftime("%Y-%m-%d") for day in departures}
+    return_dates = {(day + timedelta(days=length)).strftime("%Y-%m-%d") for day in departures for length in lengths}
+    limit = asyncio.Semaphore(CALENDAR_CONCURRENCY)
+
+    async def leg_price(leg_origin: str, leg_destination: str, date: str) -> Optional[float]:
+        async with limit:
+            prices, _ = await flight_component(leg_origin, leg_destination, date, None)
+        if prices.get("source") in ESTIMATED_SOURCES or not prices.get("average_price"):
+            return None
+        return prices["average_price"]
+
+    legs = [(origin, destination, date) for date in sorted(outbound_dates)] + \
+           [(destination, origin, date) for date in sorted(return_dates)]
+    prices = await asyncio.gather(*(within(leg_price(*leg), stage="calendar leg") for leg in legs))
+    leg_prices = dict(zip(legs, prices))
+
+    grid = []
+    cheapest = None
+    for day in departures:
+        out_date = day.strftime("%Y-%m-%d")
+        row = []
+        for length in lengths:
+            back_date = (day + timedelta(days=length)).strftime("%Y-%m-%d")
+            outbound = leg_prices[(origin, destination, out_date)]
+            inbound = leg_prices[(destination, origin, back_date)]
+            price = round(outbound + inbound, 2) if outbound is not None and inbound is not None else None
+            row.append(price)
+            if price is not None and (cheapest is None or price < cheapest["price"]):
+                cheapest = {"departure_date": out_date, "return_date": back_date, "trip_length": length, "price": price}
+        grid.append(row)
+
+    return {
+        "departure_dates": [day.strftime("%Y-%m-%d") for day in departures],
+        "trip_lengths": lengths,
+        "prices": grid,
+        "cheapest": cheapest,
+        "currency": "USD",
+        "searches": len(legs)
+    }
+
+async def cheapest_dates(origin: str, destination: str, departure_date: str, return_date: str,
+                         window_days: int) -> Tuple[str, str]:
+    """Cheapest departure within the window for the same trip length, or the given dates."""
+    try:
+        length = (datetime.strptime(return_date, "%Y-%m-%d") - datetime.strptime(departure_date, "%Y-%m-%d")).days
+        calendar = await flight_price_calendar(origin, destination, departure_date, window_days, (length,))
+        if calendar["cheapest"]:
+            return calendar["cheapest"]["departure_date"], calendar["cheapest"]["return_date"]
+    except Exception as e:
+        logger.error(f"Error searching flexible dates: {e}")
+    return departure_date, return_date
+
+@traced()
 async def calculate_total_trip_cost(origin: str, destination: str, departure_date: str, 
                                   return_date: str, guests: int, preferences: Dict) -> Dict:
     """Calculate total trip cost using real-time data."""
     try:
-        # Fetch all cost components concurrently
-        flight_task = get_average_flight_prices(origin, destination, departure_date, return_date)
-        hotel_task = get_average_hotel_prices(destination, departure_date, return_date, guests)
-        living_task = get_cost_of_living(destination)
-        
-        flight_data, hotel_data, living_data = await asyncio.gather(
-            flight_task, hotel_task, living_task
-        )
-        
         # Calculate number of days
         departure = datetime.strptime(departure_date, "%Y-%m-%d")
         return_dt = datetime.strptime(return_date, "%Y-%m-%d")
         days = (return_dt - departure).days
+
+        # Fetch all cost components concurrently, each memoized on only the inputs it depends on
+        # (hotel prices are per room, shared by the guests); lookups that miss the request deadline are estimated
+        flight_task = flight_component(origin, destination, departure_date, return_date)
+        hotel_task = hotel_component(destination, departure_date, return_date)
+        living_task = living_component(destination)
+        
+        (flight_data, flight_hit), (hotel_data, hotel_hit), (living_data, living_hit) = await asyncio.gather(
+            within(flight_task, fallback=(estimated_flight_prices(), False), stage="flight prices"),
+            within(hotel_task, fallback=(estimated_hotel_prices(days), False), stage="hotel prices"),
+            living_task
+        )
         
         # Calculate daily living costs
         daily_living_cost = (
@@ -937,7 +1214,8 @@ async def calculate_total_trip_cost(origin: str, destination: str, departure_dat
                 "hotel_data": hotel_data,
                 "living_data": living_data,
                 "days": days,
-                "guests": guests
+                "guests": guests,
+                "cache_hits": {"flight": flight_hit, "hotel": hotel_hit, "living": living_hit}
             },
             "currency": user_currency,
             "source": "Real-time data calculation"
@@ -953,8 +1231,13 @@ async def calculate_total_trip_cost(origin: str, destination: str, departure_dat
             "source": "Calculation failed"
         }
 
-async def call_groq_recommendations(preferences: TravelPreferences) -> str:
-    """Call Groq LLM to generate personalized travel recommendations with real cost data."""
+@traced()
+async def call_groq_recommendations(preferences: TravelPreferences) -> Optional[str]:
+    """Call Groq LLM to generate personalized travel recommendations with real cost data.
+
+    Returns None when the LLM is skipped because pricing left less than GROQ_MIN_SECONDS
+    of the deadline, or when the call fails; callers then use the filtered fallback.
+    """
     try:
         # Parse travel dates to get departure and return dates
         departure_date, return_date = parse_travel_dates(preferences.travel_dates)
@@ -962,18 +1245,28 @@ async def call_groq_recommendations(preferences: TravelPreferences) -> str:
         # Get potential destinations based on preferences
         potential_destinations = get_potential_destinations(preferences)
         
-        # Calculate costs for each destination
-        destination_costs = []
-        for dest in potential_destinations[:5]:  # Limit to top 5 for performance
-            cost_data = await calculate_total_trip_cost(
+        # Calculate costs for each destination concurrently, within a share of the request budget
+        candidates = potential_destinations[:5]  # Limit to top 5 for performance
+        async def price_candidate(dest: Dict) -> Dict:
+            # With flexible dates, each candidate is priced for its cheapest window
+            dates = (departure_date, return_date)
+            if RECOMMENDATIONS_FLEXIBLE_DAYS > 0:
+                dates = await cheapest_dates(preferences.travel_from, dest["name"], departure_date, return_date,
+                                             RECOMMENDATIONS_FLEXIBLE_DAYS)
+            return await calculate_total_trip_cost(
                 origin=preferences.travel_from,
                 destination=dest["name"],
-                departure_date=departure_date,
-                return_date=return_date,
+                departure_date=dates[0],
+                return_date=dates[1],
                 guests=int(preferences.people_count),
                 preferences=preferences.model_dump()
             )
-            
+
+        with request_deadline(stage_budget(COSTING_BUDGET_SHARE)):
+            all_costs = await asyncio.gather(*(price_candidate(dest) for dest in candidates))
+
+        destination_costs = []
+        for dest, cost_data in zip(candidates, all_costs):
             if cost_data["total_cost_per_person"] > 0:
                 destination_costs.append({
                     "destination": dest,
@@ -1045,8 +1338,14 @@ Return ONLY valid JSON with detailed recommendations:
 No other text, just JSON.
 """
         
-        # Call Groq API
-        async with httpx.AsyncClient() as client:
+        # Not worth starting the LLM call if the request budget is nearly spent
+        left = remaining()
+        if left is not None and left < GROQ_MIN_SECONDS:
+            logger.warning(f"Skipping Groq recommendations, only {left:.1f}s of the request budget left")
+            return None
+
+        # Call Groq API (its timeout is capped by the request deadline)
+        async with upstream_client(GROQ) as client:
             response = await client.post(
                 GROQ_BASE_URL,
                 headers={
@@ -1072,7 +1371,7 @@ No other text, just JSON.
             )
             
             if response.status_code == 200:
-                result = response.json()
+                result = await decode_json(response)
                 return result["choices"][0]["message"]["content"]
             else:
                 logger.error(f"Groq API error: {response.status_code} - {response.text}")
@@ -1157,11 +1456,53 @@ def parse_budget_range(budget_str: str) -> Dict[str, float]:
 # API Endpoints
 @app.get("/")
 async def root():
-    return {"message": "Travel AI API", "version": "1.0.0"}
+    return bytes_response(payload_cache.render("root", None, lambda: {"message": "Travel AI API", "version": "1.0.0"}))
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "timestamp": datetime.now().isoformat()}
+    return {
+        "status": "healthy",
+        "timestamp": datetime.now().isoformat(),
+        "event_loop_lag": loop_monitor.snapshot(),
+        "circuits": circuit_breakers.stats(),
+        "prefetch": prefetcher.stats()
+    }
+
+def cache_counts() -> Dict[str, Tuple[int, int]]:
+    """(hits, misses) of every in-process cache by name."""
+    counts = {name: (cache.hits, cache.misses) for name, cache in CACHES.items()}
+    counts["payloads"] = (payload_cache.hits, payload_cache.misses)
+    counts["compressed_bodies"] = (compression_cache.hits, compression_cache.misses)
+    return counts
+
+registry.counter("cache_hits_total", "Cache hits by cache", ("cache",),
+                 callback=lambda: {(name,): hits for name, (hits, _) in cache_counts().items()})
+registry.counter("cache_misses_total", "Cache misses by cache", ("cache",),
+                 callback=lambda: {(name,): misses for name, (_, misses) in cache_counts().items()})
+registry.gauge("cache_hit_ratio", "Cache hits over lookups since startup", ("cache",),
+               callback=lambda: {(name,): hits / (hits + misses) if hits + misses else 0.0
+                                 for name, (hits, misses) in cache_counts().items()})
+registry.gauge("active_sessions", "Conversation sessions held in memory",
+               callback=lambda: {(): len(conversation_states)})
+registry.gauge("event_loop_lag_seconds", "Event loop scheduling lag", ("stat",),
+               callback=lambda: {(stat,): loop_monitor.snapshot()[f"{stat}_ms"] / 1000
+                                 for stat in ("current", "p99", "max")})
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Prometheus scrape endpoint."""
+    return Response(content=registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/debug/profiles/{profile_id}")
+async def get_profile(profile_id: str, request: Request):
+    """Download a stored request profile as folded stacks (for flamegraph.pl or speedscope)."""
+    if not authorized(request.headers.get("x-profile-token")):
+        raise HTTPException(status_code=403, detail="Profiling not authorized")
+    path = profile_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    with open(path, encoding="utf-8") as profile:
+        return Response(content=profile.read(), media_type="text/plain")
 
 @app.post("/chat")
 async def chat_endpoint(request: ChatMessage):
@@ -1171,9 +1512,9 @@ async def chat_endpoint(request: ChatMessage):
         session_id = request.session_id or str(uuid.uuid4())
         
         # Use conversational flow for structured travel planning
-        logger.info(f"Starting conversational flow for session: {session_id}")
         response_data = await handle_conversational_flow(request.message, session_id)
-        logger.info(f"Response data: {response_data}")
+        log_event(logger, logging.INFO, "chat.response", route="chat", session_id=session_id,
+                  step=response_data["step"], response=response_data["response"])
         
         return {
             "response": response_data["response"],
@@ -1187,6 +1528,7 @@ async def chat_endpoint(request: ChatMessage):
         raise HTTPException(status_code=500, detail="Chat service error")
 
 @app.post("/recommendations")
+@with_deadline(RECOMMENDATIONS_DEADLINE_SECONDS)
 async def get_recommendations(preferences: TravelPreferences):
     """Get AI-powered travel recommendations with real-time cost data."""
     try:
@@ -1197,7 +1539,8 @@ async def get_recommendations(preferences: TravelPreferences):
             try:
                 # Try to parse the JSON response from LLM
                 import json
-                logger.info(f"LLM Response: {llm_response}")  # Log full response
+                log_event(logger, logging.INFO, "recommendations.llm_response", route="recommendations",
+                          length=len(llm_response), response=llm_response)
                 recommendations = json.loads(llm_response)
                 
                 # Add additional data to each destination
@@ -1309,29 +1652,64 @@ async def get_filtered_recommendations(preferences: TravelPreferences):
         raise HTTPException(status_code=500, detail="Filtered recommendations service error")
 
 @app.post("/flights")
-async def search_flights(search: FlightSearch):
+async def search_flights(search: FlightSearch, fields: Optional[str] = None, currency: Optional[str] = None,
+                         cursor: Optional[str] = None, limit: Optional[int] = None):
     """Search for flights."""
+    query = search.model_dump()
+    record_fields = RoundTripResult._fields if search.return_date else FlightResult._fields
+    listing = PageRequest(query_fingerprint("flights", query), record_fields, fields, currency, cursor, limit)
     try:
-        flights = await get_real_flights(search)
-        return {
+        flights = await search_results.get_or_set(("flights", listing.fingerprint), lambda: get_real_flights(search))
+        page, next_cursor = listing.page(flights)
+        return json_response({
             "success": True,
-            "flights": flights,
-            "search": search.dict()
-        }
+            "flights": serialize_json(page, listing.currencies, fields=listing.fields),
+            "next_cursor": next_cursor,
+            "search": query
+        })
     except Exception as e:
         logger.error(f"Flight search error: {e}")
         raise HTTPException(status_code=500, detail="Flight search error")
 
+@app.post("/flights/calendar")
+async def search_flight_calendar(search: FlightCalendarSearch):
+    """Round-trip prices over a window of departure dates and trip lengths."""
+    if not 0 <= search.window_days <= CALENDAR_MAX_WINDOW_DAYS:
+        raise HTTPException(status_code=400, detail=f"window_days must be between 0 and {CALENDAR_MAX_WINDOW_DAYS}")
+    if not search.trip_lengths or len(search.trip_lengths) > CALENDAR_MAX_TRIP_LENGTHS or \
+            any(not 1 <= length <= CALENDAR_MAX_TRIP_DAYS for length in search.trip_lengths):
+        raise HTTPException(status_code=400, detail=f"Give 1 to {CALENDAR_MAX_TRIP_LENGTHS} trip lengths "
+                                                    f"between 1 and {CALENDAR_MAX_TRIP_DAYS} days")
+    try:
+        center = datetime.strptime(search.departure_date, "%Y-%m-%d")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="departure_date must be YYYY-MM-DD")
+    try:
+        # Both ends of the window, including the latest return, must be representable dates
+        center - timedelta(days=search.window_days)
+        center + timedelta(days=search.window_days + max(search.trip_lengths))
+    except OverflowError:
+        raise HTTPException(status_code=400, detail="departure_date window runs past the supported date range")
+
+    calendar = await flight_price_calendar(search.origin, search.destination, search.departure_date,
+                                           search.window_days, tuple(search.trip_lengths))
+    return {"success": True, "calendar": calendar, "search": search.model_dump()}
+
 @app.post("/hotels")
-async def search_hotels(search: HotelSearch):
+async def search_hotels(search: HotelSearch, fields: Optional[str] = None, currency: Optional[str] = None,
+                        cursor: Optional[str] = None, limit: Optional[int] = None):
     """Search for hotels."""
+    query = search.model_dump()
+    listing = PageRequest(query_fingerprint("hotels", query), HotelResult._fields, fields, currency, cursor, limit)
     try:
-        hotels = await get_real_hotels(search)
-        return {
+        hotels = await search_results.get_or_set(("hotels", listing.fingerprint), lambda: get_real_hotels(search))
+        page, next_cursor = listing.page(hotels)
+        return json_response({
             "success": True,
-            "hotels": hotels,
-            "search": search.dict()
-        }
+            "hotels": serialize_json(page, listing.currencies, fields=listing.fields),
+            "next_cursor": next_cursor,
+            "search": query
+        })
     except Exception as e:
         logger.error(f"Hotel search error: {e}")
         raise HTTPException(status_code=500, detail="Hotel search error")
@@ -1391,13 +1769,13 @@ async def book_flights(request: Dict):
         # Get flight options
         flights = await get_real_flights(flight_search)
         
-        return {
+        return json_response({
             "success": True,
-            "flights": flights,
+            "flights": serialize_json(flights),
             "destination": state.selected_destination,
             "message": f"Here are flight options to {state.selected_destination['name']}:",
             "step": "flight_booking"
-        }
+        })
         
     except Exception as e:
         logger.error(f"Flight booking error: {e}")
@@ -1428,39 +1806,75 @@ async def book_hotels(request: Dict):
         # Get hotel options
         hotels = await get_real_hotels(hotel_search)
         
-        return {
+        return json_response({
             "success": True,
-            "hotels": hotels,
+            "hotels": serialize_json(hotels),
             "destination": state.selected_destination,
             "message": f"Here are hotel options in {state.selected_destination['name']}:",
             "step": "hotel_booking"
-        }
+        })
         
     except Exception as e:
         logger.error(f"Hotel booking error: {e}")
         raise HTTPException(status_code=500, detail="Hotel booking error")
 
 @app.post("/activities")
-async def search_activities(search: ActivitySearch):
+async def search_activities(search: ActivitySearch, fields: Optional[str] = None, currency: Optional[str] = None,
+                            cursor: Optional[str] = None, limit: Optional[int] = None):
     """Search for activities."""
+    query = search.model_dump()
+    listing = PageRequest(query_fingerprint("activities", query), ActivityResult._fields, fields, currency, cursor, limit)
     try:
-        activities = await get_real_activities(search)
-        return {
+        activities = await search_results.get_or_set(("activities", listing.fingerprint),
+                                                     lambda: get_real_activities(search))
+        page, next_cursor = listing.page(activities)
+        return json_response({
             "success": True,
-            "activities": activities,
-            "search": search.dict()
-        }
+            "activities": serialize_json(page, listing.currencies, fields=listing.fields),
+            "next_cursor": next_cursor,
+            "search": query
+        })
     except Exception as e:
         logger.error(f"Activity search error: {e}")
         raise HTTPException(status_code=500, detail="Activity search error")
 
+DESTINATION_FIELDS = ("id", "name", "type", "country", "description", "image", "rating", "cost_per_person",
+                      "highlights", "best_time", "flight_time", "currency", "daily_cost_usd", "flight_cost_usd")
+
+def all_destinations() -> List[Dict]:
+    """The destinations catalog as one flat list."""
+    return TRAVEL_DATA["domestic"]["beach"] + TRAVEL_DATA["domestic"]["mountain"] + TRAVEL_DATA["domestic"]["city"] + TRAVEL_DATA["international"]["beach"]
+
+def destinations_in(destinations: List[Dict], currencies: Tuple[str, ...]) -> List[Dict]:
+    """Limit each destination's cost_per_person map to the given currencies."""
+    return [
+        {**destination, "cost_per_person": {
+            code: destination["cost_per_person"].get(code, round(destination["cost_per_person"]["USD"] * DISPLAY_RATES[code], 2))
+            for code in currencies
+        }}
+        for destination in destinations
+    ]
+
 @app.get("/destinations")
-async def get_all_destinations():
+async def get_all_destinations(request: Request, fields: Optional[str] = None, currency: Optional[str] = None,
+                               cursor: Optional[str] = None, limit: Optional[int] = None):
     """Get all available destinations."""
-    return {
-        "success": True,
-        "destinations": TRAVEL_DATA["domestic"]["beach"] + TRAVEL_DATA["domestic"]["mountain"] + TRAVEL_DATA["domestic"]["city"] + TRAVEL_DATA["international"]["beach"]
-    }
+    listing = PageRequest(query_fingerprint("destinations"), DESTINATION_FIELDS, fields, currency, cursor, limit)
+
+    def build() -> Dict:
+        destinations, next_cursor = listing.page(all_destinations())
+        if currency:
+            destinations = destinations_in(destinations, listing.currencies)
+        return {
+            "success": True,
+            "destinations": project(destinations, listing.fields),
+            "next_cursor": next_cursor
+        }
+
+    # TRAVEL_DATA never changes, so every fields/currency/page combination renders once
+    key = ("destinations", listing.fields, currency and listing.currencies, listing.offset, listing.limit)
+    body, etag = payload_cache.render_tagged(key, TRAVEL_DATA, build)
+    return conditional_response(request, body, etag, DESTINATIONS_MAX_AGE_SECONDS)
 
 @app.get("/currency/convert")
 async def convert_currency(amount: float, from_currency: str, to_currency: str):
@@ -1483,48 +1897,55 @@ async def convert_currency(amount: float, from_currency: str, to_currency: str):
         raise HTTPException(status_code=500, detail="Currency conversion error")
 
 @app.get("/weather/{location}")
-async def get_weather(location: str):
+async def get_weather(location: str, request: Request):
     """Get current weather for a location."""
     try:
+        # Served from the weather cache while fresh, so a matching
+        # If-None-Match gets its 304 without contacting the provider
         weather = await weather_api.get_current_weather(location)
-        return {
+        body, etag = payload_cache.render_tagged(("weather", weather_api.cache_key(location)), weather, lambda: {
             "success": True,
             "weather": weather,
             "source": weather.get("source", "Mock Data")
-        }
+        })
+        return conditional_response(request, body, etag, weather_api.max_age(location))
     except Exception as e:
         logger.error(f"Weather API error: {e}")
         raise HTTPException(status_code=500, detail="Weather data fetch failed")
 
 @app.get("/weather/{location}/forecast")
-async def get_weather_forecast(location: str, days: int = 7):
+async def get_weather_forecast(location: str, request: Request, days: int = 7):
     """Get weather forecast for a location."""
     try:
         forecast = await weather_api.get_forecast(location, days)
-        return {
+        body, etag = payload_cache.render_tagged(("forecast", weather_api.cache_key(location, days)), forecast, lambda: {
             "success": True,
             "forecast": forecast,
             "source": forecast.get("source", "Mock Data")
-        }
+        })
+        return conditional_response(request, body, etag, weather_api.max_age(location, days))
     except Exception as e:
         logger.error(f"Weather forecast API error: {e}")
         raise HTTPException(status_code=500, detail="Weather forecast fetch failed")
 
 @app.get("/currency/rates")
-async def get_exchange_rates(base_currency: str = "USD"):
+async def get_exchange_rates(request: Request, base_currency: str = "USD"):
     """Get current exchange rates."""
     try:
         rates = await currency_api.get_exchange_rates(base_currency)
-        return {
+        # Rendered once per base currency each time the rates cache refreshes
+        body, etag = payload_cache.render_tagged(("currency_rates", base_currency), rates, lambda: {
             "success": True,
             "rates": rates,
             "source": rates.get("source", "Mock Data")
-        }
+        })
+        return conditional_response(request, body, etag, currency_api.rates_max_age(base_currency))
     except Exception as e:
         logger.error(f"Exchange rates API error: {e}")
         raise HTTPException(status_code=500, detail="Exchange rates fetch failed")
 
 @app.post("/cost-analysis")
+@with_deadline(COST_ANALYSIS_DEADLINE_SECONDS)
 async def get_detailed_cost_analysis(request: Dict):
     """Get detailed cost analysis for a specific trip."""
     try:
@@ -1565,6 +1986,53 @@ async def get_detailed_cost_analysis(request: Dict):
         logger.error(f"Cost analysis error: {e}")
         raise HTTPException(status_code=500, detail="Cost analysis failed")
 
+@app.post("/cost-analysis/batch")
+@with_deadline(COST_ANALYSIS_DEADLINE_SECONDS)
+async def get_batch_cost_analysis(request: BatchCostRequest):
+    """Cost analysis for many trips, sharing the lookups they have in common."""
+    if not request.trips:
+        raise HTTPException(status_code=400, detail="No trips given")
+    if len(request.trips) > BATCH_MAX_TRIPS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_TRIPS} trips per batch")
+
+    # Each distinct route, hotel stay and destination is looked up once, at most BATCH_CONCURRENCY at a time
+    flights = {(t.origin, t.destination, t.departure_date, t.return_date) for t in request.trips}
+    hotels = {(t.destination, t.departure_date, t.return_date) for t in request.trips}
+    destinations = {t.destination for t in request.trips}
+    limit = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def lookup(component: Callable[..., Awaitable[Tuple[Dict, bool]]], *key: str):
+        async with limit:
+            return await component(*key)
+
+    await asyncio.gather(
+        *(within(lookup(flight_component, *key), stage="batch flight prices") for key in flights),
+        *(within(lookup(hotel_component, *key), stage="batch hotel prices") for key in hotels),
+        *(within(lookup(living_component, name), stage="batch cost of living") for name in destinations)
+    )
+
+    # Every component is now cached (or estimated), so this is arithmetic
+    analyses = await asyncio.gather(*(
+        calculate_total_trip_cost(
+            origin=trip.origin,
+            destination=trip.destination,
+            departure_date=trip.departure_date,
+            return_date=trip.return_date,
+            guests=trip.guests,
+            preferences={"currency": trip.currency}
+        )
+        for trip in request.trips
+    ))
+
+    return {
+        "success": True,
+        "results": [
+            {"trip_details": trip.model_dump(), "cost_analysis": analysis}
+            for trip, analysis in zip(request.trips, analyses)
+        ],
+        "lookups": {"flights": len(flights), "hotels": len(hotels), "destinations": len(destinations)}
+    }
+
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", 8000))
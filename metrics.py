@@ -0,0 +1,217 @@
+"""
+Prometheus Metrics
+Lightweight counters, gauges and histograms rendered in the Prometheus text format.
+"""
+
+import logging
+import os
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+# Seconds; covers cache hits (sub-millisecond) through slow provider polls
+LATENCY_BUCKETS: Tuple[float, ...] = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Metric:
+    """Base for labelled metrics; values live in a dict keyed by label tuple"""
+
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+
+    def samples(self) -> Iterable[str]:
+        return ()
+
+    def render(self) -> List[str]:
+        return self.header() + list(self.samples())
+
+
+class Scalar(Metric):
+    """One number per label set, kept here or read from a callback at scrape time"""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 callback: Optional[Callable[[], Dict[Labels, float]]] = None):
+        super().__init__(name, help, labelnames)
+        self.values: Dict[Labels, float] = {}
+        self.callback = callback
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def samples(self) -> Iterable[str]:
+        values = self.values
+        if self.callback is not None:
+            try:
+                values = self.callback()
+            except Exception as e:
+                logger.error(f"Metrics callback for {self.name} failed: {e}")
+                values = {}
+        for labels, value in values.items():
+            yield f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"
+
+
+class Counter(Scalar):
+    """Monotonically increasing count"""
+
+    type = "counter"
+
+
+class Gauge(Scalar):
+    """Value that goes up and down"""
+
+    type = "gauge"
+
+    def set(self, value: float, *labels: str):
+        self.values[labels] = value
+
+    def dec(self, *labels: str, amount: float = 1.0):
+        self.values[labels] = self.values.get(labels, 0.0) - amount
+
+
+class Histogram(Metric):
+    """Bucketed observations; each label set keeps per-bucket counts, sum and count"""
+
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [count per bucket..., +Inf count, sum]
+        self.values: Dict[Labels, List[float]] = {}
+
+    def observe(self, value: float, *labels: str):
+        series = self.values.get(labels)
+        if series is None:
+            series = self.values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def samples(self) -> Iterable[str]:
+        for labels, series in self.values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _number(bound)
+                bucket_labels = _labels(self.labelnames, labels, f'le="{le}"')
+                yield f"{self.name}_bucket{bucket_labels} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(series[-1])}"
+            yield f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}"
+
+
+class Registry:
+    """Named metrics rendered together for a scrape"""
+
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = (),
+                callback: Optional[Callable[[], Dict[Labels, float]]] = None) -> Counter:
+        return self.metrics.get(name) or self.register(Counter(name, help, labelnames, callback))
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = (),
+              callback: Optional[Callable[[], Dict[Labels, float]]] = None) -> Gauge:
+        return self.metrics.get(name) or self.register(Gauge(name, help, labelnames, callback))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.metrics.get(name) or self.register(Histogram(name, help, labelnames, buckets))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Global instance
+registry = Registry()
+
+REQUEST_LATENCY = registry.histogram(
+    "http_request_duration_seconds", "Request latency by route template",
+    ("method", "route", "status"))
+REQUESTS_IN_FLIGHT = registry.gauge(
+    "http_requests_in_flight", "Requests currently being served")
+UPSTREAM_LATENCY = registry.histogram(
+    "upstream_request_duration_seconds", "Latency of calls to external providers",
+    ("provider", "method"))
+UPSTREAM_ERRORS = registry.counter(
+    "upstream_errors_total", "Failed provider calls by provider and reason (status code or exception)",
+    ("provider", "reason"))
+
+
+def observe_upstream(provider: str, method: str, seconds: float, error: Optional[str] = None):
+    """Record one provider call"""
+    if not METRICS_ENABLED:
+        return
+    UPSTREAM_LATENCY.observe(seconds, provider, method)
+    if error is not None:
+        UPSTREAM_ERRORS.inc(provider, error)
+
+
+class MetricsMiddleware:
+    """Times every HTTP request and tracks the in-flight gauge
+
+    Requests are labelled by route template (/weather/{location}), not the
+    raw path, so label cardinality stays bounded.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        status = "500"
+
+        async def send_with_status(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+            route = scope.get("route")
+            REQUEST_LATENCY.observe(time.perf_counter() - start, scope["method"],
+                                    getattr(route, "path_format", "unmatched"), status)
@@ -0,0 +1,101 @@
+"""
+Sparse Fieldsets and Cursor Pagination
+Field projection, currency selection and opaque page cursors for the list endpoints.
+"""
+
+import base64
+import hashlib
+import os
+from typing import Any, Iterable, List, Optional, Sequence, Tuple
+
+from records import DEFAULT_CURRENCIES, DISPLAY_RATES
+from responses import dumps
+
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "100"))
+
+
+class ListingError(ValueError):
+    """Invalid fields, currency, cursor or limit parameter"""
+
+
+def query_fingerprint(*parts: Any) -> str:
+    """Short stable hash of a query, binding cursors to the search they came from"""
+    return hashlib.blake2b(dumps(parts), digest_size=6).hexdigest()
+
+
+def encode_cursor(offset: int, fingerprint: str) -> str:
+    """Opaque cursor for the page starting at offset"""
+    return base64.urlsafe_b64encode(f"{offset}:{fingerprint}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str], fingerprint: str) -> int:
+    """Offset encoded in a cursor (0 without one); rejects cursors of another query"""
+    if not cursor:
+        return 0
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        offset, cursor_fingerprint = raw.split(":", 1)
+        offset = int(offset)
+    except ValueError:
+        raise ListingError("Malformed cursor")
+    if cursor_fingerprint != fingerprint or offset < 0:
+        raise ListingError("Cursor does not belong to this query")
+    return offset
+
+
+def parse_fields(fields: Optional[str], allowed: Sequence[str],
+                 always: Sequence[str] = ("id",)) -> Optional[Tuple[str, ...]]:
+    """Parse a comma-separated fields= value into allowed fields, in output order
+
+    Returns None (every field) when no projection was requested.
+    """
+    if not fields:
+        return None
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = requested.difference(allowed)
+    if unknown:
+        raise ListingError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    requested.update(name for name in always if name in allowed)
+    return tuple(name for name in allowed if name in requested)
+
+
+def parse_currencies(currency: Optional[str]) -> Tuple[str, ...]:
+    """Currencies to price in: the requested one(s), or the default display set"""
+    if not currency:
+        return DEFAULT_CURRENCIES
+    currencies = tuple(dict.fromkeys(code.strip().upper() for code in currency.split(",") if code.strip()))
+    unsupported = [code for code in currencies if code not in DISPLAY_RATES]
+    if unsupported or not currencies:
+        raise ListingError(f"Unsupported currency: {', '.join(unsupported) or currency}")
+    return currencies
+
+
+class PageRequest:
+    """Validated fields/currency/cursor/limit parameters of one list request"""
+
+    __slots__ = ("fingerprint", "fields", "currencies", "offset", "limit")
+
+    def __init__(self, fingerprint: str, allowed_fields: Sequence[str], fields: Optional[str] = None,
+                 currency: Optional[str] = None, cursor: Optional[str] = None, limit: Optional[int] = None):
+        if limit is not None and not 1 <= limit <= MAX_PAGE_SIZE:
+            raise ListingError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+        self.fingerprint = fingerprint
+        self.fields = parse_fields(fields, allowed_fields)
+        self.currencies = parse_currencies(currency)
+        self.offset = decode_cursor(cursor, fingerprint)
+        self.limit = limit
+
+    def page(self, items: Sequence) -> Tuple[Sequence, Optional[str]]:
+        """Slice out this page; the cursor of the next one is None on the last page"""
+        if self.limit is None:
+            return items[self.offset:], None
+        end = self.offset + self.limit
+        next_cursor = encode_cursor(end, self.fingerprint) if end < len(items) else None
+        return items[self.offset:end], next_cursor
+
+
+def project(items: Iterable[dict], fields: Optional[Sequence[str]]) -> List[dict]:
+    """Keep only the given keys of plain dict items"""
+    if fields is None:
+        return list(items)
+    return [{name: item[name] for name in fields if name in item} for item in items]
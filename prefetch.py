@@ -0,0 +1,212 @@
+"""
+Background Prefetch
+Refreshes popular cache entries shortly before they expire, within a per-provider call budget, so user requests find them warm.
+"""
+
+import asyncio
+import logging
+import os
+import time
+import zlib
+from typing import Awaitable, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+from circuit_breaker import OPEN, circuit_breakers
+from metrics import registry
+
+logger = logging.getLogger(__name__)
+
+PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "true").lower() == "true"
+PREFETCH_INTERVAL_SECONDS = float(os.getenv("PREFETCH_INTERVAL_SECONDS", "5"))
+# Entries are refreshed once they have less than this long left, plus a per-entry stagger of up to PREFETCH_STAGGER_SECONDS
+PREFETCH_LEAD_SECONDS = float(os.getenv("PREFETCH_LEAD_SECONDS", "60"))
+PREFETCH_STAGGER_SECONDS = float(os.getenv("PREFETCH_STAGGER_SECONDS", "60"))
+PREFETCH_CONCURRENCY = int(os.getenv("PREFETCH_CONCURRENCY", "2"))
+# Refreshes per minute that may touch each provider ("provider=count,..."); unlisted providers are not prefetched
+PREFETCH_BUDGETS = os.getenv("PREFETCH_BUDGETS", "weatherapi=30,exchangerate=6,amadeus=10,skyscanner=6")
+# Each job gives up after this long so a hung provider cannot stall the loop
+PREFETCH_TIMEOUT_SECONDS = float(os.getenv("PREFETCH_TIMEOUT_SECONDS", "30"))
+
+
+def parse_budgets(spec: str) -> Dict[str, float]:
+    """Parse "provider=calls,..." into calls per minute, skipping malformed entries"""
+    budgets = {}
+    for item in spec.split(","):
+        name, _, value = item.partition("=")
+        try:
+            budgets[name.strip()] = float(value)
+        except ValueError:
+            if item.strip():
+                logger.error(f"Ignoring malformed prefetch budget: {item!r}")
+    return budgets
+
+
+class PrefetchJob:
+    """One cache entry to keep warm
+
+    expires_in reports how long the cached entry has left (0 when missing);
+    refresh recomputes and stores it. providers are charged one call each.
+    """
+
+    __slots__ = ("kind", "key", "providers", "expires_in", "refresh")
+
+    def __init__(self, kind: str, key: Hashable, providers: Tuple[str, ...],
+                 expires_in: Callable[[], float], refresh: Callable[[], Awaitable]):
+        self.kind = kind
+        self.key = key
+        self.providers = providers
+        self.expires_in = expires_in
+        self.refresh = refresh
+
+    def stagger(self, seconds: float) -> float:
+        """A stable offset in [0, seconds) so entries cached together are not refreshed together"""
+        return zlib.crc32(repr((self.kind, self.key)).encode()) % 1000 / 1000 * seconds
+
+
+class CallBudget:
+    """Token bucket of refreshes per minute, with at most one minute's worth banked"""
+
+    def __init__(self, per_minute: float):
+        self.per_minute = per_minute
+        self.tokens = per_minute
+        self._updated = time.monotonic()
+
+    def available(self) -> float:
+        now = time.monotonic()
+        self.tokens = min(self.per_minute, self.tokens + (now - self._updated) * self.per_minute / 60)
+        self._updated = now
+        return self.tokens
+
+
+class PopularKeys:
+    """Request counts per key, halved every decay interval so the ranking follows recent traffic"""
+
+    def __init__(self, maxsize: int = 512, decay_seconds: float = 3600):
+        self.maxsize = maxsize
+        self.decay_seconds = decay_seconds
+        self.counts: Dict[Hashable, float] = {}
+        self._decayed = time.monotonic()
+
+    def observe(self, key: Hashable):
+        self.counts[key] = self.counts.get(key, 0.0) + 1
+        if len(self.counts) > self.maxsize:
+            # Drop the least requested half rather than one key per call
+            keep = sorted(self.counts.items(), key=lambda item: item[1], reverse=True)[:self.maxsize // 2]
+            self.counts = dict(keep)
+
+    def top(self, n: int) -> List[Hashable]:
+        now = time.monotonic()
+        if now - self._decayed >= self.decay_seconds:
+            self.counts = {key: count / 2 for key, count in self.counts.items() if count >= 1}
+            self._decayed = now
+        return [key for key, _ in sorted(self.counts.items(), key=lambda item: item[1], reverse=True)[:n]]
+
+
+class Prefetcher:
+    """Background task that refreshes due jobs from its sources every interval
+
+    A job is due when its entry has less than lead (plus its stagger) left.
+    Due jobs run most-urgent first while every provider they touch has
+    budget left and no open circuit; the rest wait for a later pass.
+    """
+
+    def __init__(self, enabled: bool = PREFETCH_ENABLED, interval: float = PREFETCH_INTERVAL_SECONDS,
+                 lead: float = PREFETCH_LEAD_SECONDS, stagger: float = PREFETCH_STAGGER_SECONDS,
+                 concurrency: int = PREFETCH_CONCURRENCY, budgets: str = PREFETCH_BUDGETS):
+        self.enabled = enabled
+        self.interval = interval
+        self.lead = lead
+        self.stagger = stagger
+        self.concurrency = concurrency
+        self.budgets = {provider: CallBudget(calls) for provider, calls in parse_budgets(budgets).items()}
+        self.sources: List[Callable[[], Iterable[PrefetchJob]]] = []
+        self.runs: Dict[str, int] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def add_source(self, source: Callable[[], Iterable[PrefetchJob]]):
+        """Register a callable listing the jobs to keep warm; it is re-read every pass"""
+        self.sources.append(source)
+
+    def start(self):
+        """Start refreshing on the running loop"""
+        if self.enabled and (self._task is None or self._task.done()):
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop refreshing"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"Prefetch pass failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def due(self) -> List[PrefetchJob]:
+        """Jobs whose entries expire within their lead, most urgent first"""
+        jobs = []
+        for source in self.sources:
+            for job in source():
+                left = job.expires_in()
+                if left <= self.lead + job.stagger(self.stagger):
+                    jobs.append((left, job))
+        jobs.sort(key=lambda item: item[0])
+        return [job for _, job in jobs]
+
+    def _admit(self, job: PrefetchJob) -> Optional[str]:
+        """Charge the job's providers, or return why it has to wait"""
+        budgets = [self.budgets.get(provider) for provider in job.providers]
+        if any(budget is None or budget.available() < 1 for budget in budgets):
+            return "over_budget"
+        if any(breaker.state == OPEN for breaker in map(circuit_breakers.breakers.get, job.providers) if breaker):
+            return "circuit_open"
+        for budget in budgets:
+            budget.tokens -= 1
+        return None
+
+    async def run_once(self) -> int:
+        """Refresh what is due and affordable now; returns how many jobs ran"""
+        admitted = []
+        for job in self.due():
+            reason = self._admit(job)
+            if reason is None:
+                admitted.append(job)
+            else:
+                PREFETCHES.inc(job.kind, reason)
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def refresh(job: PrefetchJob):
+            async with semaphore:
+                try:
+                    await asyncio.wait_for(job.refresh(), timeout=PREFETCH_TIMEOUT_SECONDS)
+                    PREFETCHES.inc(job.kind, "refreshed")
+                    self.runs[job.kind] = self.runs.get(job.kind, 0) + 1
+                except Exception as e:
+                    PREFETCHES.inc(job.kind, "failed")
+                    logger.error(f"Prefetch of {job.kind} {job.key!r} failed: {e}")
+
+        await asyncio.gather(*(refresh(job) for job in admitted))
+        return len(admitted)
+
+    def stats(self) -> Dict:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "refreshed": dict(self.runs),
+            "budget_left": {provider: round(budget.available(), 1) for provider, budget in self.budgets.items()}
+        }
+
+
+# Global instance
+prefetcher = Prefetcher()
+
+PREFETCHES = registry.counter(
+    "cache_prefetches_total",
+    "Background cache refreshes by kind and outcome (refreshed, failed, over_budget, circuit_open)",
+    ("kind", "outcome"))
@@ -0,0 +1,128 @@
+"""
+On-Demand Profiling
+Token-gated sampling profiler for single requests, writing flame-graph compatible folded stacks.
+"""
+
+import hmac
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Optional
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+# Profiling is disabled unless a token is configured
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "2"))
+PROFILE_HEADER = b"x-profile-token"
+
+
+class SamplingProfiler:
+    """Samples one thread's stack at a fixed interval from a helper thread
+
+    Wall-clock sampling of the event loop thread: time spent awaiting I/O
+    shows up under the selector, and other requests running on the loop at
+    the same time are sampled too.
+    """
+
+    def __init__(self, thread_id: int, interval: float = PROFILE_INTERVAL_MS / 1000):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        self._thread.join()
+        return self.samples
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+
+def folded(samples: Counter) -> str:
+    """Collapsed-stack text ("frame;frame;frame count"), as read by flamegraph.pl and speedscope"""
+    return "".join(f"{stack} {count}\n" for stack, count in samples.most_common())
+
+
+def profile_path(profile_id: str) -> Optional[str]:
+    """File of a stored profile, or None for unknown or malformed ids"""
+    try:
+        uuid.UUID(profile_id)
+    except ValueError:
+        return None
+    path = os.path.join(PROFILE_DIR, f"{profile_id}.folded")
+    return path if os.path.exists(path) else None
+
+
+def authorized(token: Optional[str]) -> bool:
+    return bool(PROFILE_TOKEN) and token is not None and hmac.compare_digest(token, PROFILE_TOKEN)
+
+
+class ProfilingMiddleware:
+    """Profiles requests that carry a valid X-Profile-Token header
+
+    The profile is stored under PROFILE_DIR and its id returned in an
+    X-Profile-Id header. Untriggered requests only pay for a header scan,
+    and only while PROFILE_TOKEN is set. One request is profiled at a time.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._busy = threading.Lock()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not PROFILE_TOKEN:
+            await self.app(scope, receive, send)
+            return
+
+        token = next((value for name, value in scope["headers"] if name == PROFILE_HEADER), None)
+        if token is None or not authorized(token.decode("latin-1")) or not self._busy.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = str(uuid.uuid4())
+
+        async def send_with_id(message: Message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append("X-Profile-Id", profile_id)
+            await send(message)
+
+        profiler = SamplingProfiler(threading.get_ident())
+        start = time.perf_counter()
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            samples = profiler.stop()
+            self._busy.release()
+            self._store(profile_id, samples, scope["path"], time.perf_counter() - start)
+
+    def _store(self, profile_id: str, samples: Counter, path: str, seconds: float):
+        try:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            with open(os.path.join(PROFILE_DIR, f"{profile_id}.folded"), "w", encoding="utf-8") as output:
+                output.write(folded(samples))
+            logger.info(f"Stored profile {profile_id} for {path}: {sum(samples.values())} samples in {seconds:.3f}s")
+        except OSError as e:
+            logger.error(f"Could not store profile {profile_id}: {e}")
@@ -0,0 +1,214 @@
+"""
+Result Records
+Compact typed records for flight, hotel and activity results with lazy serialization.
+"""
+
+import sys
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from responses import RawJSON, dumps, render_list
+
+# Prices are stored once in the base currency and converted when serialized
+BASE_CURRENCY = "USD"
+DEFAULT_CURRENCIES: Tuple[str, ...] = ("USD", "EUR", "GBP")
+DISPLAY_RATES: Dict[str, float] = {
+    "USD": 1.0,
+    "EUR": 0.85,
+    "GBP": 0.73,
+    "CAD": 1.25,
+    "AUD": 1.35
+}
+
+
+def intern(value: Optional[str]) -> str:
+    """Intern a repeated string field (airline, source, aircraft, ...)"""
+    return sys.intern(value) if isinstance(value, str) and value else (value or "")
+
+
+def price_map(amount: float, currencies: Sequence[str] = DEFAULT_CURRENCIES,
+              rates: Dict[str, float] = DISPLAY_RATES) -> Dict[str, float]:
+    """Expand a base-currency amount into a {currency: amount} map"""
+    return {
+        currency: amount if currency == BASE_CURRENCY else round(amount * rates.get(currency, 1.0), 2)
+        for currency in currencies
+    }
+
+
+class Record:
+    """Base for __slots__ result records
+
+    Subclasses list their output fields in `_fields` (in serialization order)
+    and map base-currency price attributes to output keys in `_prices`.
+    A price of None is left out of the output.
+    """
+
+    __slots__ = ("_json",)
+    _fields: Tuple[str, ...] = ()
+    _prices: Dict[str, str] = {}
+
+    def to_dict(self, currencies: Sequence[str] = DEFAULT_CURRENCIES,
+                rates: Dict[str, float] = DISPLAY_RATES,
+                fields: Optional[Sequence[str]] = None) -> Dict:
+        """Serialize to the public dict shape (or a subset of fields), converting prices on the way out"""
+        data = {}
+        for field in self._fields if fields is None else fields:
+            price_attr = self._prices.get(field)
+            if price_attr is not None:
+                amount = getattr(self, price_attr)
+                if amount is not None:
+                    data[field] = price_map(amount, currencies, rates)
+            elif isinstance(getattr(self, field), Record):
+                data[field] = getattr(self, field).to_dict(currencies, rates)
+            else:
+                value = getattr(self, field)
+                data[field] = list(value) if isinstance(value, tuple) else value
+        return data
+
+    def to_json(self, currencies: Sequence[str] = DEFAULT_CURRENCIES,
+                rates: Dict[str, float] = DISPLAY_RATES,
+                fields: Optional[Sequence[str]] = None) -> bytes:
+        """Serialized to_dict(); the latest rendering is kept on the record
+
+        Records that are reused across requests (mock and cached results)
+        are therefore only encoded once per currency and field selection.
+        The rates used are part of the key by value, so changed rates are
+        never served from an old rendering.
+        """
+        currencies = tuple(currencies)
+        key = (currencies, tuple(rates.get(currency) for currency in currencies),
+               fields if fields is None else tuple(fields))
+        cached = getattr(self, "_json", None)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        body = dumps(self.to_dict(currencies, rates, fields))
+        self._json = (key, body)
+        return body
+
+    def __eq__(self, other) -> bool:
+        return type(self) is type(other) and all(
+            getattr(self, slot) == getattr(other, slot) for slot in self.__slots__
+        )
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({', '.join(f'{s}={getattr(self, s)!r}' for s in self.__slots__)})"
+
+
+class FlightResult(Record):
+    """One flight option, priced unless it is a leg of a combined round-trip fare"""
+
+    __slots__ = ("id", "airline", "flight_number", "departure_time", "arrival_time",
+                 "duration", "price_usd", "stops", "aircraft", "booking_link", "source")
+    _fields = ("id", "airline", "flight_number", "departure_time", "arrival_time",
+               "duration", "price", "stops", "aircraft", "booking_link", "source")
+    _prices = {"price": "price_usd"}
+
+    def __init__(self, id: str, airline: str, flight_number: str, departure_time: str,
+                 arrival_time: str, duration: str, price_usd: Optional[float], stops: int,
+                 aircraft: str = "Commercial Aircraft", booking_link: str = "", source: str = ""):
+        self.id = id
+        self.airline = intern(airline)
+        self.flight_number = flight_number
+        self.departure_time = departure_time
+        self.arrival_time = arrival_time
+        self.duration = intern(duration)
+        self.price_usd = price_usd
+        self.stops = stops
+        self.aircraft = intern(aircraft)
+        self.booking_link = booking_link
+        self.source = intern(source)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "FlightResult":
+        """Build from the legacy dict shape ({"price": {"USD": ...}, ...})"""
+        return cls(
+            id=data.get("id", ""),
+            airline=data.get("airline", ""),
+            flight_number=data.get("flight_number", ""),
+            departure_time=data.get("departure_time", ""),
+            arrival_time=data.get("arrival_time", ""),
+            duration=data.get("duration", ""),
+            price_usd=data.get("price", {}).get(BASE_CURRENCY, 0),
+            stops=data.get("stops", 0),
+            aircraft=data.get("aircraft", "Commercial Aircraft"),
+            booking_link=data.get("booking_link", ""),
+            source=data.get("source", "")
+        )
+
+
+class RoundTripResult(Record):
+    """An outbound and a return flight priced together
+
+    With a "combined" fare the provider priced both legs as one ticket and
+    the legs carry no price of their own; "separate" pairs two one-way fares.
+    """
+
+    __slots__ = ("id", "outbound", "inbound", "price_usd", "fare", "source")
+    _fields = ("id", "outbound", "inbound", "price", "fare", "source")
+    _prices = {"price": "price_usd"}
+
+    def __init__(self, id: str, outbound: FlightResult, inbound: FlightResult, price_usd: float,
+                 fare: str = "separate", source: str = ""):
+        self.id = id
+        self.outbound = outbound
+        self.inbound = inbound
+        self.price_usd = price_usd
+        self.fare = intern(fare)
+        self.source = intern(source)
+
+
+class HotelResult(Record):
+    """One hotel option, priced per night"""
+
+    __slots__ = ("id", "name", "rating", "price_per_night_usd", "amenities",
+                 "location", "image", "booking_link")
+    _fields = ("id", "name", "rating", "price_per_night", "amenities",
+               "location", "image", "booking_link")
+    _prices = {"price_per_night": "price_per_night_usd"}
+
+    def __init__(self, id: str, name: str, rating: float, price_per_night_usd: float,
+                 amenities: Iterable[str] = (), location: str = "", image: str = "",
+                 booking_link: str = ""):
+        self.id = id
+        self.name = name
+        self.rating = rating
+        self.price_per_night_usd = price_per_night_usd
+        self.amenities = tuple(intern(amenity) for amenity in amenities)
+        self.location = intern(location)
+        self.image = image
+        self.booking_link = booking_link
+
+
+class ActivityResult(Record):
+    """One bookable activity"""
+
+    __slots__ = ("id", "name", "description", "duration", "price_usd", "rating",
+                 "category", "image", "booking_link")
+    _fields = ("id", "name", "description", "duration", "price", "rating",
+               "category", "image", "booking_link")
+    _prices = {"price": "price_usd"}
+
+    def __init__(self, id: str, name: str, description: str, duration: str, price_usd: float,
+                 rating: float, category: str = "", image: str = "", booking_link: str = ""):
+        self.id = id
+        self.name = name
+        self.description = description
+        self.duration = intern(duration)
+        self.price_usd = price_usd
+        self.rating = rating
+        self.category = intern(category)
+        self.image = image
+        self.booking_link = booking_link
+
+
+def serialize(records: Iterable[Record], currencies: Sequence[str] = DEFAULT_CURRENCIES,
+              rates: Dict[str, float] = DISPLAY_RATES,
+              fields: Optional[Sequence[str]] = None) -> List[Dict]:
+    """Serialize a list of records for a response"""
+    return [record.to_dict(currencies, rates, fields) for record in records]
+
+
+def serialize_json(records: Iterable[Record], currencies: Sequence[str] = DEFAULT_CURRENCIES,
+                   rates: Dict[str, float] = DISPLAY_RATES,
+                   fields: Optional[Sequence[str]] = None) -> RawJSON:
+    """Serialize a list of records to a JSON array fragment for json_response()"""
+    return render_list(record.to_json(currencies, rates, fields) for record in records)
@@ -0,0 +1,160 @@
+"""
+Fast JSON Responses
+orjson-backed response rendering, raw JSON fragments and a cache of pre-serialized payloads.
+"""
+
+import hashlib
+import json
+import logging
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:  # optional faster encoder
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    """Fallback encoder for values the JSON encoders do not know"""
+    if hasattr(value, "to_dict"):
+        return value.to_dict()
+    if hasattr(value, "model_dump"):
+        return value.model_dump()
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    return str(value)
+
+
+if orjson is not None:
+    def dumps(content: Any) -> bytes:
+        """Serialize to compact JSON bytes"""
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+else:
+    def dumps(content: Any) -> bytes:
+        """Serialize to compact JSON bytes"""
+        return json.dumps(content, default=_default, ensure_ascii=False,
+                          separators=(",", ":")).encode("utf-8")
+
+
+class RawJSON:
+    """Already-serialized JSON, spliced verbatim into a response body"""
+
+    __slots__ = ("data",)
+
+    def __init__(self, data: bytes):
+        self.data = data
+
+
+def render(content: Any) -> bytes:
+    """Serialize content, splicing in RawJSON values of a top-level dict"""
+    if isinstance(content, RawJSON):
+        return content.data
+    if isinstance(content, dict) and any(isinstance(v, RawJSON) for v in content.values()):
+        return b"{" + b",".join(
+            dumps(str(key)) + b":" + (value.data if isinstance(value, RawJSON) else dumps(value))
+            for key, value in content.items()
+        ) + b"}"
+    return dumps(content)
+
+
+def render_list(items: Iterable[bytes]) -> RawJSON:
+    """Join pre-serialized items into a JSON array"""
+    return RawJSON(b"[" + b",".join(items) + b"]")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson (when installed) and RawJSON splicing"""
+
+    def render(self, content: Any) -> bytes:
+        return render(content)
+
+
+def json_response(content: Any, status_code: int = 200, headers: Optional[Dict[str, str]] = None) -> Response:
+    """Build a JSON response directly, bypassing FastAPI's jsonable_encoder pass"""
+    return Response(content=render(content), status_code=status_code,
+                    headers=headers, media_type="application/json")
+
+
+def bytes_response(body: bytes, status_code: int = 200, headers: Optional[Dict[str, str]] = None) -> Response:
+    """Wrap an already-serialized JSON body in a response"""
+    return Response(content=body, status_code=status_code, headers=headers, media_type="application/json")
+
+
+def make_etag(body: bytes) -> str:
+    """Strong ETag from a content hash of the body"""
+    return f'"{hashlib.blake2b(body, digest_size=12).hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches etag (weak comparison, RFC 9110)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == etag:
+            return True
+    return False
+
+
+def conditional_response(request: Request, body: bytes, etag: str, max_age: float) -> Response:
+    """Answer with 304 if the client already holds this body, else send it with validators"""
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={max(0, int(max_age))}"
+    }
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return bytes_response(body, headers=headers)
+
+
+class PayloadCache:
+    """Serialized bodies keyed by name, re-rendered only when their source changes
+
+    The source is compared by identity: a TTL cache hands back the same
+    object until it refreshes, so the body is serialized once per refresh.
+    Pass None as the source for payloads that never change.
+    """
+
+    def __init__(self, maxsize: int = 512):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, Tuple[Any, bytes, str]]" = OrderedDict()
+
+    def render(self, key: Hashable, source: Any, build: Callable[[], Any]) -> bytes:
+        """Return the serialized body for key, building and rendering it if needed"""
+        return self.render_tagged(key, source, build)[0]
+
+    def render_tagged(self, key: Hashable, source: Any, build: Callable[[], Any]) -> Tuple[bytes, str]:
+        """Like render(), also returning the body's ETag (hashed once per rendering)"""
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] is source:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1], entry[2]
+
+        self.misses += 1
+        body = render(build())
+        etag = make_etag(body)
+        self._entries[key] = (source, body, etag)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return body, etag
+
+    def clear(self):
+        self._entries.clear()
+
+
+# Global instance
+payload_cache = PayloadCache()
@@ -0,0 +1,166 @@
+"""
+Structured Logging
+Queue-backed JSON logging with lazy formatting, size-capped fields and per-route sampling.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+from typing import Any, Dict, Optional
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")  # "json" or "text"
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_FIELD_MAX_CHARS = int(os.getenv("LOG_FIELD_MAX_CHARS", "512"))
+# Per-route sampling rates for hot-path events, e.g. "chat=0.1,recommendations=0.05"
+LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "")
+
+
+def parse_sample_rates(spec: str) -> Dict[str, float]:
+    """Parse "route=rate,..." into a dict, ignoring malformed entries"""
+    rates = {}
+    for part in spec.split(","):
+        route, _, rate = part.partition("=")
+        try:
+            rates[route.strip()] = min(1.0, max(0.0, float(rate)))
+        except ValueError:
+            continue
+    return rates
+
+
+SAMPLE_RATES = parse_sample_rates(LOG_SAMPLE_RATES)
+
+
+def cap(value: Any, limit: int = LOG_FIELD_MAX_CHARS) -> Any:
+    """Render a field for output; values longer than limit become truncated strings"""
+    if isinstance(value, (bool, int, float)) or value is None:
+        return value
+    text = value if isinstance(value, str) else json.dumps(value, default=str, ensure_ascii=False)
+    if len(text) > limit:
+        return f"{text[:limit]}...(+{len(text) - limit} chars)"
+    return value
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line; event fields are capped at LOG_FIELD_MAX_CHARS"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "event": record.getMessage()
+        }
+        route = getattr(record, "route", None)
+        if route:
+            entry["route"] = route
+        for key, value in (getattr(record, "fields", None) or {}).items():
+            entry[key] = cap(value)
+        if record.exc_info or record.exc_text:
+            entry["exc"] = record.exc_text or self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    """Plain-text lines with event fields appended as key=value"""
+
+    def __init__(self):
+        super().__init__("%(levelname)s:%(name)s:%(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = getattr(record, "fields", None)
+        if fields:
+            line += " " + " ".join(f"{key}={cap(value)}" for key, value in fields.items())
+        return line
+
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """Hands records to the listener thread without formatting them first
+
+    The stock QueueHandler renders the message in the calling thread; here
+    the record is queued as-is and formatted by the listener. When the queue
+    is full the record is dropped and counted rather than blocking a request.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.exc_info and not record.exc_text:
+            # Tracebacks reference frames that may be gone by the time the listener runs
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class StructuredLogging:
+    """Owns the log queue and the background listener that writes it out"""
+
+    def __init__(self):
+        self.handler: Optional[LazyQueueHandler] = None
+        self.listener: Optional[logging.handlers.QueueListener] = None
+
+    def configure(self, level: str = LOG_LEVEL, fmt: str = LOG_FORMAT):
+        """Route the root logger through the queue (idempotent)"""
+        if self.listener is not None:
+            return
+        output = logging.StreamHandler()
+        output.setFormatter(JSONFormatter() if fmt == "json" else TextFormatter())
+        log_queue: queue.Queue = queue.Queue(LOG_QUEUE_SIZE)
+        self.handler = LazyQueueHandler(log_queue)
+        self.listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+
+        root = logging.getLogger()
+        for existing in list(root.handlers):
+            root.removeHandler(existing)
+        root.addHandler(self.handler)
+        root.setLevel(level)
+        self.listener.start()
+        atexit.register(self.stop)
+
+    def stop(self):
+        """Flush queued records and stop the listener thread"""
+        if self.listener is not None:
+            self.listener.stop()
+            logging.getLogger().removeHandler(self.handler)
+            self.listener = None
+
+    def stats(self) -> Dict:
+        return {
+            "queued": self.handler.queue.qsize() if self.handler else 0,
+            "dropped": self.handler.dropped if self.handler else 0
+        }
+
+
+def sampled(route: str) -> bool:
+    """Whether an event on this route should be logged under its sampling rate"""
+    rate = SAMPLE_RATES.get(route, 1.0)
+    return rate >= 1.0 or random.random() < rate
+
+
+def log_event(logger: logging.Logger, level: int, event: str, route: str = "", **fields: Any):
+    """Log a structured event; nothing is built unless the level is on and the route is sampled
+
+    Fields are rendered (and capped) by the formatter on the listener thread;
+    top-level dicts and lists are shallow-copied so later mutation cannot race it.
+    """
+    if not logger.isEnabledFor(level) or (route and not sampled(route)):
+        return
+    fields = {key: value.copy() if isinstance(value, (dict, list)) else value for key, value in fields.items()}
+    logger.log(level, event, extra={"route": route, "fields": fields})
+
+
+# Global instance
+structured_logging = StructuredLogging()
@@ -0,0 +1,42 @@
+"""
+Tests for the airport resolver and multi-airport flight search
+"""
+import asyncio
+from airports import airport_resolver
+from flight_apis import FlightSearchAPI
+from records import FlightResult
+
+def test_resolve_city_with_country():
+    """Test that "City, Country" input resolves to the city's airports"""
+    assert airport_resolver.resolve("Tokyo, Japan") == ["HND", "NRT"]
+    assert airport_resolver.resolve("Rome, Italy") == ["FCO", "CIA"]
+
+def test_resolve_aliases_codes_and_typos():
+    """Test region aliases, IATA/metro codes and fuzzy matching"""
+    assert airport_resolver.resolve("Swiss Alps") == ["ZRH", "GVA"]
+    assert airport_resolver.resolve("LAX") == ["LAX"]
+    assert airport_resolver.resolve("NYC") == ["JFK", "EWR", "LGA"]
+    assert airport_resolver.resolve("Londn")[0] == "LHR"
+    assert airport_resolver.resolve("San Fran") == ["SFO"]
+
+def test_resolve_unknown():
+    """Test that unknown places resolve to nothing"""
+    assert airport_resolver.resolve("Atlantis") == []
+    assert airport_resolver.resolve("") == []
+
+def test_search_flights_resolved_fans_out():
+    """Test that metro areas fan out to several airport pairs"""
+    api = FlightSearchAPI()
+    searched = []
+
+    async def fake_search(origin, destination, departure_date, passengers=1):
+        searched.append((origin, destination))
+        n = len(searched)
+        return [FlightResult(f"f{n}", "XX", f"XX{n}", "", "", "", 100 * n, 0)]
+
+    api.search_flights = fake_search
+    flights = asyncio.run(api.search_flights_resolved("New York", "Tokyo, Japan", "2024-12-15"))
+
+    assert searched[0] == ("JFK", "HND")
+    assert len(searched) == 4
+    assert [f.price_usd for f in flights] == [100, 200, 300, 400]
@@ -0,0 +1,53 @@
+import asyncio
+import gzip
+
+import httpx
+import pytest
+
+from cassettes import CassetteLibrary, CassetteMiss, CassetteTransport
+
+
+def upstream(request: httpx.Request) -> httpx.Response:
+    if request.url.path == "/token":
+        return httpx.Response(200, json={"access_token": "secret-token", "expires_in": 1799})
+    upstream.polls += 1
+    return httpx.Response(200, json={"poll": upstream.polls})
+
+
+async def fetch(transport, method, url, **kwargs):
+    async with httpx.AsyncClient(transport=transport) as client:
+        response = await client.request(method, url, **kwargs)
+        return response.json()
+
+
+def record(library):
+    upstream.polls = 0
+    transport = CassetteTransport("amadeus", "record", library, httpx.MockTransport(upstream))
+    asyncio.run(fetch(transport, "POST", "https://api.test/token", data={"client_id": "id", "client_secret": "s3cr3t"}))
+    asyncio.run(fetch(transport, "GET", "https://api.test/offers?apikey=k3y&origin=JFK"))
+    asyncio.run(fetch(transport, "GET", "https://api.test/offers?apikey=k3y&origin=JFK"))
+    library.flush()
+
+
+def test_recorded_cassette_holds_no_credentials(tmp_path):
+    """Test keys, client secrets and access tokens are redacted on disk"""
+    library = CassetteLibrary(str(tmp_path), latency_scale=0)
+    record(library)
+    with gzip.open(tmp_path / "amadeus.jsonl.gz", "rt") as cassette:
+        text = cassette.read()
+    assert text.count("\n") == 3
+    assert "s3cr3t" not in text and "k3y" not in text and "secret-token" not in text
+
+
+def test_replay_without_credentials_in_recorded_order(tmp_path):
+    """Test replay matches requests whatever their keys and repeats the last response"""
+    record(CassetteLibrary(str(tmp_path), latency_scale=0))
+    transport = CassetteTransport("amadeus", "replay", CassetteLibrary(str(tmp_path), latency_scale=0))
+    token = asyncio.run(fetch(transport, "POST", "https://api.test/token", data={"client_id": "", "client_secret": ""}))
+    assert token["expires_in"] == 1799
+    polls = [asyncio.run(fetch(transport, "GET", "https://other.test/offers?origin=JFK&apikey="))["poll"]
+             for _ in range(3)]
+    assert polls == [1, 2, 2]
+
+    with pytest.raises(CassetteMiss):
+        asyncio.run(fetch(transport, "GET", "https://api.test/offers?origin=LAX"))
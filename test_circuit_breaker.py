@@ -0,0 +1,88 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpen
+from deadlines import request_deadline
+from upstream import UpstreamTransport
+
+
+def test_breaker_opens_on_error_rate_and_recovers_after_probes():
+    """Test failures trip the circuit, then successful half-open probes close it"""
+    breaker = CircuitBreaker("amadeus", min_calls=4, error_rate=0.5, open_seconds=0.05, probes=2)
+    for failed in (False, True, False, True):
+        breaker.acquire()
+        breaker.release(failed, 0.1)
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpen):
+        breaker.acquire()
+
+    time.sleep(0.06)
+    breaker.acquire()
+    breaker.acquire()
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(CircuitOpen):
+        breaker.acquire()
+    breaker.release(False, 0.1)
+    breaker.release(False, 0.1)
+    assert breaker.state == CLOSED
+
+
+def test_breaker_opens_on_slow_calls_and_ignores_cancellations():
+    """Test mostly-slow successful calls trip the circuit; cancelled calls carry no verdict"""
+    breaker = CircuitBreaker("groq", slow_seconds=1.0, min_calls=3, slow_rate=0.6)
+    for _ in range(5):
+        breaker.acquire()
+        breaker.release(None, 9.0)
+    assert breaker.state == CLOSED
+    for seconds in (2.0, 0.1, 3.0):
+        breaker.acquire()
+        breaker.release(False, seconds)
+    assert breaker.state == OPEN
+
+
+def test_open_circuit_fails_fast_without_calling_provider():
+    """Test requests through an open circuit never reach the transport"""
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(503)
+
+    transport = UpstreamTransport("weatherapi", httpx.MockTransport(handler))
+    transport.breaker = CircuitBreaker("weatherapi", min_calls=2, open_seconds=60)
+
+    async def fetch():
+        async with httpx.AsyncClient(transport=transport) as client:
+            return await client.get("https://weather.test/current.json")
+
+    assert asyncio.run(fetch()).status_code == 503
+    assert asyncio.run(fetch()).status_code == 503
+    with pytest.raises(CircuitOpen):
+        asyncio.run(fetch())
+    assert len(calls) == 2
+
+
+def test_timeouts_capped_by_a_deadline_do_not_count_against_the_provider():
+    """Test a burst of out-of-time requests leaves the circuit closed, while real timeouts still count"""
+    async def handler(request):
+        await asyncio.sleep(request.extensions["timeout"]["read"])
+        raise httpx.ReadTimeout("timed out", request=request)
+
+    transport = UpstreamTransport("amadeus", httpx.MockTransport(handler))
+    transport.breaker = CircuitBreaker("amadeus", min_calls=2)
+
+    async def fetch(deadline):
+        async with httpx.AsyncClient(transport=transport, timeout=0.05) as client:
+            with request_deadline(deadline):
+                await client.get("https://amadeus.test/shopping/flight-offers")
+
+    for _ in range(3):
+        with pytest.raises(httpx.ReadTimeout):
+            asyncio.run(fetch(0.02))
+    assert transport.breaker.stats()["recent_calls"] == 0
+    with pytest.raises(httpx.ReadTimeout):
+        asyncio.run(fetch(None))
+    assert transport.breaker.stats()["recent_calls"] == 1
@@ -0,0 +1,103 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+import main
+from deadlines import DeadlineExceeded, cap_request_timeout, remaining, request_deadline, within
+
+
+def test_nested_deadline_keeps_the_earlier_expiry():
+    """Test an inner budget cannot extend the outer one"""
+    assert remaining() is None
+    with request_deadline(1.0):
+        with request_deadline(60):
+            assert remaining() <= 1.0
+        with request_deadline(0.2):
+            assert remaining() <= 0.2
+    assert remaining() is None
+
+
+def test_provider_timeouts_are_capped_by_the_deadline():
+    """Test outgoing requests get at most the time left, and none once it is spent"""
+    request = httpx.Request("GET", "https://api.test/", extensions={"timeout": {"connect": 5.0, "read": 30.0}})
+    with request_deadline(2.0):
+        cap_request_timeout(request)
+    assert all(value <= 2.0 for value in request.extensions["timeout"].values())
+    with request_deadline(0.001):
+        time.sleep(0.002)
+        with pytest.raises(DeadlineExceeded):
+            cap_request_timeout(request)
+
+
+def test_trip_cost_uses_estimates_for_late_components(monkeypatch):
+    """Test a slow flight lookup is replaced by its estimate when the budget runs out"""
+    async def slow_flights(*args, **kwargs):
+        await asyncio.sleep(5)
+
+    async def run():
+        with request_deadline(0.2):
+            return await main.calculate_total_trip_cost("Boston", "Rome, Italy", "2024-12-15", "2024-12-22", 2, {})
+
+    monkeypatch.setattr(main, "get_average_flight_prices", slow_flights)
+    start = time.perf_counter()
+    cost = asyncio.run(run())
+    assert time.perf_counter() - start < 1.0
+    assert cost["details"]["flight_data"] == main.estimated_flight_prices()
+    assert cost["total_cost_per_person"] > 0
+
+
+def test_within_without_deadline_just_awaits():
+    """Test stages run unbounded when no deadline is set"""
+    async def value():
+        await asyncio.sleep(0)
+        return 42
+
+    assert asyncio.run(within(value(), fallback=0)) == 42
+
+
+def test_caller_timing_out_leaves_the_shared_lookup_running(monkeypatch):
+    """Test a caller whose deadline expires does not cancel the lookup another caller is waiting on"""
+    async def slow_flights(*args, **kwargs):
+        # Shared lookups are not bound by the deadline of whichever caller started them
+        assert remaining() is None
+        await asyncio.sleep(0.3)
+        return {"average_price": 640, "price_range": "600-700", "currency": "USD", "source": "Amadeus"}
+
+    async def hurried():
+        with request_deadline(0.1):
+            return await main.calculate_total_trip_cost("Oslo", "Lima, Peru", "2031-03-01", "2031-03-08", 1, {})
+
+    async def run():
+        # The hurried caller starts the shared lookup, the other joins it
+        first = asyncio.ensure_future(hurried())
+        await asyncio.sleep(0.02)
+        second = await main.calculate_total_trip_cost("Oslo", "Lima, Peru", "2031-03-01", "2031-03-08", 1, {})
+        return await first, second
+
+    monkeypatch.setattr(main, "get_average_flight_prices", slow_flights)
+    estimated, priced = asyncio.run(run())
+    assert estimated["details"]["flight_data"] == main.estimated_flight_prices()
+    assert priced["details"]["flight_data"]["source"] == "Amadeus"
+    assert main.flight_components.get(("Oslo", "Lima, Peru", "2031-03-01", "2031-03-08"))["average_price"] == 640
+
+
+def test_estimate_from_an_abandoned_lookup_keeps_the_fallback_ttl(monkeypatch):
+    """Test a lookup that finishes after its only caller timed out still caches its estimate briefly"""
+    async def failing_flights(*args, **kwargs):
+        await asyncio.sleep(0.1)
+        return {"average_price": 0, "price_range": "0-0", "currency": "USD", "source": "No data available"}
+
+    async def run():
+        with request_deadline(0.05):
+            cost = await main.calculate_total_trip_cost("Oslo", "Quito", "2031-04-01", "2031-04-08", 1, {})
+        await asyncio.sleep(0.2)
+        return cost
+
+    monkeypatch.setattr(main, "get_average_flight_prices", failing_flights)
+    cost = asyncio.run(run())
+    key = ("Oslo", "Quito", "2031-04-01", "2031-04-08")
+    assert cost["details"]["flight_data"] == main.estimated_flight_prices()
+    assert main.flight_components.get(key)["source"] == "No data available"
+    assert main.flight_components.expires_in(key) <= main.COMPONENT_FALLBACK_TTL_SECONDS
@@ -0,0 +1,166 @@
+"""
+Tests for flight result parsing and ranking
+"""
+import asyncio
+import json
+import threading
+import httpx
+import decoding
+from itertools import product
+from flight_apis import FlightSearchAPI, TopKFlights, cheapest_pairs
+from records import FlightResult
+
+def make_flight(number, price, airline="XX", departure="2024-12-15T09:00:00", source="Mock"):
+    return FlightResult(
+        id=f"{source}_{number}",
+        airline=airline,
+        flight_number=f"{airline}{number}",
+        departure_time=departure,
+        arrival_time="",
+        duration="2h 0m",
+        price_usd=price,
+        stops=0,
+        source=source
+    )
+
+def test_top_k_keeps_cheapest():
+    """Test that the collector keeps only the k cheapest flights, sorted"""
+    top = TopKFlights(3).extend(make_flight(i, price) for i, price in enumerate([500, 120, 900, 80, 300]))
+    assert [f.price_usd for f in top.results()] == [80, 120, 300]
+
+def test_top_k_deduplicates_across_providers():
+    """Test that the cheaper copy of a duplicate flight wins"""
+    top = TopKFlights(5)
+    top.push(make_flight(1, 400, source="Skyscanner"))
+    top.push(make_flight(1, 350, source="Amadeus"))
+    top.push(make_flight(1, 380, source="Other"))
+    top.push(make_flight(1, 350, departure="2024-12-15T18:00:00"))
+
+    results = top.results()
+    assert len(results) == 2
+    assert results[0].source == "Amadeus"
+
+def test_top_k_custom_score():
+    """Test ranking with a pluggable score"""
+    flights = [make_flight(1, 300), make_flight(2, 100), make_flight(3, 200)]
+    top = TopKFlights(2, score=lambda f: -f.price_usd).extend(flights)
+    assert [f.price_usd for f in top.results()] == [300, 200]
+
+def test_amadeus_parser_keeps_best_not_first():
+    """Test that the parser ranks before truncating"""
+    data = {"data": [
+        {
+            "id": str(i),
+            "itineraries": [{"duration": "PT2H", "segments": [{
+                "carrierCode": "AA", "number": str(i),
+                "departure": {"at": "2024-12-15T09:00:00"},
+                "arrival": {"at": "2024-12-15T11:00:00"}
+            }]}],
+            "price": {"total": str(1000 - i)}
+        }
+        for i in range(30)
+    ]}
+    flights = FlightSearchAPI()._parse_amadeus_results(data, limit=5)
+    assert [f.price_usd for f in flights] == [971.0, 972.0, 973.0, 974.0, 975.0]
+
+def test_skyscanner_parser_shares_legs():
+    """Test lookup-table parsing of a poll payload with a shared leg"""
+    segment_time = {"year": 2024, "month": 12, "day": 15, "hour": 9, "minute": 5, "second": 0}
+    results = {"content": {"results": {
+        "itineraries": {
+            "it1": {"legIds": ["L1"], "pricingOptions": [
+                {"price": {"amount": 420}, "agentIds": ["expd"], "url": "https://a"},
+                {"price": {"amount": 390}, "agentIds": ["bkng"], "url": "https://b"}
+            ]},
+            "it2": {"legIds": ["L1"], "pricingOptions": [
+                {"price": {"amount": 510}, "agentIds": ["kiwi"], "url": "https://c"}
+            ]}
+        },
+        "legs": {"L1": {"segmentIds": ["S1"], "durationInMinutes": 155}},
+        "segments": {"S1": {
+            "departureDateTime": segment_time,
+            "arrivalDateTime": dict(segment_time, hour=11, minute=40),
+            "marketingCarrierId": "-31722",
+            "marketingFlightNumber": "123"
+        }},
+        "carriers": {"-31722": {"name": "Delta", "iata": "DL", "displayCode": "DL"}}
+    }}}
+
+    flights = FlightSearchAPI()._parse_skyscanner_results(results)
+
+    # All three options fly DL 123 at the same time, so the cheapest one wins
+    assert len(flights) == 1
+    assert flights[0].price_usd == 390
+    assert flights[0].airline == "Delta"
+    assert flights[0].flight_number == "DL 123"
+    assert flights[0].departure_time == "2024-12-15T09:05:00"
+    assert flights[0].duration == "2h 35m"
+    assert flights[0].stops == 0
+
+    # Amadeus reports the same flight by carrier code; the two copies collapse into one
+    amadeus = FlightSearchAPI()._parse_amadeus_results({"data": [{"id": "7", "price": {"total": "350.00"},
+        "itineraries": [{"duration": "PT2H35M", "segments": [{
+            "carrierCode": "DL", "number": "123",
+            "departure": {"at": "2024-12-15T09:05:00"}, "arrival": {"at": "2024-12-15T11:40:00"}}]}]}]})
+    merged = FlightSearchAPI()._remove_duplicates(flights + amadeus)
+    assert [flight.source for flight in merged] == ["Skyscanner"]
+
+def test_decode_json_offloads_large_payloads(monkeypatch):
+    """Test that bodies above the threshold are decoded and parsed off the loop thread"""
+    body = json.dumps({"data": []}).encode()
+    threads = []
+
+    def parser(data):
+        threads.append(threading.current_thread())
+        return data["data"]
+
+    async def decode(threshold):
+        monkeypatch.setattr(decoding, "OFFLOAD_THRESHOLD_BYTES", threshold)
+        return await decoding.decode_json(httpx.Response(200, content=body), parser)
+
+    assert asyncio.run(decode(len(body) + 1)) == []
+    assert asyncio.run(decode(0)) == []
+    assert threads[0] is threading.main_thread()
+    assert threads[1] is not threading.main_thread()
+
+def test_flight_result_serializes_prices_lazily():
+    """Test that prices are stored once in USD and expanded on serialization"""
+    flight = make_flight(1, 400, source="Amadeus")
+    data = flight.to_dict()
+    assert data["price"] == {"USD": 400, "EUR": 340.0, "GBP": 292.0}
+    assert flight.to_dict(currencies=("EUR",))["price"] == {"EUR": 340.0}
+    assert FlightResult.from_dict(data) == flight
+    assert make_flight(2, 300, source="Amadeus").source is flight.source
+
+def test_cheapest_pairs_match_the_full_cross_product():
+    """Test top-k pairing returns the same totals as ranking every combination"""
+    outbound = [make_flight(i, price) for i, price in enumerate([410, 95, 230, 180, 600, 95])]
+    inbound = [make_flight(i, price, departure="2024-12-22T10:00:00") for i, price in enumerate([300, 150, 88, 510])]
+    expected = sorted(o.price_usd + b.price_usd for o, b in product(outbound, inbound))[:7]
+    assert [o.price_usd + b.price_usd for o, b in cheapest_pairs(outbound, inbound, 7)] == expected
+    assert cheapest_pairs(outbound, [], 3) == []
+
+def test_amadeus_round_trip_offers_keep_both_itineraries():
+    """Test a round-trip offer becomes one priced pair of legs"""
+    def itinerary(carrier, day):
+        return {"duration": "PT8H", "segments": [{"carrierCode": carrier, "number": "10",
+                                                  "departure": {"at": f"2024-12-{day}T09:00:00"},
+                                                  "arrival": {"at": f"2024-12-{day}T17:00:00"}}]}
+    payload = {"data": [
+        {"id": "1", "itineraries": [itinerary("AF", 15), itinerary("AF", 22)], "price": {"total": "812.40"}},
+        {"id": "2", "itineraries": [itinerary("KL", 15)], "price": {"total": "300.00"}}
+    ]}
+    trips = FlightSearchAPI()._parse_amadeus_round_trips(payload)
+    assert len(trips) == 1
+    trip = trips[0].to_dict(("USD",))
+    assert trip["price"] == {"USD": 812.40} and trip["fare"] == "combined"
+    assert trip["inbound"]["departure_time"] == "2024-12-22T09:00:00"
+
+def test_rendered_json_follows_rate_changes():
+    """Test a record's cached rendering is not reused once the rates change, even in place"""
+    flight = make_flight(1, 100)
+    rates = {"USD": 1.0, "EUR": 0.85}
+    assert json.loads(flight.to_json(("USD", "EUR"), rates))["price"] == {"USD": 100, "EUR": 85.0}
+    rates["EUR"] = 0.9
+    assert json.loads(flight.to_json(("USD", "EUR"), rates))["price"] == {"USD": 100, "EUR": 90.0}
+    assert json.loads(flight.to_json(("USD", "EUR"), {"USD": 1.0, "EUR": 0.9}))["price"]["EUR"] == 90.0
@@ -0,0 +1,49 @@
+import asyncio
+import time
+
+import httpx
+
+from hedging import HedgePolicy, hedged_send
+
+
+def slow_then_fast():
+    calls = []
+
+    async def handler(request):
+        calls.append(time.perf_counter())
+        if len(calls) == 1:
+            await asyncio.sleep(1.0)
+            return httpx.Response(200, json={"attempt": 1})
+        return httpx.Response(200, json={"attempt": len(calls)})
+
+    return httpx.MockTransport(handler), calls
+
+
+def test_slow_get_is_hedged_and_second_copy_wins():
+    """Test a request outliving the delay is raced by a copy that answers first"""
+    transport, calls = slow_then_fast()
+    policy = HedgePolicy(enabled=True)
+
+    async def run():
+        request = httpx.Request("GET", "https://weather.test/v1/current.json?q=Paris")
+        return await hedged_send(transport.handle_async_request, request, 0.02, policy, "weatherapi")
+
+    start = time.perf_counter()
+    response = asyncio.run(run())
+    assert time.perf_counter() - start < 0.5
+    assert response.json() == {"attempt": 2}
+    assert len(calls) == 2
+
+
+def test_hedge_budget_and_eligibility():
+    """Test only configured GETs are eligible and hedges stop when the budget is spent"""
+    policy = HedgePolicy(enabled=True, targets="amadeus:/shopping/flight-offers", max_ratio=0.0)
+    offers = "https://api.test/v2/shopping/flight-offers"
+    assert policy.target("amadeus", httpx.Request("GET", offers)) == "/shopping/flight-offers"
+    assert policy.target("amadeus", httpx.Request("POST", offers)) is None
+    assert policy.target("amadeus", httpx.Request("GET", "https://api.test/v1/security/oauth2/token")) is None
+    assert policy.delay("amadeus", "/shopping/flight-offers") is None
+
+    for _ in range(10):
+        assert policy.take_token()
+    assert not policy.take_token()
@@ -3,7 +3,9 @@ Simple test file for the Travel AI Backend
 """
 import pytest
 import asyncio
+import time
 from fastapi.testclient import TestClient
+import main
 from main import app
 
 client = TestClient(app)
@@ -15,6 +17,7 @@ def test_health_endpoint():
     data = response.json()
     assert "status" in data
     assert data["status"] == "healthy"
+    assert "event_loop_lag" in data
 
 def test_root_endpoint():
     """Test the root endpoint"""
@@ -51,5 +54,232 @@ def test_recommendations_endpoint():
     assert "success" in data
     assert data["success"] == True
 
+def test_destinations_endpoint_is_pre_serialized():
+    """Test that the static destinations payload is rendered once and reused"""
+    from responses import payload_cache
+    first = client.get("/destinations")
+    hits = payload_cache.hits
+    second = client.get("/destinations")
+    assert second.status_code == 200
+    assert second.content == first.content
+    assert payload_cache.hits == hits + 1
+    assert second.json()["destinations"][0]["name"] == "Bali, Indonesia"
+
+def test_weather_conditional_get():
+    """Test ETag/Cache-Control headers and 304 answers on a cached read"""
+    response = client.get("/weather/Lisbon")
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+    assert "max-age=" in response.headers["cache-control"]
+
+    not_modified = client.get("/weather/Lisbon", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert not_modified.headers["etag"] == etag
+
+    stale = client.get("/weather/Lisbon", headers={"If-None-Match": '"other"'})
+    assert stale.status_code == 200
+
+def test_fallback_rates_expire_despite_cache_hits(monkeypatch):
+    """Test mock rates cached after a failed fetch keep their short TTL instead of renewing it on every hit"""
+    monkeypatch.setattr(main.currency_api, "available", True)
+    monkeypatch.setattr(main.currency_api, "_fetch_exchange_rates",
+                        lambda base: asyncio.sleep(0, result=main.currency_api._get_mock_rates(base)))
+    main.currency_api.rates_cache.invalidate("NOK")
+    asyncio.run(main.currency_api.get_exchange_rates("NOK"))
+    first = main.currency_api.rates_max_age("NOK")
+    assert 0 < first <= 60
+    time.sleep(0.05)
+    asyncio.run(main.currency_api.get_exchange_rates("NOK"))
+    assert main.currency_api.rates_max_age("NOK") <= first - 0.04
+
+def test_fallback_weather_expires_despite_cache_hits(monkeypatch):
+    """Test mock weather and forecasts keep their short TTL across cache hits"""
+    weather_api = main.weather_api
+    monkeypatch.setattr(weather_api, "available", True)
+    monkeypatch.setattr(weather_api, "_fetch_current_weather",
+                        lambda location: asyncio.sleep(0, result=weather_api._get_mock_weather(location)))
+    monkeypatch.setattr(weather_api, "_fetch_forecast",
+                        lambda location, days: asyncio.sleep(0, result=weather_api._get_mock_forecast(location, days)))
+    for days in (None, 3):
+        fetch = (lambda: weather_api.get_current_weather("Reykjavik")) if days is None else (
+            lambda: weather_api.get_forecast("Reykjavik", days))
+        asyncio.run(fetch())
+        first = weather_api.max_age("Reykjavik", days)
+        assert 0 < first <= 60
+        time.sleep(0.05)
+        asyncio.run(fetch())
+        assert weather_api.max_age("Reykjavik", days) <= first - 0.04
+
+def test_flights_endpoint():
+    """Test the flights endpoint serializes prices in display currencies"""
+    response = client.post("/flights", json={
+        "origin": "New York",
+        "destination": "Tokyo, Japan",
+        "departure_date": "2024-12-15"
+    })
+    assert response.status_code == 200
+    flights = response.json()["flights"]
+    assert flights
+    assert set(flights[0]["price"]) == {"USD", "EUR", "GBP"}
+
+def test_large_responses_are_compressed():
+    """Test gzip negotiation and reuse of compressed cached payloads"""
+    from compression import compression_cache
+    headers = {"Accept-Encoding": "gzip"}
+    first = client.get("/destinations", headers=headers)
+    assert first.headers["content-encoding"] == "gzip"
+    assert first.headers["etag"].startswith("W/")
+    assert "Accept-Encoding" in first.headers["vary"]
+    hits = compression_cache.hits
+    second = client.get("/destinations", headers=headers)
+    assert second.json() == first.json()
+    assert compression_cache.hits == hits + 1
+
+    not_modified = client.get("/destinations", headers={**headers, "If-None-Match": first.headers["etag"]})
+    assert not_modified.status_code == 304
+
+    identity = client.get("/destinations", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in identity.headers
+
+def test_sparse_fields_and_cursor_pagination():
+    """Test fields= projection, single-currency prices and cursor paging"""
+    search = {"destination": "Rome", "check_in": "2024-12-01", "check_out": "2024-12-08"}
+    first = client.post("/hotels?fields=name,price_per_night&currency=EUR&limit=1", json=search).json()
+    assert [set(hotel) for hotel in first["hotels"]] == [{"id", "name", "price_per_night"}]
+    assert set(first["hotels"][0]["price_per_night"]) == {"EUR"}
+    assert first["next_cursor"]
+
+    second = client.post(f"/hotels?fields=name&limit=1&cursor={first['next_cursor']}", json=search).json()
+    assert second["hotels"][0]["id"] not in {hotel["id"] for hotel in first["hotels"]}
+
+    other_search = {**search, "destination": "Paris"}
+    assert client.post(f"/hotels?cursor={first['next_cursor']}", json=other_search).status_code == 400
+    assert client.post("/hotels?fields=bogus", json=search).status_code == 400
+
+    destinations = client.get("/destinations?fields=name&currency=GBP&limit=3").json()
+    assert len(destinations["destinations"]) == 3
+    assert set(destinations["destinations"][0]) == {"id", "name"}
+
+def test_profiling_hook(monkeypatch, tmp_path):
+    """Test a token-gated request is profiled and its folded stacks downloadable"""
+    import profiling
+    monkeypatch.setattr(profiling, "PROFILE_TOKEN", "secret")
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+
+    assert "x-profile-id" not in client.get("/destinations", headers={"X-Profile-Token": "wrong"}).headers
+    response = client.post("/recommendations", headers={"X-Profile-Token": "secret"}, json={
+        "budget_per_person": "2000", "people_count": "2", "travel_from": "New York",
+        "travel_type": "international", "destination_type": "beach", "travel_dates": "2024-12-15"
+    })
+    profile_id = response.headers["x-profile-id"]
+
+    assert client.get(f"/debug/profiles/{profile_id}").status_code == 403
+    profile = client.get(f"/debug/profiles/{profile_id}", headers={"X-Profile-Token": "secret"})
+    assert profile.status_code == 200
+    for line in profile.text.splitlines():
+        stack, count = line.rsplit(" ", 1)
+        assert int(count) > 0
+
+def test_trip_cost_components_are_memoized_across_guests_and_currency(monkeypatch):
+    """Test changing guests or currency reuses every component"""
+    calls = []
+
+    async def flights(origin, destination, departure_date, return_date=None):
+        calls.append(destination)
+        return {"average_price": 400, "price_range": "300-500", "currency": "USD", "source": "Real-time flight data"}
+
+    monkeypatch.setattr(main, "get_average_flight_prices", flights)
+    first = asyncio.run(main.calculate_total_trip_cost("Oslo", "Lima", "2025-03-01", "2025-03-08", 1, {}))
+    second = asyncio.run(main.calculate_total_trip_cost("Oslo", "Lima", "2025-03-01", "2025-03-08", 3,
+                                                        {"currency": "EUR"}))
+    assert calls == ["Lima"]
+    assert not first["details"]["cache_hits"]["flight"]
+    assert second["details"]["cache_hits"] == {"flight": True, "hotel": True, "living": True}
+    assert second["breakdown"]["flight_cost_per_person"] == round(400 * 0.85, 2)
+
+def test_batch_cost_analysis_shares_lookups(monkeypatch):
+    """Test a batch prices every trip with one flight lookup per unique route"""
+    calls = []
+
+    async def flights(origin, destination, departure_date, return_date=None):
+        calls.append((origin, destination))
+        return {"average_price": 300, "price_range": "250-350", "currency": "USD", "source": "Real-time flight data"}
+
+    monkeypatch.setattr(main, "get_average_flight_prices", flights)
+    trip = {"origin": "Quito", "destination": "Cusco", "departure_date": "2025-05-01", "return_date": "2025-05-06"}
+    response = client.post("/cost-analysis/batch", json={"trips": [
+        trip, {**trip, "guests": 4}, {**trip, "currency": "GBP"}, {**trip, "origin": "Bogota"}
+    ]})
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data["results"]) == 4
+    assert data["lookups"] == {"flights": 2, "hotels": 1, "destinations": 1}
+    assert sorted(calls) == [("Bogota", "Cusco"), ("Quito", "Cusco")]
+    assert data["results"][2]["cost_analysis"]["currency"] == "GBP"
+
+def test_flight_calendar_prices_cells_from_shared_legs(monkeypatch):
+    """Test the grid is built from one search per leg date and reports the cheapest cell"""
+    searched = []
+
+    async def flights(origin, destination, departure_date, return_date=None):
+        searched.append((origin, departure_date))
+        day = int(departure_date[-2:])
+        return {"average_price": 100 + day, "price_range": "0-0", "currency": "USD", "source": "Real-time flight data"}
+
+    monkeypatch.setattr(main, "get_average_flight_prices", flights)
+    response = client.post("/flights/calendar", json={
+        "origin": "Riga", "destination": "Porto", "departure_date": "2025-06-10",
+        "window_days": 2, "trip_lengths": [5, 3]
+    })
+    assert response.status_code == 200
+    calendar = response.json()["calendar"]
+    assert calendar["departure_dates"][0] == "2025-06-08" and len(calendar["prices"]) == 5
+    assert calendar["trip_lengths"] == [3, 5]
+    assert calendar["searches"] == len(searched) == 12
+    assert calendar["cheapest"] == {"departure_date": "2025-06-08", "return_date": "2025-06-11",
+                                    "trip_length": 3, "price": 219}
+
+    for invalid in ({"window_days": 30}, {"trip_lengths": [5000000]},
+                    {"departure_date": "9999-12-30", "window_days": 3}, {"departure_date": "0001-01-01"}):
+        assert client.post("/flights/calendar", json={
+            "origin": "Riga", "destination": "Porto", "departure_date": "2025-06-10", **invalid
+        }).status_code == 400
+
+def test_flights_with_return_date_are_round_trips(monkeypatch):
+    """Test a return date yields priced outbound/return pairs, with combined fares priced only as a whole"""
+    response = client.post("/flights?currency=USD", json={
+        "origin": "Nowhere Town", "destination": "Elsewhere", "departure_date": "2025-02-01",
+        "return_date": "2025-02-08"
+    })
+    assert response.status_code == 200
+    trips = response.json()["flights"]
+    assert trips and trips == sorted(trips, key=lambda trip: trip["price"]["USD"])
+    first = trips[0]
+    assert first["outbound"]["departure_time"].startswith("2025-02-01")
+    assert first["inbound"]["departure_time"].startswith("2025-02-08")
+    assert first["fare"] == "separate"
+    assert first["price"]["USD"] == first["outbound"]["price"]["USD"] + first["inbound"]["price"]["USD"]
+
+    def itinerary(day):
+        return {"duration": "PT7H30M", "segments": [{"carrierCode": "AF", "number": "11",
+                                                     "departure": {"at": f"2025-02-{day:02d}T18:00:00"},
+                                                     "arrival": {"at": f"2025-02-{day + 1:02d}T07:30:00"}}]}
+    offers = {"data": [{"id": "9", "itineraries": [itinerary(1), itinerary(8)], "price": {"total": "655.00"}}]}
+
+    async def amadeus_round_trips(*args, **kwargs):
+        return main.flight_api._parse_amadeus_round_trips(offers)
+
+    monkeypatch.setattr(main.flight_api, "amadeus_available", True)
+    monkeypatch.setattr(main.flight_api, "search_round_trips_amadeus", amadeus_round_trips)
+    response = client.post("/flights?currency=USD,EUR", json={
+        "origin": "JFK", "destination": "CDG", "departure_date": "2025-02-01", "return_date": "2025-02-08"
+    })
+    assert response.status_code == 200
+    combined = response.json()["flights"][0]
+    assert combined["fare"] == "combined" and combined["price"]["USD"] == 655.0
+    assert "price" not in combined["outbound"] and "price" not in combined["inbound"]
+    assert combined["inbound"]["departure_time"] == "2025-02-08T18:00:00"
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -0,0 +1,41 @@
+import asyncio
+
+import httpx
+from fastapi.testclient import TestClient
+
+from main import app
+from metrics import Histogram, registry
+from upstream import UpstreamTransport
+
+client = TestClient(app)
+
+
+def test_histogram_renders_cumulative_buckets():
+    """Test bucket counts are cumulative and end with +Inf, sum and count"""
+    histogram = Histogram("test_seconds", "test", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(value, "/x")
+    lines = histogram.render()
+    assert 'test_seconds_bucket{route="/x",le="0.1"} 1' in lines
+    assert 'test_seconds_bucket{route="/x",le="1"} 2' in lines
+    assert 'test_seconds_bucket{route="/x",le="+Inf"} 3' in lines
+    assert 'test_seconds_count{route="/x"} 3' in lines
+
+
+def test_metrics_endpoint_reports_routes_and_providers():
+    """Test route templates, provider calls and cache ratios appear in a scrape"""
+    client.get("/weather/Oslo")
+
+    async def call_provider():
+        transport = UpstreamTransport("test_provider", httpx.MockTransport(lambda request: httpx.Response(503)))
+        async with httpx.AsyncClient(transport=transport) as upstream:
+            await upstream.get("http://provider.test/")
+
+    asyncio.run(call_provider())
+    body = client.get("/metrics").text
+    assert 'route="/weather/{location}"' in body
+    assert 'upstream_errors_total{provider="test_provider",reason="503"} 1' in body
+    assert 'upstream_request_duration_seconds_count{provider="test_provider",method="GET"} 1' in body
+    assert 'cache_hit_ratio{cache="weather_current"}' in body
+    assert "active_sessions" in body
+    assert registry.metrics["http_requests_in_flight"].values[()] >= 0
@@ -0,0 +1,69 @@
+import asyncio
+
+import main
+from cache import TTLCache
+from prefetch import PopularKeys, PrefetchJob, Prefetcher
+
+
+def test_due_jobs_refresh_within_the_provider_budget():
+    """Test only entries near expiry refresh, most urgent first, and no more than the budget allows"""
+    cache = TTLCache("prefetch_test", 600)
+    cache.set("fresh", 0)
+    cache.set("soon", 0, ttl=1)
+    refreshed = []
+
+    def job(key):
+        async def refresh():
+            refreshed.append(key)
+            cache.set(key, 1)
+        return PrefetchJob("test", key, ("weatherapi",), lambda: cache.expires_in(key), refresh)
+
+    prefetcher = Prefetcher(enabled=False, lead=30, stagger=0, budgets="weatherapi=2")
+    prefetcher.add_source(lambda: [job(key) for key in ("fresh", "missing", "soon", "also_missing")])
+    assert asyncio.run(prefetcher.run_once()) == 2
+    assert refreshed == ["missing", "also_missing"]
+    assert cache.get("fresh") == 0
+
+    # Budget spent: the last due entry waits for a later pass
+    assert asyncio.run(prefetcher.run_once()) == 0
+    assert cache.get("soon") == 0
+
+
+def test_refresh_replaces_a_fresh_entry():
+    """Test refresh recomputes even while the cached value is still fresh"""
+    cache = TTLCache("prefetch_refresh_test", 600)
+
+    async def lookups():
+        first = await cache.get_or_set("rates", lambda: asyncio.sleep(0, result="old"))
+        cached = await cache.get_or_set("rates", lambda: asyncio.sleep(0, result="new"))
+        refreshed = await cache.get_or_set("rates", lambda: asyncio.sleep(0, result="new"), refresh=True)
+        return first, cached, refreshed
+
+    assert asyncio.run(lookups()) == ("old", "old", "new")
+    assert cache.get("rates") == "new"
+
+
+def test_popular_keys_rank_recent_requests():
+    """Test the most requested keys come first and decay halves older counts"""
+    popular = PopularKeys(decay_seconds=0)
+    for key in ["a", "b", "b", "c", "c", "c"]:
+        popular.observe(key)
+    assert popular.top(2) == ["c", "b"]
+    assert popular.counts["a"] == 0.5
+
+
+def test_prefetch_covers_catalog_weather_and_requested_routes(monkeypatch):
+    """Test every catalog destination gets weather jobs and requested routes get flight jobs"""
+    monkeypatch.setattr(main, "popular_routes", PopularKeys())
+    asyncio.run(main.flight_component("New York", "Paris", "2099-06-01", "2099-06-08"))
+    main.popular_routes.observe(("New York", "Paris", "2000-01-01", None))
+    monkeypatch.setattr(main.weather_api, "available", True)
+    monkeypatch.setattr(main.flight_api, "amadeus_available", True)
+
+    jobs = list(main.prefetch_jobs())
+    names = main.catalog_destination_names()
+    assert {job.key for job in jobs if job.kind == "weather"} == set(names)
+    assert {job.key for job in jobs if job.kind == "forecast"} == set(names)
+    flights = [job for job in jobs if job.kind == "flights"]
+    assert [job.key for job in flights] == [("New York", "Paris", "2099-06-01", "2099-06-08")]
+    assert flights[0].providers == ("amadeus",)
@@ -0,0 +1,46 @@
+import json
+import logging
+import queue
+
+import structured_logging
+from structured_logging import JSONFormatter, LazyQueueHandler, log_event
+
+
+def capture(level=logging.DEBUG):
+    """Logger whose records land on an inspectable queue"""
+    log_queue = queue.Queue()
+    logger = logging.getLogger("test.structured")
+    logger.handlers = [LazyQueueHandler(log_queue)]
+    logger.propagate = False
+    logger.setLevel(level)
+    return logger, log_queue
+
+
+def test_log_event_is_lazy_and_capped():
+    """Test fields are queued unformatted and truncated by the formatter"""
+    logger, log_queue = capture()
+    payload = {"text": "x" * 5000}
+    log_event(logger, logging.INFO, "chat.response", route="chat", response=payload, step="welcome")
+
+    record = log_queue.get_nowait()
+    assert record.fields["response"] == payload
+    entry = json.loads(JSONFormatter().format(record))
+    assert entry["event"] == "chat.response"
+    assert entry["route"] == "chat"
+    assert entry["step"] == "welcome"
+    assert len(entry["response"]) < 600 and "chars)" in entry["response"]
+
+
+def test_log_event_respects_level_and_sampling(monkeypatch):
+    """Test disabled levels and zero-rate routes enqueue nothing"""
+    logger, log_queue = capture(level=logging.INFO)
+    log_event(logger, logging.DEBUG, "conversation.turn", route="chat")
+    monkeypatch.setitem(structured_logging.SAMPLE_RATES, "recommendations", 0.0)
+    log_event(logger, logging.INFO, "recommendations.llm_response", route="recommendations")
+    assert log_queue.empty()
+
+    handler = LazyQueueHandler(queue.Queue(maxsize=1))
+    logger.handlers = [handler]
+    log_event(logger, logging.INFO, "first")
+    log_event(logger, logging.INFO, "second")
+    assert handler.dropped == 1
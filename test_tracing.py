@@ -0,0 +1,59 @@
+import json
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from tracing import SpanExporter, TracingMiddleware, span, traced
+
+
+@traced("lookup")
+async def lookup():
+    with span("parse", rows=3):
+        return {"ok": True}
+
+
+def build_client(tmp_path, server_timing=True):
+    exporter = SpanExporter(str(tmp_path / "spans.jsonl"))
+    app = FastAPI()
+    app.add_middleware(TracingMiddleware, exporter=exporter, server_timing_enabled=server_timing)
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: str):
+        return await lookup()
+
+    return TestClient(app), exporter
+
+
+def test_server_timing_header_lists_spans(tmp_path):
+    """Test child spans are summed per name into Server-Timing"""
+    client, _ = build_client(tmp_path)
+    response = client.get("/items/1")
+    timing = response.headers["server-timing"]
+    assert timing.startswith("parse;dur=")
+    assert "lookup;dur=" in timing and "total;dur=" in timing
+
+
+def test_spans_are_exported_as_zipkin_json(tmp_path):
+    """Test a request's spans share a trace id and nest under the route span"""
+    client, _ = build_client(tmp_path, server_timing=False)
+    response = client.get("/items/42")
+    assert "server-timing" not in response.headers
+
+    path = tmp_path / "spans.jsonl"
+    for _ in range(50):
+        if path.exists() and len(path.read_text().splitlines()) == 3:
+            break
+        time.sleep(0.02)
+    spans = {entry["name"]: entry for entry in map(json.loads, path.read_text().splitlines())}
+    assert set(spans) == {"parse", "lookup", "GET /items/{item_id}"}
+    assert len({entry["traceId"] for entry in spans.values()}) == 1
+    assert spans["parse"]["parentId"] == spans["lookup"]["id"]
+    assert spans["lookup"]["parentId"] == spans["GET /items/{item_id}"]["id"]
+    assert spans["parse"]["tags"] == {"rows": "3"}
+
+
+def test_span_is_a_no_op_outside_requests():
+    """Test spans cost nothing when no trace is active"""
+    with span("idle") as current:
+        assert current is None
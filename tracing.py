@@ -0,0 +1,221 @@
+"""
+Request Tracing
+Lightweight spans per request, exported as Zipkin JSON to a file or collector, with Server-Timing headers.
+"""
+
+import contextvars
+import functools
+import json
+import logging
+import os
+import queue
+import random
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import httpx
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+# "" (off), a file path for JSON lines, or a Zipkin collector URL (http://host:9411/api/v2/spans)
+TRACE_EXPORT = os.getenv("TRACE_EXPORT", "")
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))
+TRACE_SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "travel-ai-api")
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "false").lower() == "true"
+TRACE_QUEUE_SIZE = int(os.getenv("TRACE_QUEUE_SIZE", "10000"))
+TRACE_BATCH_SIZE = 100
+
+
+class Span:
+    """One timed operation within a trace"""
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "start", "duration", "tags")
+
+    def __init__(self, trace_id: str, name: str, parent_id: Optional[str] = None,
+                 tags: Optional[Dict[str, Any]] = None):
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.start = time.time()
+        self.duration = 0.0
+        self.tags = tags or {}
+
+    def to_zipkin(self) -> Dict:
+        span = {
+            "traceId": self.trace_id,
+            "id": self.span_id,
+            "name": self.name,
+            "timestamp": int(self.start * 1e6),
+            "duration": max(1, int(self.duration * 1e6)),
+            "localEndpoint": {"serviceName": TRACE_SERVICE_NAME},
+            "tags": {key: str(value) for key, value in self.tags.items()}
+        }
+        if self.parent_id:
+            span["parentId"] = self.parent_id
+        return span
+
+
+class Trace:
+    """Spans finished so far in one request"""
+
+    __slots__ = ("trace_id", "spans")
+
+    def __init__(self):
+        self.trace_id = secrets.token_hex(16)
+        self.spans: List[Span] = []
+
+    def timings(self) -> "OrderedDict[str, float]":
+        """Total milliseconds per span name, in first-finished order"""
+        totals: "OrderedDict[str, float]" = OrderedDict()
+        for finished in self.spans:
+            totals[finished.name] = totals.get(finished.name, 0.0) + finished.duration * 1000
+        return totals
+
+
+_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("trace", default=None)
+_parent: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("span", default=None)
+
+
+@contextmanager
+def span(name: str, **tags: Any) -> Iterator[Optional[Span]]:
+    """Time the enclosed block as a child of the current span; a no-op outside a traced request"""
+    trace = _trace.get()
+    if trace is None:
+        yield None
+        return
+    parent = _parent.get()
+    current = Span(trace.trace_id, name, parent.span_id if parent else None, tags)
+    token = _parent.set(current)
+    start = time.perf_counter()
+    try:
+        yield current
+    except BaseException as e:
+        current.tags["error"] = type(e).__name__
+        raise
+    finally:
+        current.duration = time.perf_counter() - start
+        _parent.reset(token)
+        trace.spans.append(current)
+
+
+def traced(name: Optional[str] = None) -> Callable:
+    """Decorator wrapping an async function in a span (named after the function by default)"""
+    def decorate(func: Callable) -> Callable:
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            if _trace.get() is None:
+                return await func(*args, **kwargs)
+            with span(span_name):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def server_timing(trace: Trace, limit: int = 20) -> str:
+    """Server-Timing header value summarising a trace"""
+    return ", ".join(
+        f"{name.replace(' ', '_').replace(',', '_').replace(';', '_')};dur={duration:.1f}"
+        for name, duration in list(trace.timings().items())[:limit]
+    )
+
+
+class SpanExporter:
+    """Background thread writing finished traces to a JSON-lines file or a Zipkin collector"""
+
+    def __init__(self, target: str = TRACE_EXPORT):
+        self.target = target
+        self.dropped = 0
+        self._queue: queue.Queue = queue.Queue(TRACE_QUEUE_SIZE)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.target)
+
+    def export(self, spans: List[Span]):
+        if not self.enabled or not spans:
+            return
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+            self._thread.start()
+        try:
+            self._queue.put_nowait(spans)
+        except queue.Full:
+            self.dropped += len(spans)
+
+    def _run(self):
+        while True:
+            batch = [span.to_zipkin() for span in self._queue.get()]
+            while len(batch) < TRACE_BATCH_SIZE and not self._queue.empty():
+                batch.extend(span.to_zipkin() for span in self._queue.get_nowait())
+            try:
+                self._write(batch)
+            except Exception as e:
+                logger.error(f"Span export to {self.target} failed: {e}")
+
+    def _write(self, batch: List[Dict]):
+        if self.target.startswith(("http://", "https://")):
+            httpx.post(self.target, json=batch, timeout=5.0)
+        else:
+            with open(self.target, "a", encoding="utf-8") as output:
+                output.writelines(json.dumps(span) + "\n" for span in batch)
+
+
+class TracingMiddleware:
+    """Opens a root span per request and exports (or reports) the spans beneath it
+
+    Tracing is skipped entirely unless an export target is configured or
+    Server-Timing is enabled; exports are further thinned by TRACE_SAMPLE_RATE.
+    """
+
+    def __init__(self, app: ASGIApp, exporter: Optional["SpanExporter"] = None,
+                 server_timing_enabled: Optional[bool] = None):
+        self.app = app
+        self.exporter = exporter or span_exporter
+        self.server_timing_enabled = SERVER_TIMING_ENABLED if server_timing_enabled is None else server_timing_enabled
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        sampled = self.exporter.enabled and random.random() < TRACE_SAMPLE_RATE
+        if scope["type"] != "http" or not (sampled or self.server_timing_enabled):
+            await self.app(scope, receive, send)
+            return
+
+        trace = Trace()
+        trace_token = _trace.set(trace)
+        root = Span(trace.trace_id, scope["method"], tags={"http.path": scope["path"]})
+        parent_token = _parent.set(root)
+        start = time.perf_counter()
+
+        async def send_with_timing(message: Message):
+            if message["type"] == "http.response.start":
+                root.tags["http.status_code"] = message["status"]
+                if self.server_timing_enabled:
+                    headers = MutableHeaders(scope=message)
+                    timing = server_timing(trace)
+                    total = f"total;dur={(time.perf_counter() - start) * 1000:.1f}"
+                    headers.append("Server-Timing", f"{timing}, {total}" if timing else total)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            root.duration = time.perf_counter() - start
+            route = scope.get("route")
+            root.name = f"{scope['method']} {getattr(route, 'path_format', scope['path'])}"
+            _parent.reset(parent_token)
+            _trace.reset(trace_token)
+            if sampled:
+                self.exporter.export(trace.spans + [root])
+
+
+# Global instance
+span_exporter = SpanExporter()
@@ -0,0 +1,94 @@
+"""
+Upstream HTTP Clients
+httpx clients for external providers, instrumented (metrics and spans) per provider at the transport level.
+"""
+
+import logging
+import time
+from typing import Any, Optional
+
+import httpx
+
+from cassettes import cassette_transport
+from circuit_breaker import circuit_breakers, is_failure
+from deadlines import cap_request_timeout, deadline_reached
+from hedging import hedge_policy, hedged_send
+from metrics import observe_upstream
+from tracing import span
+
+logger = logging.getLogger(__name__)
+
+# Provider labels used in metrics and logs
+SKYSCANNER = "skyscanner"
+AMADEUS = "amadeus"
+WEATHERAPI = "weatherapi"
+EXCHANGERATE = "exchangerate"
+GROQ = "groq"
+
+
+class UpstreamTransport(httpx.AsyncBaseTransport):
+    """Wraps the real transport so every provider call is timed (to response headers) and its failures counted
+
+    Timeouts are shortened to the request deadline, if any. Calls are
+    rejected before any I/O once that deadline has passed (DeadlineExceeded)
+    or while the provider's circuit breaker is open (CircuitOpen).
+    """
+
+    def __init__(self, provider: str, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.provider = provider
+        self.transport = transport or httpx.AsyncHTTPTransport()
+        self.breaker = circuit_breakers.get(provider)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        with span(f"upstream.{self.provider}", method=request.method, path=request.url.path) as current:
+            cap_request_timeout(request)
+            if self.breaker is not None:
+                self.breaker.acquire()
+            failed: Optional[bool] = None
+            start = time.perf_counter()
+            try:
+                response = await self._send(request)
+            except Exception as e:
+                # A timeout shortened to the request's deadline says the caller ran out of time, not that
+                # the provider failed; like a cancellation it is not held against the circuit
+                failed = None if isinstance(e, httpx.TimeoutException) and deadline_reached() else True
+                observe_upstream(self.provider, request.method, time.perf_counter() - start, type(e).__name__)
+                raise
+            else:
+                failed = is_failure(response.status_code)
+            finally:
+                # failed stays None if the call was cancelled, which says nothing about the provider
+                if self.breaker is not None:
+                    self.breaker.release(failed, time.perf_counter() - start)
+            error = str(response.status_code) if response.status_code >= 400 else None
+            observe_upstream(self.provider, request.method, time.perf_counter() - start, error)
+            if current is not None:
+                current.tags["http.status_code"] = response.status_code
+            return response
+
+    async def _send(self, request: httpx.Request) -> httpx.Response:
+        """Send through the real transport, hedging eligible GETs that outlive the provider's tracked percentile"""
+        target = hedge_policy.target(self.provider, request)
+        if target is None:
+            return await self.transport.handle_async_request(request)
+        delay = hedge_policy.delay(self.provider, target)
+        start = time.perf_counter()
+        if delay is None:
+            response = await self.transport.handle_async_request(request)
+        else:
+            response = await hedged_send(self.transport.handle_async_request, request, delay,
+                                         hedge_policy, self.provider)
+        if response.status_code < 400:
+            hedge_policy.tracker(self.provider, target).observe(time.perf_counter() - start)
+        return response
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+def upstream_client(provider: str, **kwargs: Any) -> httpx.AsyncClient:
+    """AsyncClient for one provider; accepts the usual httpx.AsyncClient arguments
+
+    With CASSETTE_MODE set, calls are recorded to (or replayed from) cassettes.
+    """
+    return httpx.AsyncClient(transport=UpstreamTransport(provider, cassette_transport(provider)), **kwargs)
@@ -3,32 +3,72 @@ Weather API Integration
 Supports multiple weather providers for destination weather data.
 """
 
-import httpx
 import os
 import logging
 from typing import Dict, Optional
 from datetime import datetime, timedelta
+from cache import TTLCache
+from cassettes import replaying
+from tracing import traced
+from upstream import WEATHERAPI, upstream_client
 
 logger = logging.getLogger(__name__)
 
 # API Keys
 WEATHER_API_KEY = os.getenv("WEATHER_API_KEY", "")
+WEATHER_BASE_URL = os.getenv("WEATHER_BASE_URL", "http://api.weatherapi.com/v1")
+
+# Current conditions change within minutes, forecasts within hours
+WEATHER_TTL_SECONDS = float(os.getenv("WEATHER_TTL_SECONDS", "600"))
+FORECAST_TTL_SECONDS = float(os.getenv("WEATHER_FORECAST_TTL_SECONDS", "3600"))
+FALLBACK_TTL_SECONDS = float(os.getenv("WEATHER_FALLBACK_TTL_SECONDS", "60"))
 
 class WeatherAPI:
     """Weather data provider using WeatherAPI.com"""
     
     def __init__(self):
         self.api_key = WEATHER_API_KEY
-        self.base_url = "http://api.weatherapi.com/v1"
-        self.available = bool(self.api_key)
-        
-    async def get_current_weather(self, location: str) -> Optional[Dict]:
-        """Get current weather for a location"""
+        self.base_url = WEATHER_BASE_URL
+        self.available = bool(self.api_key) or replaying()
+        self.current_cache = TTLCache("weather_current", WEATHER_TTL_SECONDS)
+        self.forecast_cache = TTLCache("weather_forecast", FORECAST_TTL_SECONDS)
+    
+    @staticmethod
+    def cache_key(location: str, *extra) -> tuple:
+        """Cache key for a location ("Rome " and "rome" share an entry)"""
+        return (" ".join(location.lower().split()),) + extra
+    
+    def max_age(self, location: str, days: Optional[int] = None) -> float:
+        """Seconds the cached current weather (or forecast, given days) stays fresh"""
+        if days is None:
+            return self.current_cache.expires_in(self.cache_key(location))
+        return self.forecast_cache.expires_in(self.cache_key(location, days))
+    
+    @traced("weather.current")
+    async def get_current_weather(self, location: str, refresh: bool = False) -> Optional[Dict]:
+        """Get current weather for a location (cached; refresh refetches it)"""
+        key = self.cache_key(location)
+        return await self.current_cache.get_or_set(key, lambda: self._fetch_current_weather(location),
+                                                   ttl=self._ttl, refresh=refresh)
+    
+    @traced("weather.forecast")
+    async def get_forecast(self, location: str, days: int = 7, refresh: bool = False) -> Optional[Dict]:
+        """Get weather forecast for a location (cached; refresh refetches it)"""
+        key = self.cache_key(location, days)
+        return await self.forecast_cache.get_or_set(key, lambda: self._fetch_forecast(location, days),
+                                                    ttl=self._ttl, refresh=refresh)
+    
+    def _ttl(self, data: Dict) -> Optional[float]:
+        """Freshly fetched mock data standing in for a failed call is retried sooner"""
+        return FALLBACK_TTL_SECONDS if self.available and data.get("source") == "Mock Data" else None
+    
+    async def _fetch_current_weather(self, location: str) -> Dict:
+        """Fetch current weather for a location"""
         if not self.available:
             return self._get_mock_weather(location)
             
         try:
-            async with httpx.AsyncClient() as client:
+            async with upstream_client(WEATHERAPI) as client:
                 response = await client.get(
                     f"{self.base_url}/current.json",
                     params={
@@ -49,13 +89,13 @@ class WeatherAPI:
             logger.error(f"Error fetching weather: {e}")
             return self._get_mock_weather(location)
     
-    async def get_forecast(self, location: str, days: int = 7) -> Optional[Dict]:
-        """Get weather forecast for a location"""
+    async def _fetch_forecast(self, location: str, days: int) -> Dict:
+        """Fetch weather forecast for a location"""
         if not self.available:
             return self._get_mock_forecast(location, days)
             
         try:
-            async with httpx.AsyncClient() as client:
+            async with upstream_client(WEATHERAPI) as client:
                 response = await client.get(
                     f"{self.base_url}/forecast.json",
                     params={